@@ -0,0 +1,285 @@
+"""
+Admission control for council runs.
+
+Under a spike every accepted run slows down every other one, and the
+resulting timeouts trigger even more fallback calls. The controller tracks
+event-loop lag (sampled by a background task), council runs in flight and
+upstream calls pending, and past the configured thresholds new runs are
+rejected immediately with a Retry-After instead of being accepted and
+timing out later. Runs already admitted are never interrupted.
+
+Before that point the same load signals drive a brownout: as load rises,
+new runs get a smaller council and no LLM title, and then skip Stage 2.
+Levels go up as soon as load crosses a threshold but come down one at a
+time, only once load has stayed below the threshold minus a margin for
+BROWNOUT_HOLD_SECONDS, so the server does not flap between levels.
+"""
+
+import asyncio
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from .config import (
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_LOOP_LAG_MS,
+    ADMISSION_MAX_INFLIGHT_RUNS,
+    ADMISSION_MAX_PENDING_UPSTREAM,
+    ADMISSION_RETRY_AFTER_SECONDS,
+    BROWNOUT_ENABLED,
+    BROWNOUT_LEVEL1_LOAD,
+    BROWNOUT_LEVEL2_LOAD,
+    BROWNOUT_HYSTERESIS,
+    BROWNOUT_HOLD_SECONDS,
+    BROWNOUT_REDUCED_MEMBERS,
+)
+from .errors import APIError, ErrorCode
+
+# Loop lag is sampled every LAG_SAMPLE_INTERVAL seconds; the reported lag is
+# the worst of the last LAG_WINDOW samples (about one second)
+LAG_SAMPLE_INTERVAL = 0.1
+LAG_WINDOW = 10
+
+# Endpoints that start a council run (or a chairman re-run)
+RUN_PATH_PATTERN = re.compile(r"^/api/(conversations/[^/]+/message(/stream|/vision)?|runs/[^/]+/resynthesize)$")
+
+
+@dataclass(frozen=True)
+class Degradation:
+    """Work a run gives up at one brownout level."""
+    level: int
+    max_members: Optional[int] = None  # Council size cap (None = as requested)
+    skip_llm_title: bool = False
+    skip_stage2: bool = False
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "level": self.level,
+            "max_members": self.max_members,
+            "skip_llm_title": self.skip_llm_title,
+            "skip_stage2": self.skip_stage2,
+        }
+
+
+DEGRADATION_LEVELS: List[Degradation] = [
+    Degradation(0),
+    Degradation(1, max_members=BROWNOUT_REDUCED_MEMBERS, skip_llm_title=True),
+    Degradation(2, max_members=BROWNOUT_REDUCED_MEMBERS, skip_llm_title=True, skip_stage2=True),
+]
+
+
+class AdmissionController:
+    """Counts in-flight work and decides whether a new run is admitted."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_loop_lag_ms: float = ADMISSION_MAX_LOOP_LAG_MS,
+        max_inflight_runs: int = ADMISSION_MAX_INFLIGHT_RUNS,
+        max_pending_upstream: int = ADMISSION_MAX_PENDING_UPSTREAM,
+        retry_after_seconds: int = ADMISSION_RETRY_AFTER_SECONDS,
+        brownout_enabled: bool = BROWNOUT_ENABLED,
+        brownout_thresholds: Tuple[float, ...] = (BROWNOUT_LEVEL1_LOAD, BROWNOUT_LEVEL2_LOAD),
+        brownout_hysteresis: float = BROWNOUT_HYSTERESIS,
+        brownout_hold_seconds: float = BROWNOUT_HOLD_SECONDS
+    ):
+        self.enabled = enabled
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.max_inflight_runs = max_inflight_runs
+        self.max_pending_upstream = max_pending_upstream
+        self.retry_after_seconds = retry_after_seconds
+        self.inflight_runs = 0
+        self.pending_upstream = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {"inflight_runs": 0, "loop_lag": 0, "pending_upstream": 0}
+        self.brownout_enabled = brownout_enabled
+        self.brownout_thresholds = brownout_thresholds
+        self.brownout_hysteresis = brownout_hysteresis
+        self.brownout_hold_seconds = brownout_hold_seconds
+        self.brownout_transitions = 0
+        self.degraded_runs: Dict[int, int] = {d.level: 0 for d in DEGRADATION_LEVELS[1:]}
+        self._level = 0
+        self._below_since: Optional[float] = None  # When load last went below the level's margin
+        self._lag_samples: Deque[float] = deque(maxlen=LAG_WINDOW)
+        self._monitor: Optional[asyncio.Task] = None
+
+    @property
+    def loop_lag_ms(self) -> float:
+        return max(self._lag_samples, default=0.0)
+
+    def start(self) -> None:
+        """Start sampling event-loop lag (call from the running loop)."""
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self._sample_lag())
+
+    async def stop(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+            self._lag_samples.append(max(0.0, (loop.time() - started - LAG_SAMPLE_INTERVAL) * 1000))
+            self.brownout_level()  # Keep the level moving while no runs arrive
+
+    def load(self) -> float:
+        """Load as a fraction of the shedding limits (1.0 = new runs are shed)."""
+        return max(
+            self.inflight_runs / max(1, self.max_inflight_runs),
+            self.loop_lag_ms / max(1.0, self.max_loop_lag_ms),
+            self.pending_upstream / max(1, self.max_pending_upstream),
+        )
+
+    def brownout_level(self) -> int:
+        """Current brownout level, updated from the load with hysteresis."""
+        if not self.brownout_enabled:
+            return 0
+        load = self.load()
+        now = time.monotonic()
+        target = sum(1 for threshold in self.brownout_thresholds if load >= threshold)
+        if target > self._level:
+            self._level = target
+        elif self._level > 0 and load < self.brownout_thresholds[self._level - 1] - self.brownout_hysteresis:
+            # The hold counts from when load went below the margin, not from the last change
+            if self._below_since is None:
+                self._below_since = now
+            if now - self._below_since < self.brownout_hold_seconds:
+                return self._level
+            self._level -= 1
+        else:
+            self._below_since = None
+            return self._level
+        self._below_since = None
+        self.brownout_transitions += 1
+        print(f"Brownout: level {self._level} (load {load:.2f})")
+        return self._level
+
+    def degradation(self) -> Degradation:
+        """Degradation to apply to a run starting now."""
+        degradation = DEGRADATION_LEVELS[self.brownout_level()]
+        if degradation.level:
+            self.degraded_runs[degradation.level] += 1
+        return degradation
+
+    def check(self) -> Optional[Tuple[str, int]]:
+        """
+        Decide whether a new run may start.
+
+        Returns:
+            None to admit, or (reason, HTTP status) to shed: 429 when the
+            run limit is reached, 503 when the server is overloaded
+        """
+        if not self.enabled:
+            return None
+        if self.inflight_runs >= self.max_inflight_runs:
+            return "inflight_runs", 429
+        if self.loop_lag_ms >= self.max_loop_lag_ms:
+            return "loop_lag", 503
+        if self.pending_upstream >= self.max_pending_upstream:
+            return "pending_upstream", 503
+        return None
+
+    def reject(self, reason: str, status_code: int) -> APIError:
+        """Count a shed run and build the error returned for it."""
+        self.shed[reason] += 1
+        message = (
+            "Too many council runs in progress. Please try again shortly."
+            if status_code == 429 else
+            "The server is busy. Please try again shortly."
+        )
+        return APIError(
+            error_code=ErrorCode.SERVER_BUSY,
+            message=message,
+            details={"reason": reason, "retry_after": self.retry_after_seconds}
+        )
+
+    @contextmanager
+    def run(self) -> Iterator[None]:
+        """Count an admitted run for as long as it (and its stream) lasts."""
+        self.admitted += 1
+        self.inflight_runs += 1
+        try:
+            yield
+        finally:
+            self.inflight_runs -= 1
+
+    @contextmanager
+    def upstream_call(self) -> Iterator[None]:
+        """Count an upstream request while it is pending."""
+        self.pending_upstream += 1
+        try:
+            yield
+        finally:
+            self.pending_upstream -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "loop_lag_ms": round(self.loop_lag_ms, 1),
+            "inflight_runs": self.inflight_runs,
+            "pending_upstream": self.pending_upstream,
+            "limits": {
+                "loop_lag_ms": self.max_loop_lag_ms,
+                "inflight_runs": self.max_inflight_runs,
+                "pending_upstream": self.max_pending_upstream,
+            },
+            "load": round(self.load(), 3),
+            "brownout": {
+                "enabled": self.brownout_enabled,
+                "level": self._level,
+                "thresholds": list(self.brownout_thresholds),
+                "hysteresis": self.brownout_hysteresis,
+                "transitions": self.brownout_transitions,
+                "degraded_runs": dict(self.degraded_runs),
+            },
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "shed_total": sum(self.shed.values()),
+        }
+
+
+_admission_controller = AdmissionController(enabled=ADMISSION_ENABLED)
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller."""
+    return _admission_controller
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that sheds new council runs when the controller says so."""
+
+    def __init__(self, app: Any, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or get_admission_controller()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or not RUN_PATH_PATTERN.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        decision = self.controller.check()
+        if decision is not None:
+            reason, status_code = decision
+            response = JSONResponse(
+                status_code=status_code,
+                content=self.controller.reject(reason, status_code).model_dump(),
+                headers={"Retry-After": str(self.controller.retry_after_seconds)}
+            )
+            await response(scope, receive, send)
+            return
+
+        with self.controller.run():
+            await self.app(scope, receive, send)
@@ -0,0 +1,203 @@
+"""
+Cassette record/replay for upstream OpenRouter traffic.
+
+Every upstream HTTP exchange made by query_model, _request_vision_model and
+get_free_models goes through upstream_request(). In "record" mode the
+response status, body and latency are appended to a gzip'd JSON Lines
+cassette, keyed by a hash of the request (the API key is never part of the
+key or the file). In "replay" mode the same requests are answered from the
+cassette after sleeping for the recorded latency times a scale factor, so a
+change to the council orchestration can be benchmarked against identical
+traffic.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .admission import get_admission_controller
+from .config import CASSETTE_MODE, CASSETTE_PATH, CASSETTE_LATENCY_SCALE
+
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(RuntimeError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+@dataclass
+class RecordedResponse:
+    """Minimal stand-in for httpx.Response when replaying."""
+    status_code: int
+    text: str
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+def request_key(kind: str, method: str, url: str, body: Any = None) -> str:
+    """Stable hash identifying an upstream request (headers are excluded)."""
+    hasher = hashlib.sha256()
+    hasher.update(f"{kind}\n{method.upper()}\n{url}\n".encode("utf-8"))
+    if isinstance(body, (bytes, bytearray)):
+        hasher.update(body)
+    elif body is not None:
+        hasher.update(json.dumps(body, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class Cassette:
+    """A set of recorded upstream exchanges backed by a gzip'd JSONL file."""
+
+    def __init__(self, path: str, mode: str = "off", latency_scale: float = 1.0):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}'. Expected one of {CASSETTE_MODES}.")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.cursors: Dict[str, int] = defaultdict(int)
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "hits": 0, "misses": 0})
+        if mode == "replay":
+            self.load()
+
+    def load(self) -> None:
+        """Load recorded entries from disk, grouped by request key."""
+        self.entries.clear()
+        self.cursors.clear()
+        if not os.path.exists(self.path):
+            print(f"Cassette {self.path} not found; every replayed request will miss")
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    self.entries[entry["key"]].append(entry)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self.entries[entry["key"]].append(entry)
+
+    def _next_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return recorded entries for a key in order, repeating the last one."""
+        recorded = self.entries.get(key)
+        if not recorded:
+            return None
+        index = min(self.cursors[key], len(recorded) - 1)
+        self.cursors[key] += 1
+        return recorded[index]
+
+    def rewind(self) -> None:
+        """Restart replay from the first recorded entry of every key."""
+        self.cursors.clear()
+
+    def reset_stats(self) -> None:
+        self.stats.clear()
+
+    async def request(
+        self,
+        kind: str,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        **kwargs: Any
+    ) -> Any:
+        """Perform (or replay) one upstream request and return the response."""
+        if self.mode == "off":
+            return await client.request(method, url, **kwargs)
+
+        body = kwargs.get("json") if "json" in kwargs else kwargs.get("content")
+        key = request_key(kind, method, url, body)
+        stats = self.stats[kind]
+        stats["calls"] += 1
+
+        if self.mode == "replay":
+            entry = self._next_entry(key)
+            if entry is None:
+                stats["misses"] += 1
+                raise CassetteMiss(f"No recorded {kind} response for request {key[:12]}")
+            stats["hits"] += 1
+            delay = entry.get("latency", 0.0) * self.latency_scale
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if entry.get("error") == "timeout":
+                raise httpx.TimeoutException(f"Recorded timeout for {kind}")
+            if entry.get("error"):
+                raise RuntimeError(entry["error"])
+            return RecordedResponse(status_code=entry["status"], text=entry["text"])
+
+        # Record mode: perform the live request and append the exchange
+        model = body.get("model") if isinstance(body, dict) else None
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TimeoutException:
+            self._append({
+                "key": key, "kind": kind, "model": model,
+                "latency": round(time.perf_counter() - started, 4), "error": "timeout"
+            })
+            raise
+        except Exception as e:
+            self._append({
+                "key": key, "kind": kind, "model": model,
+                "latency": round(time.perf_counter() - started, 4), "error": str(e) or type(e).__name__
+            })
+            raise
+        self._append({
+            "key": key, "kind": kind, "model": model,
+            "latency": round(time.perf_counter() - started, 4),
+            "status": response.status_code, "text": response.text
+        })
+        return response
+
+
+_active_cassette = Cassette(
+    CASSETTE_PATH,
+    CASSETTE_MODE if CASSETTE_MODE in CASSETTE_MODES else "off",
+    CASSETTE_LATENCY_SCALE
+)
+
+
+def get_cassette() -> Cassette:
+    """Return the process-wide cassette."""
+    return _active_cassette
+
+
+def configure_cassette(
+    mode: str,
+    path: Optional[str] = None,
+    latency_scale: Optional[float] = None
+) -> Cassette:
+    """Replace the process-wide cassette (used by the benchmark harness)."""
+    global _active_cassette
+    _active_cassette = Cassette(
+        path or _active_cassette.path,
+        mode,
+        _active_cassette.latency_scale if latency_scale is None else latency_scale
+    )
+    return _active_cassette
+
+
+async def upstream_request(
+    kind: str,
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    **kwargs: Any
+) -> Any:
+    """Send an upstream request through the active cassette."""
+    with get_admission_controller().upstream_call():
+        return await _active_cassette.request(kind, client, method, url, **kwargs)
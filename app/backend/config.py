@@ -20,4 +20,181 @@ COUNCIL_MODELS = [
 CHAIRMAN_MODEL = "arcee-ai/trinity-mini:free"
 
 # OpenRouter API endpoint
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
\ No newline at end of file
+OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+# Cassette record/replay of upstream traffic for deterministic benchmarks.
+# "off" talks to OpenRouter normally, "record" also writes every upstream
+# exchange to CASSETTE_PATH, "replay" serves them back without the network.
+CASSETTE_MODE = os.getenv("COUNCIL_CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.getenv("COUNCIL_CASSETTE_PATH", "data/cassettes/council.jsonl.gz")
+# Multiplier applied to recorded latencies on replay (0 = no delay)
+CASSETTE_LATENCY_SCALE = float(os.getenv("COUNCIL_CASSETTE_LATENCY_SCALE", "1.0"))
+
+# Model leaderboard: running mean rank updated from every Stage 2 round
+LEADERBOARD_ENABLED = os.getenv("LEADERBOARD_ENABLED", "true").lower() == "true"
+LEADERBOARD_PATH = os.getenv("LEADERBOARD_PATH", "data/leaderboard.json")
+LEADERBOARD_FLUSH_SECONDS = float(os.getenv("LEADERBOARD_FLUSH_SECONDS", "5"))  # Debounce of the JSON file write
+
+# Auto council: drop members that are consistently ranked last or are slow
+# for their quality (needs AUTO_COUNCIL_MIN_SAMPLES rounds per model first)
+AUTO_COUNCIL_DEFAULT = os.getenv("AUTO_COUNCIL", "false").lower() == "true"
+AUTO_COUNCIL_MIN_MEMBERS = int(os.getenv("AUTO_COUNCIL_MIN_MEMBERS", "2"))
+AUTO_COUNCIL_MIN_SAMPLES = int(os.getenv("AUTO_COUNCIL_MIN_SAMPLES", "5"))
+AUTO_COUNCIL_LAST_PLACE_RATE = float(os.getenv("AUTO_COUNCIL_LAST_PLACE_RATE", "0.6"))
+AUTO_COUNCIL_SLOW_FACTOR = float(os.getenv("AUTO_COUNCIL_SLOW_FACTOR", "2.0"))
+
+# Consensus short-circuit: when every pair of Stage 1 answers is at least
+# CONSENSUS_THRESHOLD similar (MinHash estimate of shingle Jaccard) and their
+# opening sentences have the same polarity, skip Stage 2 and give the chairman
+# a lighter prompt. Shingles of 2+ words keep "not prime" apart from "prime".
+CONSENSUS_ENABLED = os.getenv("CONSENSUS_ENABLED", "false").lower() == "true"
+CONSENSUS_THRESHOLD = float(os.getenv("CONSENSUS_THRESHOLD", "0.6"))
+CONSENSUS_SHINGLE_SIZE = max(2, int(os.getenv("CONSENSUS_SHINGLE_SIZE", "2")))
+
+# Latency tiers: "fast" (Stage 1 + chairman, ranking in the background),
+# "balanced" (early quorum + compact ranking) or "thorough" (all 3 stages)
+DEFAULT_COUNCIL_MODE = os.getenv("COUNCIL_MODE", "thorough").lower()
+# Share of members that must answer before fast/balanced stages stop waiting
+QUORUM_FRACTION = float(os.getenv("QUORUM_FRACTION", "0.75"))
+QUORUM_GRACE_SECONDS = float(os.getenv("QUORUM_GRACE_SECONDS", "3.0"))
+# Per-response character cap in the compact (balanced) ranking prompt
+COMPACT_RANKING_CHARS = int(os.getenv("COMPACT_RANKING_CHARS", "1500"))
+# The compact prompt asks for the ranking list only, so it gets a tight cap
+# (unless the request's Stage 2 max_tokens is lower) and low reasoning effort
+COMPACT_RANKING_MAX_TOKENS = int(os.getenv("COMPACT_RANKING_MAX_TOKENS", "512"))
+# Run Stage 2 in the background while the chairman answers in fast mode
+FAST_MODE_BACKGROUND_RANKING = os.getenv("FAST_MODE_BACKGROUND_RANKING", "true").lower() == "true"
+
+# Completed runs kept in memory for POST /api/runs/{id}/resynthesize
+RUN_STORE_MAX_RUNS = int(os.getenv("RUN_STORE_MAX_RUNS", "200"))
+RUN_STORE_TTL_SECONDS = float(os.getenv("RUN_STORE_TTL_SECONDS", "3600"))
+
+# Per-stage generation budgets sent with every upstream call (0 = no cap).
+# Reasoning effort is "low", "medium", "high" or "" to leave it to the model;
+# hidden reasoning is excluded from responses unless REASONING_EXCLUDE=false.
+# Stages 1 and 2 are uncapped by default: max_tokens includes reasoning
+# tokens, and a cut-off review loses its FINAL RANKING section.
+STAGE1_MAX_TOKENS = int(os.getenv("STAGE1_MAX_TOKENS", "0"))
+STAGE2_MAX_TOKENS = int(os.getenv("STAGE2_MAX_TOKENS", "0"))
+STAGE3_MAX_TOKENS = int(os.getenv("STAGE3_MAX_TOKENS", "4096"))
+STAGE1_REASONING_EFFORT = os.getenv("STAGE1_REASONING_EFFORT", "").lower()
+STAGE2_REASONING_EFFORT = os.getenv("STAGE2_REASONING_EFFORT", "").lower()
+STAGE3_REASONING_EFFORT = os.getenv("STAGE3_REASONING_EFFORT", "medium").lower()
+REASONING_EXCLUDE = os.getenv("REASONING_EXCLUDE", "true").lower() == "true"
+
+# Context-window guard: estimate prompt tokens locally and compare them with
+# the catalogue's context_length before dispatch, rerouting to a larger-context
+# fallback or compacting the prompt instead of waiting for an upstream error
+CONTEXT_GUARD_ENABLED = os.getenv("CONTEXT_GUARD_ENABLED", "true").lower() == "true"
+CONTEXT_CHARS_PER_TOKEN = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "3.5"))
+# Share of the context window a prompt plus max_tokens may use
+CONTEXT_SAFETY_MARGIN = float(os.getenv("CONTEXT_SAFETY_MARGIN", "0.9"))
+
+# Vision extraction cache keyed by SHA-256 of the image bytes and prompt version.
+# The memory tier is an LRU; set VISION_CACHE_DIR to also keep results on disk.
+VISION_CACHE_ENABLED = os.getenv("VISION_CACHE_ENABLED", "true").lower() == "true"
+VISION_CACHE_MAX_ENTRIES = int(os.getenv("VISION_CACHE_MAX_ENTRIES", "256"))
+VISION_CACHE_DIR = os.getenv("VISION_CACHE_DIR", "")
+
+# Image preprocessing before vision calls (needs Pillow; skipped without it):
+# cap the longest edge, re-encode and drop EXIF metadata
+VISION_PREPROCESS_ENABLED = os.getenv("VISION_PREPROCESS_ENABLED", "true").lower() == "true"
+VISION_MAX_EDGE = int(os.getenv("VISION_MAX_EDGE", "1600"))
+VISION_IMAGE_FORMAT = os.getenv("VISION_IMAGE_FORMAT", "JPEG").upper()  # JPEG or WEBP
+VISION_IMAGE_QUALITY = int(os.getenv("VISION_IMAGE_QUALITY", "85"))
+
+# Vision model racing: start the next vision model if the current ones have not
+# answered within VISION_RACE_STAGGER_SECONDS, keep the first answer whose
+# parsed confidence reaches VISION_ACCEPT_CONFIDENCE and cancel the rest.
+# With racing disabled, models are tried one after another as before.
+VISION_RACE_ENABLED = os.getenv("VISION_RACE_ENABLED", "true").lower() == "true"
+VISION_RACE_STAGGER_SECONDS = float(os.getenv("VISION_RACE_STAGGER_SECONDS", "8.0"))
+VISION_ACCEPT_CONFIDENCE = float(os.getenv("VISION_ACCEPT_CONFIDENCE", "0.6"))
+
+# Stream the vision answer on the SSE endpoint and start the council as soon
+# as the extracted text and key entities are complete
+VISION_STREAMING_ENABLED = os.getenv("VISION_STREAMING_ENABLED", "true").lower() == "true"
+# Total time the streamed answer may take. While nothing usable has arrived,
+# the fallback models are raced alongside the stream after
+# VISION_RACE_STAGGER_SECONDS, as in the non-streaming path.
+VISION_STREAM_DEADLINE_SECONDS = float(os.getenv("VISION_STREAM_DEADLINE_SECONDS", "90.0"))
+
+# Multi-image requests (e.g. a problem photographed across several pages)
+VISION_MAX_IMAGES = int(os.getenv("VISION_MAX_IMAGES", "5"))
+VISION_MAX_CONCURRENCY = int(os.getenv("VISION_MAX_CONCURRENCY", "3"))
+# Total characters of extracted text across all pages in the council prompt
+VISION_PROMPT_MAX_CHARS = int(os.getenv("VISION_PROMPT_MAX_CHARS", "24000"))
+
+# Largest image accepted per upload, enforced while reading or before decoding
+VISION_MAX_IMAGE_BYTES = int(os.getenv("VISION_MAX_IMAGE_BYTES", str(20 * 1024 * 1024)))
+
+# Document extraction (PDF/DOCX) runs in a process pool so parsing never
+# blocks the event loop; a job past the timeout has its worker killed
+EXTRACT_POOL_SIZE = int(os.getenv("EXTRACT_POOL_SIZE", "2"))
+EXTRACT_MAX_QUEUE = int(os.getenv("EXTRACT_MAX_QUEUE", "16"))
+EXTRACT_TIMEOUT_SECONDS = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", "30"))
+
+# Extraction cache keyed by document SHA-256: an in-memory LRU plus an SQLite
+# file (set EXTRACT_CACHE_PATH to "" to keep it in memory only) that evicts
+# the least recently used entries beyond EXTRACT_CACHE_MAX_BYTES
+EXTRACT_CACHE_ENABLED = os.getenv("EXTRACT_CACHE_ENABLED", "true").lower() == "true"
+EXTRACT_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACT_CACHE_MAX_ENTRIES", "64"))
+EXTRACT_CACHE_PATH = os.getenv("EXTRACT_CACHE_PATH", "data/extract_cache.sqlite3")
+EXTRACT_CACHE_MAX_BYTES = int(os.getenv("EXTRACT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Retrieval over uploaded documents: messages that reference a document_id get
+# the BM25 top-k chunks for the question instead of the whole (truncated) text
+RETRIEVAL_MAX_CHARS = int(os.getenv("RETRIEVAL_MAX_CHARS", "1000000"))  # Text indexed per document
+RETRIEVAL_CHUNK_CHARS = int(os.getenv("RETRIEVAL_CHUNK_CHARS", "1200"))
+RETRIEVAL_CHUNK_OVERLAP = int(os.getenv("RETRIEVAL_CHUNK_OVERLAP", "200"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "3000"))
+RETRIEVAL_MAX_DOCUMENTS = int(os.getenv("RETRIEVAL_MAX_DOCUMENTS", "32"))
+RETRIEVAL_EXTRACT_TIMEOUT_SECONDS = float(os.getenv("RETRIEVAL_EXTRACT_TIMEOUT_SECONDS", "120"))
+
+# OCR of scanned PDF pages (no text layer) through the vision models; needs
+# the optional pypdfium2 and Pillow packages to render pages
+OCR_ENABLED = os.getenv("OCR_ENABLED", "true").lower() == "true"
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "20"))
+OCR_RENDER_SCALE = float(os.getenv("OCR_RENDER_SCALE", "2.0"))  # 1.0 = 72 DPI
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", str(VISION_MAX_CONCURRENCY)))
+# Chat-completions URL for vision calls; point it at a stand-in server to test offline
+VISION_API_URL = os.getenv("VISION_API_URL", OPENROUTER_API_URL)
+
+# Batch document extraction (/api/files/extract/batch)
+EXTRACT_BATCH_MAX_FILES = int(os.getenv("EXTRACT_BATCH_MAX_FILES", "10"))
+EXTRACT_BATCH_MAX_BYTES = int(os.getenv("EXTRACT_BATCH_MAX_BYTES", str(25 * 1024 * 1024)))  # Total across files
+
+# Admission control: new council runs are rejected with a Retry-After (429 when
+# too many runs are in flight, 503 when the event loop lags or too many
+# upstream calls are pending) instead of being accepted and timing out later
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_LOOP_LAG_MS = float(os.getenv("ADMISSION_MAX_LOOP_LAG_MS", "250"))
+ADMISSION_MAX_INFLIGHT_RUNS = int(os.getenv("ADMISSION_MAX_INFLIGHT_RUNS", "32"))
+ADMISSION_MAX_PENDING_UPSTREAM = int(os.getenv("ADMISSION_MAX_PENDING_UPSTREAM", "128"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+
+# Brownout: past these fractions of the admission limits, new runs use at most
+# BROWNOUT_REDUCED_MEMBERS members and no LLM title (level 1), then
+# also skip Stage 2 (level 2). A level is left once load stays
+# BROWNOUT_HYSTERESIS below its threshold for BROWNOUT_HOLD_SECONDS
+BROWNOUT_ENABLED = os.getenv("BROWNOUT_ENABLED", "true").lower() == "true"
+BROWNOUT_LEVEL1_LOAD = float(os.getenv("BROWNOUT_LEVEL1_LOAD", "0.5"))
+BROWNOUT_LEVEL2_LOAD = float(os.getenv("BROWNOUT_LEVEL2_LOAD", "0.75"))
+BROWNOUT_HYSTERESIS = float(os.getenv("BROWNOUT_HYSTERESIS", "0.15"))
+BROWNOUT_HOLD_SECONDS = float(os.getenv("BROWNOUT_HOLD_SECONDS", "10"))
+BROWNOUT_REDUCED_MEMBERS = int(os.getenv("BROWNOUT_REDUCED_MEMBERS", "2"))
+
+# Conversation titles are extracted locally from the first message; with
+# TITLE_LLM_UPGRADE a model is asked instead when the local confidence is
+# below TITLE_MIN_CONFIDENCE
+TITLE_MAX_WORDS = int(os.getenv("TITLE_MAX_WORDS", "5"))
+TITLE_LLM_UPGRADE = os.getenv("TITLE_LLM_UPGRADE", "false").lower() == "true"
+TITLE_MIN_CONFIDENCE = float(os.getenv("TITLE_MIN_CONFIDENCE", "0.5"))
+
+# WebSocket transport (/ws): concurrent runs per connection, events queued
+# for a connection before its runs pause, and how long one send may block
+# before a client that stopped reading is disconnected
+WS_MAX_RUNS = int(os.getenv("WS_MAX_RUNS", "4"))
+WS_MAX_BUFFERED_EVENTS = int(os.getenv("WS_MAX_BUFFERED_EVENTS", "64"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "30"))
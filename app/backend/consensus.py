@@ -0,0 +1,134 @@
+"""
+Local agreement check over Stage 1 answers.
+
+Each answer is reduced to a bottom-k MinHash sketch of its word shingles
+(stopwords and markdown removed), and pairwise Jaccard similarity is
+estimated from the sketches. No network calls are made, so the check costs
+a few milliseconds and decides whether Stage 2 can be skipped.
+
+Negations are kept in the shingles, but one "not" changes only a couple of
+shingles in a long answer. So answers must also share the polarity of
+their opening sentence (a leading yes/no, or an odd number of negations):
+"91 is prime." and "91 is not prime." never agree.
+"""
+
+import hashlib
+import heapq
+import re
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from .config import CONSENSUS_ENABLED, CONSENSUS_THRESHOLD, CONSENSUS_SHINGLE_SIZE
+
+SKETCH_SIZE = 128
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an the and or but if then so of to in on at by for with from as is are was were be been being
+it its this that these those there here which who whom what when where why how do does did
+can could should would will shall may might must i you we they he she them our your
+their his her my me us also than too very just into over under about more most such only each
+""".split())
+
+# Kept out of STOPWORDS: they flip the meaning of an answer
+NEGATIONS = frozenset("""
+not no never none nor neither nothing cannot can't isn't aren't wasn't weren't don't doesn't didn't
+won't wouldn't shouldn't couldn't hasn't haven't hadn't
+""".split())
+
+_SENTENCE_END = re.compile(r"[.!?](?:\s|$)|\n")
+
+
+def _shingles(text: str, size: int) -> List[str]:
+    tokens = [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+    if len(tokens) < size:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+def answer_polarity(text: str) -> str:
+    """
+    Polarity of an answer's opening sentence.
+
+    Returns:
+        "yes" or "no" when the sentence starts with one, otherwise
+        "negative" for an odd number of negations and "positive" for an even one
+    """
+    opening = next((s for s in _SENTENCE_END.split(text.lower()) if s.strip()), "")
+    tokens = _TOKEN_PATTERN.findall(opening)
+    if tokens and tokens[0] in ("yes", "no"):
+        return tokens[0]
+    return "negative" if sum(1 for t in tokens if t in NEGATIONS) % 2 else "positive"
+
+
+def _hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash_sketch(text: str, shingle_size: int = CONSENSUS_SHINGLE_SIZE, k: int = SKETCH_SIZE) -> FrozenSet[int]:
+    """Bottom-k MinHash sketch: the k smallest shingle hashes of the text."""
+    hashes = {_hash(s) for s in _shingles(text, shingle_size)}
+    return frozenset(heapq.nsmallest(k, hashes))
+
+
+def sketch_similarity(a: FrozenSet[int], b: FrozenSet[int], k: int = SKETCH_SIZE) -> float:
+    """Estimate Jaccard similarity of the shingle sets behind two sketches."""
+    if not a and not b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    union_bottom = heapq.nsmallest(k, a | b)
+    shared = sum(1 for h in union_bottom if h in a and h in b)
+    return shared / len(union_bottom)
+
+
+def similarity_matrix(texts: List[str], shingle_size: int = CONSENSUS_SHINGLE_SIZE) -> List[List[float]]:
+    """Symmetric matrix of estimated pairwise similarities."""
+    sketches = [minhash_sketch(t, shingle_size) for t in texts]
+    n = len(sketches)
+    matrix = [[1.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            matrix[i][j] = matrix[j][i] = round(sketch_similarity(sketches[i], sketches[j]), 4)
+    return matrix
+
+
+def check_consensus(
+    stage1_results: List[Dict[str, Any]],
+    enabled: Optional[bool] = None,
+    threshold: float = CONSENSUS_THRESHOLD
+) -> Dict[str, Any]:
+    """
+    Decide whether the Stage 1 answers agree closely enough to skip Stage 2.
+
+    Agreement requires at least two answers, every pairwise similarity at
+    or above the threshold and the same answer_polarity for every answer.
+    The representative is the answer with the highest mean similarity to
+    the others.
+
+    Returns:
+        Dict with 'agreed', 'threshold', similarity stats, the matrix and the
+        index of the representative answer
+    """
+    enabled = CONSENSUS_ENABLED if enabled is None else enabled
+    info: Dict[str, Any] = {"enabled": enabled, "agreed": False, "threshold": threshold}
+    if not enabled or len(stage1_results) < 2:
+        return info
+
+    texts = [r.get("response", "") for r in stage1_results]
+    matrix = similarity_matrix(texts)
+    n = len(matrix)
+    pairs = [matrix[i][j] for i in range(n) for j in range(i + 1, n)]
+    mean_to_others = [(sum(row) - 1.0) / (n - 1) for row in matrix]
+    polarities = [answer_polarity(t) for t in texts]
+
+    info.update({
+        "agreed": min(pairs) >= threshold and len(set(polarities)) == 1,
+        "polarity": polarities,
+        "min_similarity": min(pairs),
+        "mean_similarity": round(sum(pairs) / len(pairs), 4),
+        "models": [r["model"] for r in stage1_results],
+        "matrix": matrix,
+        "representative": max(range(n), key=lambda i: mean_to_others[i]),
+    })
+    return info
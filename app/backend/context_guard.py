@@ -0,0 +1,123 @@
+"""
+Pre-dispatch context-window guard.
+
+Prompt size is estimated locally from its character count and compared with
+the context_length the model catalogue reports (see normalize_model). A
+request that cannot fit is routed to a fallback with a larger window, or the
+caller compacts the prompt, before the first upstream call instead of after
+an upstream error or timeout. Models missing from the cached catalogue are
+dispatched unchanged.
+"""
+
+import asyncio
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import CONTEXT_GUARD_ENABLED, CONTEXT_CHARS_PER_TOKEN, CONTEXT_SAFETY_MARGIN
+from .openrouter import FALLBACK_MODELS, MODEL_CACHE, cached_context_lengths, get_free_models
+
+# Role markers and separators added per chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_catalogue_refresh: Optional[asyncio.Task] = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token estimate from the character count."""
+    return math.ceil(len(text) / CONTEXT_CHARS_PER_TOKEN) if text else 0
+
+
+def estimate_message_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimated prompt tokens of a chat-completion message list."""
+    return sum(estimate_tokens(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def usable_tokens(model: str) -> Optional[int]:
+    """Tokens a request to the model may use in total, or None if unknown."""
+    context_length = cached_context_lengths().get(model)
+    if not context_length:
+        return None
+    return int(context_length * CONTEXT_SAFETY_MARGIN)
+
+
+def fits(model: str, prompt_tokens: int, max_tokens: Optional[int] = None) -> Optional[bool]:
+    """Whether prompt plus completion fit the model's window (None if unknown)."""
+    usable = usable_tokens(model)
+    if usable is None:
+        return None
+    return prompt_tokens + (max_tokens or 0) <= usable
+
+
+def warm_catalogue() -> None:
+    """Start a background catalogue fetch if no context lengths are cached yet."""
+    global _catalogue_refresh
+    if not CONTEXT_GUARD_ENABLED or MODEL_CACHE["context_lengths"]:
+        return
+    if _catalogue_refresh is None or _catalogue_refresh.done():
+        _catalogue_refresh = asyncio.create_task(get_free_models())
+
+
+def larger_context_fallback(
+    prompt_tokens: int,
+    max_tokens: Optional[int] = None,
+    exclude: Iterable[str] = ()
+) -> Optional[str]:
+    """First fallback model known to fit the request, skipping excluded ones."""
+    excluded = set(exclude)
+    for model in FALLBACK_MODELS:
+        if model not in excluded and fits(model, prompt_tokens, max_tokens):
+            return model
+    return None
+
+
+def route_models(
+    stage: str,
+    models: List[str],
+    messages: List[Dict[str, Any]],
+    max_tokens: Optional[int] = None,
+    decisions: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, str]:
+    """
+    Map each requested model to the model that should receive the request.
+
+    Models whose window is too small are replaced by a larger-context
+    fallback (each fallback used at most once); when none fits the model is
+    kept and the attempt is recorded as over the limit.
+
+    Args:
+        stage: Stage name recorded with each decision
+        models: Requested model ids
+        messages: The messages every model will receive
+        max_tokens: Completion budget reserved in the window
+        decisions: Optional list that non-trivial decisions are appended to
+
+    Returns:
+        Dict mapping requested model id to the model id to query
+    """
+    routing = {model: model for model in models}
+    if not CONTEXT_GUARD_ENABLED:
+        return routing
+
+    prompt_tokens = estimate_message_tokens(messages)
+    in_use = set(models)
+    for model in models:
+        if fits(model, prompt_tokens, max_tokens) is not False:
+            continue
+        fallback = larger_context_fallback(prompt_tokens, max_tokens, exclude=in_use)
+        decision = {
+            "stage": stage,
+            "model": model,
+            "estimated_tokens": prompt_tokens,
+            "max_tokens": max_tokens,
+            "context_length": cached_context_lengths().get(model),
+        }
+        if fallback:
+            in_use.add(fallback)
+            routing[model] = fallback
+            decision.update({"action": "reroute", "routed_to": fallback})
+            print(f"Context guard: {model} too small for ~{prompt_tokens} tokens, using {fallback}")
+        else:
+            decision["action"] = "over_limit"
+        if decisions is not None:
+            decisions.append(decision)
+    return routing
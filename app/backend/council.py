@@ -1,8 +1,42 @@
 """3-stage LLM Council orchestration."""
 
-from typing import List, Dict, Any, Tuple, Optional
+import asyncio
+import math
+import time
+from dataclasses import dataclass, replace
+from typing import List, Dict, Any, Tuple, Optional, AsyncIterator, Set
 from .openrouter import query_models_parallel_with_fallbacks, query_model_with_fallback
-from .config import COUNCIL_MODELS, CHAIRMAN_MODEL
+from .config import (
+    COUNCIL_MODELS,
+    CHAIRMAN_MODEL,
+    AUTO_COUNCIL_DEFAULT,
+    DEFAULT_COUNCIL_MODE,
+    QUORUM_FRACTION,
+    QUORUM_GRACE_SECONDS,
+    COMPACT_RANKING_CHARS,
+    COMPACT_RANKING_MAX_TOKENS,
+    FAST_MODE_BACKGROUND_RANKING,
+    CONTEXT_GUARD_ENABLED,
+)
+from .leaderboard import get_leaderboard
+from .consensus import check_consensus
+from .errors import ErrorCode
+from .admission import Degradation
+from .context_guard import (
+    estimate_message_tokens,
+    fits,
+    larger_context_fallback,
+    route_models,
+    warm_catalogue,
+)
+from .generation import GenerationParams, STAGE_DEFAULTS, apply_overrides, resolve_generation
+from .run_store import RunRecord, get_run_store, new_run_id, hash_api_key
+from .ranking import (
+    response_label,
+    parse_ranking_from_text,
+    calculate_aggregate_rankings,
+    aggregate_agreement,
+)
 
 
 async def stage1_collect_responses(
@@ -10,7 +44,11 @@ async def stage1_collect_responses(
     council_members: List[str],
     api_key: Optional[str] = None,
     system_prompt: Optional[str] = None,
-    history: Optional[List[Dict[str, str]]] = None
+    history: Optional[List[Dict[str, str]]] = None,
+    quorum: Optional[int] = None,
+    quorum_grace: float = 0.0,
+    generation: Optional[GenerationParams] = None,
+    context_log: Optional[List[Dict[str, Any]]] = None
 ) -> List[Dict[str, Any]]:
     """
     Stage 1: Collect individual responses from all council models.
@@ -19,6 +57,9 @@ async def stage1_collect_responses(
         user_query: The user's question
         council_members: List of model IDs to query
         api_key: Optional OpenRouter API key
+        quorum: Stop waiting once this many models answered (plus quorum_grace seconds)
+        generation: Token and reasoning budget (defaults to the Stage 1 config)
+        context_log: Optional list that context-guard decisions are appended to
 
     Returns:
         List of dicts with 'model' and 'response' keys
@@ -30,13 +71,24 @@ async def stage1_collect_responses(
     messages.extend(history)
     messages.append({"role": "user", "content": user_query})
 
+    # Route members whose context window is too small before dispatch
+    generation = generation or STAGE_DEFAULTS["stage1"]
+    routing = route_models("stage1", council_members, messages, generation.max_tokens, context_log)
+    requested_for = {routed: requested for requested, routed in routing.items()}
+
     # Query all models in parallel with fallbacks
-    responses = await query_models_parallel_with_fallbacks(council_members, messages, api_key=api_key)
+    responses = await query_models_parallel_with_fallbacks(
+        list(routing.values()), messages, api_key=api_key, quorum=quorum, quorum_grace=quorum_grace,
+        generation=generation
+    )
 
     # Format results
+    leaderboard = get_leaderboard()
     stage1_results = []
-    for requested_model, data in responses.items():
+    for routed_model, data in responses.items():
+        requested_model = requested_for[routed_model]
         if data["message"] is not None:  # Only include successful responses
+            leaderboard.record_latency(data["model_used"], data["latency_ms"])
             stage1_results.append({
                 "model": data["model_used"],
                 "original_model": requested_model if data["model_used"] != requested_model else None,
@@ -46,36 +98,37 @@ async def stage1_collect_responses(
     return stage1_results
 
 
-async def stage2_collect_rankings(
+def build_ranking_prompt(
     user_query: str,
     stage1_results: List[Dict[str, Any]],
-    council_members: List[str],
-    api_key: Optional[str] = None
-) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    compact: bool = False
+) -> Tuple[str, Dict[str, str]]:
     """
-    Stage 2: Each model ranks the anonymized responses.
+    Build the Stage 2 ranking prompt with anonymized response labels.
 
     Args:
         user_query: The original user query
         stage1_results: Results from Stage 1
-        council_members: List of model IDs to query for rankings
-        api_key: Optional OpenRouter API key
+        compact: Shorten each response and ask for the ranking list only
 
     Returns:
-        Tuple of (rankings list, label_to_model mapping)
+        Tuple of (ranking prompt, label_to_model mapping)
     """
-    # Create anonymized labels for responses (Response A, Response B, etc.)
-    labels = [chr(65 + i) for i in range(len(stage1_results))]  # A, B, C, ...
+    # Create anonymized labels for responses (Response A, ..., Response Z, Response AA, ...)
+    labels = [response_label(i) for i in range(len(stage1_results))]
 
     # Create mapping from label to model name
     label_to_model = {
-        f"Response {label}": result['model']
+        label: result['model']
         for label, result in zip(labels, stage1_results)
     }
 
+    if compact:
+        return _build_compact_ranking_prompt(user_query, labels, stage1_results), label_to_model
+
     # Build the ranking prompt
     responses_text = "\n\n".join([
-        f"Response {label}:\n{result['response']}"
+        f"{label}:\n{result['response']}"
         for label, result in zip(labels, stage1_results)
     ])
 
@@ -110,18 +163,125 @@ FINAL RANKING:
 
 Now provide your evaluation and ranking:"""
 
+    return ranking_prompt, label_to_model
+
+
+def _shorten(text: str, limit: Optional[int]) -> str:
+    """Cut text to limit characters, marking the cut."""
+    if limit is None or len(text) <= limit:
+        return text
+    return text[:limit] + " [...]"
+
+
+def _build_compact_ranking_prompt(
+    user_query: str,
+    labels: List[str],
+    stage1_results: List[Dict[str, Any]]
+) -> str:
+    """Ranking prompt with truncated responses and no per-response evaluation."""
+    responses_text = "\n\n".join([
+        f"{label}:\n{_shorten(result['response'], COMPACT_RANKING_CHARS)}"
+        for label, result in zip(labels, stage1_results)
+    ])
+
+    return f"""You are ranking different responses to the following question:
+
+Question: {user_query}
+
+Here are the responses from different models (anonymized, long responses are shortened):
+
+{responses_text}
+
+Rank the responses from best to worst for accuracy and insight. Reply with ONLY the ranking, formatted EXACTLY like this example:
+
+FINAL RANKING:
+1. Response C
+2. Response A
+3. Response B"""
+
+
+def _compact_ranking_generation(generation: GenerationParams) -> GenerationParams:
+    """Tight budget for the ranking-only prompt (the lower of the two caps)."""
+    caps = [cap for cap in (generation.max_tokens, COMPACT_RANKING_MAX_TOKENS) if cap]
+    return replace(
+        generation,
+        max_tokens=min(caps) if caps else None,
+        reasoning_effort=generation.reasoning_effort or "low"
+    )
+
+
+async def stage2_collect_rankings(
+    user_query: str,
+    stage1_results: List[Dict[str, Any]],
+    council_members: List[str],
+    api_key: Optional[str] = None,
+    compact: bool = False,
+    quorum: Optional[int] = None,
+    quorum_grace: float = 0.0,
+    generation: Optional[GenerationParams] = None,
+    context_log: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Stage 2: Each model ranks the anonymized responses.
+
+    Args:
+        user_query: The original user query
+        stage1_results: Results from Stage 1
+        council_members: List of model IDs to query for rankings
+        api_key: Optional OpenRouter API key
+        compact: Use the shorter ranking-only prompt
+        quorum: Stop waiting once this many rankings arrived (plus quorum_grace seconds)
+        generation: Token and reasoning budget (defaults to the Stage 2 config);
+            the compact prompt is capped at COMPACT_RANKING_MAX_TOKENS
+        context_log: Optional list that context-guard decisions are appended to
+
+    Returns:
+        Tuple of (rankings list, label_to_model mapping). A ranking without a
+        FINAL RANKING section (e.g. cut off by max_tokens) has an empty
+        parsed_ranking rather than one guessed from the review text.
+    """
+    generation = generation or STAGE_DEFAULTS["stage2"]
+    ranking_prompt, label_to_model = build_ranking_prompt(user_query, stage1_results, compact=compact)
+
     messages = [{"role": "user", "content": ranking_prompt}]
 
+    # Switch to the compact prompt if the full one cannot fit some member's window
+    if CONTEXT_GUARD_ENABLED and not compact:
+        prompt_tokens = estimate_message_tokens(messages)
+        too_small = [m for m in council_members if fits(m, prompt_tokens, generation.max_tokens) is False]
+        if too_small:
+            compact = True
+            ranking_prompt, label_to_model = build_ranking_prompt(user_query, stage1_results, compact=True)
+            messages = [{"role": "user", "content": ranking_prompt}]
+            if context_log is not None:
+                context_log.append({
+                    "stage": "stage2",
+                    "action": "compact",
+                    "models": too_small,
+                    "estimated_tokens": prompt_tokens,
+                    "compacted_tokens": estimate_message_tokens(messages),
+                })
+
+    if compact:
+        generation = _compact_ranking_generation(generation)
+
+    routing = route_models("stage2", council_members, messages, generation.max_tokens, context_log)
+    requested_for = {routed: requested for requested, routed in routing.items()}
+
     # Get rankings from all council models in parallel with fallbacks
     # We query the same council members who participated (or were requested) to verify each other
-    responses = await query_models_parallel_with_fallbacks(council_members, messages, api_key=api_key)
+    responses = await query_models_parallel_with_fallbacks(
+        list(routing.values()), messages, api_key=api_key, quorum=quorum, quorum_grace=quorum_grace,
+        generation=generation
+    )
 
     # Format results
     stage2_results = []
-    for requested_model, data in responses.items():
+    for routed_model, data in responses.items():
+        requested_model = requested_for[routed_model]
         if data["message"] is not None:
             full_text = data["message"].get('content', '')
-            parsed = parse_ranking_from_text(full_text)
+            parsed = parse_ranking_from_text(full_text, label_to_model, require_marker=True)
             stage2_results.append({
                 "model": data["model_used"],
                 "original_model": requested_model if data["model_used"] != requested_model else None,
@@ -132,45 +292,55 @@ Now provide your evaluation and ranking:"""
     return stage2_results, label_to_model
 
 
-async def stage3_synthesize_final(
+def build_chairman_prompt(
     user_query: str,
     stage1_results: List[Dict[str, Any]],
     stage2_results: List[Dict[str, Any]],
-    chairman_model: Optional[str] = None,
-    api_key: Optional[str] = None,
-    system_prompt: Optional[str] = None,
-    history: Optional[List[Dict[str, str]]] = None
-) -> Dict[str, Any]:
+    history: Optional[List[Dict[str, str]]] = None,
+    max_chars: Optional[int] = None
+) -> str:
     """
-    Stage 3: Chairman synthesizes final response.
+    Build the Stage 3 chairman prompt from all council responses and rankings.
 
     Args:
         user_query: The original user query
         stage1_results: Individual model responses from Stage 1
         stage2_results: Rankings from Stage 2
-        chairman_model: Optional specific model ID to use as chairman
-        api_key: Optional OpenRouter API key
+        history: Optional prior conversation messages
+        max_chars: Optional cap on each response and ranking (used to fit small context windows)
 
     Returns:
-        Dict with 'model' and 'response' keys
+        The chairman prompt
     """
-    # Determine which model to use as chairman
-    target_model = chairman_model or CHAIRMAN_MODEL
-
     # Build comprehensive context for chairman
     stage1_text = "\n\n".join([
-        f"Model: {result['model']}\nResponse: {result['response']}"
+        f"Model: {result['model']}\nResponse: {_shorten(result['response'], max_chars)}"
         for result in stage1_results
     ])
 
     stage2_text = "\n\n".join([
-        f"Model: {result['model']}\nRanking: {result['ranking']}"
+        f"Model: {result['model']}\nRanking: {_shorten(result['ranking'], max_chars)}"
         for result in stage2_results
     ])
 
     history = history or []
     history_context = "[Note: This is a follow-up question in an ongoing conversation.]\n\n" if history else ""
 
+    if not stage2_results:
+        # No peer review available (fast mode): synthesize from responses alone
+        return f"""{history_context}You are the Chairman of an LLM Council. Multiple AI models have independently provided responses to a user's question.
+
+Original Question: {user_query}
+
+Individual Responses:
+{stage1_text}
+
+Your task as Chairman is to synthesize these responses into a single, comprehensive, accurate answer to the user's original question. Consider:
+- The individual responses and their insights
+- Any patterns of agreement or disagreement
+
+Provide a clear, well-reasoned final answer that represents the council's collective wisdom:"""
+
     chairman_prompt = f"""{history_context}You are the Chairman of an LLM Council. Multiple AI models have provided responses to a user's question, and then ranked each other's responses.
 
 Original Question: {user_query}
@@ -188,114 +358,164 @@ Your task as Chairman is to synthesize all of this information into a single, co
 
 Provide a clear, well-reasoned final answer that represents the council's collective wisdom:"""
 
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.append({"role": "user", "content": chairman_prompt})
+    return chairman_prompt
 
-    # Query the chairman model with fallback
-    response, actual_model = await query_model_with_fallback(target_model, messages, api_key=api_key)
 
-    if response is None:
-        # Fallback if chairman fails completely across all fallbacks
-        return {
-            "model": target_model,
-            "original_model": None,
-            "response": "Error: Unable to generate final synthesis."
-        }
-
-    return {
-        "model": actual_model,
-        "original_model": target_model if actual_model != target_model else None,
-        "response": response.get('content', '')
-    }
-
-
-def parse_ranking_from_text(ranking_text: str) -> List[str]:
+def build_consensus_prompt(
+    user_query: str,
+    representative: Dict[str, Any],
+    agreeing_models: int,
+    history: Optional[List[Dict[str, str]]] = None
+) -> str:
     """
-    Parse the FINAL RANKING section from the model's response.
+    Build the lighter chairman prompt used when Stage 1 answers agree.
+
+    Only the most representative answer is included and Stage 2 is skipped.
 
     Args:
-        ranking_text: The full text response from the model
+        user_query: The original user query
+        representative: The Stage 1 result closest to all others
+        agreeing_models: Number of council members that agreed
+        history: Optional prior conversation messages
 
     Returns:
-        List of response labels in ranked order
+        The chairman prompt
     """
-    import re
-
-    # Look for "FINAL RANKING:" section
-    if "FINAL RANKING:" in ranking_text:
-        # Extract everything after "FINAL RANKING:"
-        parts = ranking_text.split("FINAL RANKING:")
-        if len(parts) >= 2:
-            ranking_section = parts[1]
-            # Try to extract numbered list format (e.g., "1. Response A")
-            # This pattern looks for: number, period, optional space, "Response X"
-            numbered_matches = re.findall(r'\d+\.\s*Response [A-Z]', ranking_section)
-            if numbered_matches:
-                # Extract just the "Response X" part
-                return [re.search(r'Response [A-Z]', m).group() for m in numbered_matches]
-
-            # Fallback: Extract all "Response X" patterns in order
-            matches = re.findall(r'Response [A-Z]', ranking_section)
-            return matches
-
-    # Fallback: try to find any "Response X" patterns in order
-    matches = re.findall(r'Response [A-Z]', ranking_text)
-    return matches
-
-
-def calculate_aggregate_rankings(
+    history = history or []
+    history_context = "[Note: This is a follow-up question in an ongoing conversation.]\n\n" if history else ""
+
+    return f"""{history_context}You are the Chairman of an LLM Council. {agreeing_models} AI models answered the user's question independently and their answers substantially agree. The most representative answer is shown below.
+
+Original Question: {user_query}
+
+Representative Answer:
+{representative['response']}
+
+Your task as Chairman is to deliver the council's final answer. Keep what is correct, fix anything that is wrong or unclear, and present it clearly and concisely:"""
+
+
+async def stage3_synthesize_final(
+    user_query: str,
+    stage1_results: List[Dict[str, Any]],
     stage2_results: List[Dict[str, Any]],
-    label_to_model: Dict[str, str]
-) -> List[Dict[str, Any]]:
+    chairman_model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    system_prompt: Optional[str] = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    consensus: Optional[Dict[str, Any]] = None,
+    generation: Optional[GenerationParams] = None,
+    context_log: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
     """
-    Calculate aggregate rankings across all models.
+    Stage 3: Chairman synthesizes final response.
 
     Args:
-        stage2_results: Rankings from each model
-        label_to_model: Mapping from anonymous labels to model names
+        user_query: The original user query
+        stage1_results: Individual model responses from Stage 1
+        stage2_results: Rankings from Stage 2
+        chairman_model: Optional specific model ID to use as chairman
+        api_key: Optional OpenRouter API key
+        consensus: Result of check_consensus; when agreed, a lighter prompt is used
+        generation: Token and reasoning budget (defaults to the Stage 3 config)
+        context_log: Optional list that context-guard decisions are appended to
 
     Returns:
-        List of dicts with model name and average rank, sorted best to worst
+        Dict with 'model' and 'response' keys
     """
-    from collections import defaultdict
-
-    # Track positions for each model
-    model_positions = defaultdict(list)
-
-    for ranking in stage2_results:
-        ranking_text = ranking['ranking']
-
-        # Parse the ranking from the structured format
-        parsed_ranking = parse_ranking_from_text(ranking_text)
-
-        for position, label in enumerate(parsed_ranking, start=1):
-            if label in label_to_model:
-                model_name = label_to_model[label]
-                model_positions[model_name].append(position)
-
-    # Calculate average position for each model
-    aggregate = []
-    for model, positions in model_positions.items():
-        if positions:
-            avg_rank = sum(positions) / len(positions)
-            aggregate.append({
-                "model": model,
-                "average_rank": round(avg_rank, 2),
-                "rankings_count": len(positions)
+    # Determine which model to use as chairman
+    target_model = chairman_model or CHAIRMAN_MODEL
+    generation = generation or STAGE_DEFAULTS["stage3"]
+    agreed = bool(consensus and consensus.get("agreed"))
+
+    def chairman_messages(max_chars: Optional[int] = None) -> List[Dict[str, str]]:
+        if agreed:
+            chairman_prompt = build_consensus_prompt(
+                user_query,
+                stage1_results[consensus["representative"]],
+                len(stage1_results),
+                history=history
+            )
+        else:
+            chairman_prompt = build_chairman_prompt(
+                user_query, stage1_results, stage2_results, history=history, max_chars=max_chars
+            )
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": chairman_prompt})
+        return messages
+
+    messages = chairman_messages()
+    query_target = target_model
+
+    # Reroute or compact before dispatch if the prompt cannot fit the chairman's window
+    prompt_tokens = estimate_message_tokens(messages)
+    if CONTEXT_GUARD_ENABLED and fits(target_model, prompt_tokens, generation.max_tokens) is False:
+        decision: Dict[str, Any] = {
+            "stage": "stage3",
+            "model": target_model,
+            "estimated_tokens": prompt_tokens,
+            "max_tokens": generation.max_tokens,
+        }
+        fallback = larger_context_fallback(prompt_tokens, generation.max_tokens, exclude=[target_model])
+        if fallback:
+            query_target = fallback
+            decision.update({"action": "reroute", "routed_to": fallback})
+        elif not agreed:
+            messages, max_chars = _compact_chairman_messages(chairman_messages, target_model, generation.max_tokens)
+            decision.update({
+                "action": "compact",
+                "max_chars": max_chars,
+                "compacted_tokens": estimate_message_tokens(messages),
             })
+        else:
+            decision["action"] = "over_limit"
+        print(f"Context guard: chairman {target_model} ~{prompt_tokens} tokens -> {decision['action']}")
+        if context_log is not None:
+            context_log.append(decision)
 
-    # Sort by average rank (lower is better)
-    aggregate.sort(key=lambda x: x['average_rank'])
+    # Query the chairman model with fallback
+    response, actual_model = await query_model_with_fallback(
+        query_target, messages, api_key=api_key, generation=generation
+    )
 
-    return aggregate
+    if response is None:
+        # Fallback if chairman fails completely across all fallbacks
+        return {
+            "model": target_model,
+            "original_model": None,
+            "response": "Error: Unable to generate final synthesis."
+        }
+
+    return {
+        "model": actual_model,
+        "original_model": target_model if actual_model != target_model else None,
+        "response": response.get('content', '')
+    }
+
+
+def _compact_chairman_messages(
+    build_messages,
+    model: str,
+    max_tokens: Optional[int],
+    min_chars: int = 200
+) -> Tuple[List[Dict[str, str]], int]:
+    """Halve the per-response character cap until the chairman prompt fits the model."""
+    max_chars = COMPACT_RANKING_CHARS * 2
+    messages = build_messages(max_chars)
+    while max_chars > min_chars and fits(model, estimate_message_tokens(messages), max_tokens) is False:
+        max_chars //= 2
+        messages = build_messages(max_chars)
+    return messages, max_chars
 
 
 async def generate_conversation_title(user_query: str, api_key: Optional[str] = None) -> str:
     """
     Generate a short title for a conversation based on the first user message.
 
+    Titles are normally extracted locally (see titles.py); this model call is
+    the opt-in upgrade for messages whose local title is low-confidence.
+
     Args:
         user_query: The first user message
         api_key: Optional OpenRouter API key
@@ -331,13 +551,367 @@ Title:"""
     return title
 
 
+def select_council_members(
+    members: List[str],
+    auto_council: Optional[bool] = None
+) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+    """
+    Apply auto council pruning from the leaderboard when enabled.
+
+    Args:
+        members: Requested council members
+        auto_council: Override for AUTO_COUNCIL_DEFAULT
+
+    Returns:
+        Tuple of (members to query, auto council metadata or None when disabled)
+    """
+    enabled = AUTO_COUNCIL_DEFAULT if auto_council is None else auto_council
+    if not enabled:
+        return members, None
+    selected, dropped = get_leaderboard().select_council(members)
+    return selected, {"requested": members, "selected": selected, "dropped": dropped}
+
+
+@dataclass(frozen=True)
+class ModeBudget:
+    """Documented latency and call-count budget of a council mode."""
+    description: str
+    calls_per_member: int  # upstream calls per council member, before fallbacks
+    fixed_calls: int  # calls independent of council size (the chairman)
+    critical_path_rounds: int  # sequential upstream round trips before the final answer
+    max_seconds: float  # wall-clock target for one run
+
+    def max_calls(self, members: int) -> int:
+        return self.calls_per_member * members + self.fixed_calls
+
+
+COUNCIL_MODES: Dict[str, ModeBudget] = {
+    "fast": ModeBudget(
+        "Stage 1 with early quorum, then the chairman; Stage 2 runs in the background",
+        calls_per_member=2 if FAST_MODE_BACKGROUND_RANKING else 1,
+        fixed_calls=1,
+        critical_path_rounds=2,
+        max_seconds=30.0,
+    ),
+    "balanced": ModeBudget(
+        "Early quorum on Stages 1 and 2 with a compact ranking prompt",
+        calls_per_member=2,
+        fixed_calls=1,
+        critical_path_rounds=3,
+        max_seconds=60.0,
+    ),
+    "thorough": ModeBudget(
+        "Every member answers and ranks with full prompts",
+        calls_per_member=2,
+        fixed_calls=1,
+        critical_path_rounds=3,
+        max_seconds=120.0,
+    ),
+}
+
+
+# Fast-mode rankings that outlive their run (a reference keeps them from being collected)
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _finish_background(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background Stage 2 failed: {task.exception()}")
+
+
+async def wait_background_tasks() -> None:
+    """Wait for fast-mode rankings still running (benchmarks and shutdown)."""
+    if _background_tasks:
+        await asyncio.gather(*list(_background_tasks), return_exceptions=True)
+
+
+def resolve_mode(mode: Optional[str] = None) -> str:
+    """Return a valid council mode, defaulting to DEFAULT_COUNCIL_MODE."""
+    resolved = (mode or DEFAULT_COUNCIL_MODE).lower()
+    if resolved not in COUNCIL_MODES:
+        raise ValueError(f"Unknown council mode '{mode}'. Expected one of: {', '.join(COUNCIL_MODES)}.")
+    return resolved
+
+
+async def stream_council(
+    user_query: str,
+    council_members: Optional[List[str]] = None,
+    chairman_model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    system_prompt: Optional[str] = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    mode: Optional[str] = None,
+    auto_council: Optional[bool] = None,
+    consensus_shortcut: Optional[bool] = None,
+    run_id: Optional[str] = None,
+    generation: Optional[Dict[str, Dict[str, Any]]] = None,
+    degradation: Optional[Degradation] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the council and yield an event as each stage starts and completes.
+
+    Events follow the SSE schema of send_message_stream ('stage1_start',
+    'stage1_complete', ..., 'stage3_complete'). An 'error' event ends the run
+    early; otherwise 'council_complete' carries the run metadata and, except
+    in fast mode, is the last event. In fast mode it is sent as soon as the
+    chairman answers: the background 'stage2_complete' follows it for
+    consumers that keep iterating, and otherwise the ranking still finishes,
+    updating the run store, the leaderboard and the metadata dict.
+    metadata['critical_path'] lists the stages the run waited for before
+    'council_complete'.
+
+    Completed runs are kept in the run store under metadata['run_id'] so the
+    chairman can be re-run alone with resynthesize_run().
+
+    Args:
+        user_query: The user's question
+        council_members: Optional list of specific models to use for the council
+        chairman_model: Optional specific model ID to use as chairman
+        api_key: Optional OpenRouter API key
+        mode: "fast", "balanced" or "thorough" (see COUNCIL_MODES)
+        auto_council: Prune weak or slow members using the leaderboard
+        consensus_shortcut: Skip Stage 2 when Stage 1 answers agree
+        run_id: Optional caller-chosen id for the run store (generated if omitted)
+        generation: Per-stage overrides of the token and reasoning budgets
+        degradation: Brownout level to apply (smaller council, no Stage 2);
+            reported in metadata['degradation']
+
+    Raises:
+        ValueError: If the mode, a stage name or a reasoning effort is unknown
+    """
+    mode = resolve_mode(mode)
+    budgets = resolve_generation(generation)
+    members = council_members or COUNCIL_MODELS
+
+    # Validate quorum
+    if len(members) < 1:
+        yield {'type': 'error', 'error_code': ErrorCode.INVALID_REQUEST, 'message': 'Council requires at least 1 member.'}
+        return
+
+    members, auto_council_info = select_council_members(members, auto_council)
+    degradation = degradation or Degradation(0)
+    requested_members = len(members)
+    if degradation.max_members and len(members) > degradation.max_members:
+        members = members[:degradation.max_members]
+    skip_stage2 = degradation.skip_stage2
+    history = history or []
+    budget = COUNCIL_MODES[mode]
+    quorum = None if mode == "thorough" else max(1, math.ceil(len(members) * QUORUM_FRACTION))
+    started = time.perf_counter()
+
+    run_id = run_id or new_run_id()
+    context_log: List[Dict[str, Any]] = []
+    warm_catalogue()
+
+    metadata: Dict[str, Any] = {
+        "run_id": run_id,
+        "mode": mode,
+        "budget": {
+            "max_calls": budget.max_calls(len(members)),
+            "critical_path_rounds": budget.critical_path_rounds,
+            "max_seconds": budget.max_seconds,
+        },
+        "label_to_model": {},
+        "aggregate_rankings": [],
+        "ranking_agreement": None,
+        "generation": {stage: params.to_payload() for stage, params in budgets.items()},
+        "context_guard": context_log,
+    }
+    if auto_council_info:
+        metadata["auto_council"] = auto_council_info
+    degradation_info = {**degradation.to_payload(), "requested_members": requested_members, "members": len(members)}
+    metadata["degradation"] = degradation_info
+
+    # Stage 1: Collect responses
+    stage1_start: Dict[str, Any] = {'type': 'stage1_start', 'metadata': {'mode': mode}}
+    if auto_council_info:
+        stage1_start['metadata']['auto_council'] = auto_council_info
+    if degradation.level:
+        stage1_start['metadata']['degradation'] = degradation_info
+    yield stage1_start
+    stage1_results = await stage1_collect_responses(
+        user_query,
+        members,
+        api_key=api_key,
+        system_prompt=system_prompt,
+        history=history,
+        quorum=quorum,
+        quorum_grace=QUORUM_GRACE_SECONDS,
+        generation=budgets["stage1"],
+        context_log=context_log
+    )
+
+    # Check quorum after response
+    if len(stage1_results) < 1:
+        yield {'type': 'error', 'error_code': ErrorCode.MODEL_UNAVAILABLE, 'message': 'No models responded. Please check your API key and try again.'}
+        return
+
+    yield {'type': 'stage1_complete', 'data': stage1_results}
+
+    consensus = check_consensus(stage1_results, enabled=consensus_shortcut)
+    metadata["consensus"] = consensus
+    stage2_task: Optional[asyncio.Task] = None
+
+    stage2_results: List[Dict[str, Any]] = []
+    run_record: Optional[RunRecord] = None
+    critical_path = ["stage1"]
+    metadata["critical_path"] = critical_path
+
+    async def run_stage2() -> Dict[str, Any]:
+        nonlocal stage2_results
+        stage2_results, label_to_model = await stage2_collect_rankings(
+            user_query,
+            stage1_results,
+            members,
+            api_key=api_key,
+            compact=mode == "balanced",
+            quorum=quorum,
+            quorum_grace=QUORUM_GRACE_SECONDS,
+            generation=budgets["stage2"],
+            context_log=context_log
+        )
+        stage2_metadata = {
+            "label_to_model": label_to_model,
+            "unparsed_rankings": [r["model"] for r in stage2_results if not r["parsed_ranking"]],
+            "aggregate_rankings": calculate_aggregate_rankings(stage2_results, label_to_model),
+            "ranking_agreement": aggregate_agreement(stage2_results, label_to_model),
+            "consensus": consensus,
+        }
+        get_leaderboard().record_round(stage2_results, label_to_model)
+        metadata.update({k: v for k, v in stage2_metadata.items() if k != "consensus"})
+        if run_record is not None:
+            run_record.stage2_results = stage2_results  # Finished after the run was stored
+        return {'type': 'stage2_complete', 'data': stage2_results, 'metadata': stage2_metadata}
+
+    async def run_stage3(rankings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        stage3_result = await stage3_synthesize_final(
+            user_query,
+            stage1_results,
+            rankings,
+            chairman_model=chairman_model,
+            api_key=api_key,
+            system_prompt=system_prompt,
+            history=history,
+            consensus=consensus,
+            generation=budgets["stage3"],
+            context_log=context_log
+        )
+        metadata["chairman"] = stage3_result['model']
+        critical_path.append("stage3")
+        return {'type': 'stage3_complete', 'data': stage3_result}
+
+    if consensus["agreed"] or skip_stage2:
+        # Answers agree, or the server is browned out: skip peer review entirely
+        yield {'type': 'stage2_start'}
+        yield {'type': 'stage2_complete', 'data': [], 'metadata': {
+            'label_to_model': {}, 'aggregate_rankings': [], 'stage2_skipped': True, 'consensus': consensus
+        }}
+        yield {'type': 'stage3_start'}
+        yield await run_stage3([])
+    elif mode == "fast":
+        # Chairman answers from Stage 1 alone; ranking (if enabled) runs
+        # detached so the run completes without waiting for it
+        if FAST_MODE_BACKGROUND_RANKING:
+            yield {'type': 'stage2_start', 'metadata': {'background': True}}
+            stage2_task = asyncio.create_task(run_stage2())
+            _background_tasks.add(stage2_task)
+            stage2_task.add_done_callback(_finish_background)
+        else:
+            yield {'type': 'stage2_complete', 'data': [], 'metadata': {
+                'label_to_model': {}, 'aggregate_rankings': [], 'stage2_skipped': True, 'consensus': consensus
+            }}
+        yield {'type': 'stage3_start'}
+        yield await run_stage3([])
+    else:
+        # Stage 2: Collect rankings
+        yield {'type': 'stage2_start'}
+        stage2_event = await run_stage2()
+        critical_path.append("stage2")
+        yield stage2_event
+
+        # Stage 3: Synthesize final answer
+        yield {'type': 'stage3_start'}
+        yield await run_stage3(stage2_event['data'])
+
+    run_record = RunRecord(
+        run_id=run_id,
+        user_query=user_query,
+        stage1_results=stage1_results,
+        stage2_results=stage2_results,
+        chairman_model=chairman_model,
+        system_prompt=system_prompt,
+        history=history,
+        consensus=consensus,
+        generation=budgets["stage3"],
+        api_key_hash=hash_api_key(api_key),
+    )
+    get_run_store().save(run_record)
+
+    metadata["critical_path_rounds"] = len(critical_path)
+    metadata["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    yield {'type': 'council_complete', 'metadata': metadata}
+
+    if stage2_task is not None:
+        # Only reached by consumers that keep reading past council_complete
+        try:
+            event = await asyncio.shield(stage2_task)
+        except Exception:
+            return  # Logged by _finish_background; the answer is already out
+        event['metadata']['background'] = True
+        yield event
+
+
+async def resynthesize_run(
+    record: RunRecord,
+    chairman_model: Optional[str] = None,
+    system_prompt: Optional[str] = None,
+    api_key: Optional[str] = None,
+    generation: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Re-run only Stage 3 for a stored run.
+
+    Args:
+        record: The stored run
+        chairman_model: New chairman (defaults to the run's chairman)
+        system_prompt: New system prompt (defaults to the run's system prompt)
+        api_key: Optional OpenRouter API key
+        generation: Overrides of the run's Stage 3 token and reasoning budget
+
+    Returns:
+        Dict with 'model' and 'response' keys
+
+    Raises:
+        ValueError: If the reasoning effort is unknown
+    """
+    params = apply_overrides(record.generation or STAGE_DEFAULTS["stage3"], generation)
+    return await stage3_synthesize_final(
+        record.user_query,
+        record.stage1_results,
+        record.stage2_results,
+        chairman_model=chairman_model or record.chairman_model,
+        api_key=api_key,
+        system_prompt=system_prompt if system_prompt is not None else record.system_prompt,
+        history=record.history,
+        consensus=record.consensus,
+        generation=params
+    )
+
+
 async def run_full_council(
     user_query: str,
     council_members: Optional[List[str]] = None,
     chairman_model: Optional[str] = None,
     api_key: Optional[str] = None,
     system_prompt: Optional[str] = None,
-    history: Optional[List[Dict[str, str]]] = None
+    history: Optional[List[Dict[str, str]]] = None,
+    mode: Optional[str] = None,
+    auto_council: Optional[bool] = None,
+    consensus_shortcut: Optional[bool] = None,
+    run_id: Optional[str] = None,
+    generation: Optional[Dict[str, Dict[str, Any]]] = None,
+    degradation: Optional[Degradation] = None
 ) -> Tuple[List, List, Dict, Dict]:
     """
     Run the complete 3-stage council process.
@@ -347,9 +921,17 @@ async def run_full_council(
         council_members: Optional list of specific models to use for the council
         chairman_model: Optional specific model ID to use as chairman
         api_key: Optional OpenRouter API key
+        mode: "fast", "balanced" or "thorough" (see COUNCIL_MODES)
+        auto_council: Prune weak or slow members using the leaderboard
+        consensus_shortcut: Skip Stage 2 when Stage 1 answers agree
+        run_id: Optional caller-chosen id for the run store (generated if omitted)
+        generation: Per-stage overrides of the token and reasoning budgets
+        degradation: Brownout level to apply (see stream_council)
 
     Returns:
-        Tuple of (stage1_results, stage2_results, stage3_result, metadata)
+        Tuple of (stage1_results, stage2_results, stage3_result, metadata);
+        in fast mode stage2_results is empty when the background ranking had
+        not finished by the time the chairman answered
     """
     # Use provided members or fallback to config default
     members = council_members or COUNCIL_MODELS
@@ -358,45 +940,44 @@ async def run_full_council(
     if len(members) < 1:
         raise ValueError("Council requires at least 1 member.")
 
-    history = history or []
-    # Stage 1: Collect individual responses
-    stage1_results = await stage1_collect_responses(user_query, members, api_key=api_key, system_prompt=system_prompt, history=history)
+    stage1_results: List[Dict[str, Any]] = []
+    stage2_results: List[Dict[str, Any]] = []
+    stage3_result: Dict[str, Any] = {}
+    metadata: Dict[str, Any] = {}
 
-    # If no models responded successfully, return error
-    if len(stage1_results) < 1:
-        return stage1_results, [], {
-            "model": "error",
-            "response": "Insufficient council quorum: 0 models responded successfully."
-        }, {}
-
-    # Stage 2: Collect rankings
-    # We use the same members list for ranking
-    stage2_results, label_to_model = await stage2_collect_rankings(
+    events = stream_council(
         user_query,
-        stage1_results,
         members,
-        api_key=api_key
-    )
-
-    # Calculate aggregate rankings
-    aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
-
-    # Stage 3: Synthesize final answer
-    stage3_result = await stage3_synthesize_final(
-        user_query,
-        stage1_results,
-        stage2_results,
         chairman_model=chairman_model,
         api_key=api_key,
         system_prompt=system_prompt,
-        history=history
+        history=history,
+        mode=mode,
+        auto_council=auto_council,
+        consensus_shortcut=consensus_shortcut,
+        run_id=run_id,
+        generation=generation,
+        degradation=degradation
     )
-
-    # Prepare metadata
-    metadata = {
-        "label_to_model": label_to_model,
-        "aggregate_rankings": aggregate_rankings,
-        "chairman": stage3_result['model']
-    }
+    try:
+        async for event in events:
+            if event['type'] == 'stage1_complete':
+                stage1_results = event['data']
+            elif event['type'] == 'stage2_complete':
+                stage2_results = event['data']
+            elif event['type'] == 'stage3_complete':
+                stage3_result = event['data']
+            elif event['type'] == 'council_complete':
+                # A fast-mode ranking still running is not waited for
+                metadata = event['metadata']
+                break
+            elif event['type'] == 'error':
+                # If no models responded successfully, return error
+                return stage1_results, [], {
+                    "model": "error",
+                    "response": "Insufficient council quorum: 0 models responded successfully."
+                }, {}
+    finally:
+        await events.aclose()
 
     return stage1_results, stage2_results, stage3_result, metadata
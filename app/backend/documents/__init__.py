@@ -0,0 +1 @@
+# Document text extraction module
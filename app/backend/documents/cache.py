@@ -0,0 +1,208 @@
+"""
+Content-addressed cache of document extractions.
+
+Results are keyed by the SHA-256 of the file bytes together with the
+extractor version and character budget, so a lecture PDF that a whole class
+uploads is parsed once. A bounded LRU holds recent results in memory; an
+SQLite file keeps zlib-compressed results across restarts and evicts the
+least recently used ones once it grows past EXTRACT_CACHE_MAX_BYTES.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from ..cache import LRUCache
+from ..config import (
+    EXTRACT_CACHE_ENABLED,
+    EXTRACT_CACHE_MAX_ENTRIES,
+    EXTRACT_CACHE_PATH,
+    EXTRACT_CACHE_MAX_BYTES,
+)
+from .extract import EXTRACTOR_VERSION, ExtractedDocument
+
+
+def document_hash(file_bytes: bytes) -> str:
+    """SHA-256 of the uploaded file."""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def extraction_cache_key(doc_hash: str, kind: str, max_chars: Optional[int]) -> str:
+    """Cache key of one extraction: document hash, extractor version, kind and budget."""
+    return hashlib.sha256(f"{EXTRACTOR_VERSION}\n{kind}\n{max_chars}\n{doc_hash}".encode("utf-8")).hexdigest()
+
+
+class _SQLiteStore:
+    """Size-bounded key/value store of compressed blobs in one SQLite file."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS extractions_last_used ON extractions (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return zlib.decompress(row[0])
+
+    def put(self, key: str, value: bytes) -> None:
+        blob = zlib.compress(value)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time())
+            )
+            # Summed on every write: other worker processes may share the file
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, size in conn.execute(
+                    "SELECT key, size FROM extractions WHERE key != ? ORDER BY last_used", (key,)
+                ).fetchall():
+                    conn.execute("DELETE FROM extractions WHERE key = ?", (old_key,))
+                    self.evictions += 1
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+            conn.commit()
+
+    def usage(self) -> Tuple[int, int]:
+        """(entries, compressed bytes) currently stored."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+            ).fetchone()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ExtractionCache:
+    """Two-tier (memory LRU + optional SQLite file) store of ExtractedDocument results."""
+
+    def __init__(self, max_entries: int, path: Optional[str] = None, max_bytes: int = 0, enabled: bool = True):
+        self.enabled = enabled
+        self.memory: LRUCache[ExtractedDocument] = LRUCache(max_entries)
+        self.disk = _SQLiteStore(path, max_bytes) if path and max_bytes > 0 else None
+        self.disk_hits = 0
+        self.disk_errors = 0
+
+    async def get(self, key: str) -> Tuple[Optional[ExtractedDocument], Optional[str]]:
+        """
+        Look an extraction up in memory, then on disk.
+
+        Returns:
+            Tuple of (ExtractedDocument or None, tier "memory" / "disk" or None)
+        """
+        if not self.enabled:
+            return None, None
+        value = self.memory.get(key)
+        if value is not None:
+            return value, "memory"
+        if self.disk is None:
+            return None, None
+        try:
+            raw = await asyncio.to_thread(self.disk.get, key)
+        except (sqlite3.Error, OSError, zlib.error) as e:
+            self.disk_errors += 1
+            print(f"Extraction cache read failed for {key[:12]}: {e}")
+            return None, None
+        if raw is None:
+            return None, None
+        value = ExtractedDocument(**json.loads(raw))
+        self.disk_hits += 1
+        self.memory.put(key, value)
+        return value, "disk"
+
+    async def put(self, key: str, value: ExtractedDocument) -> None:
+        """Store an extraction in memory and, if configured, on disk."""
+        if not self.enabled:
+            return
+        self.memory.put(key, value)
+        if self.disk is None:
+            return
+        try:
+            raw = json.dumps(dataclasses.asdict(value)).encode("utf-8")
+            await asyncio.to_thread(self.disk.put, key, raw)
+        except (sqlite3.Error, OSError) as e:
+            self.disk_errors += 1
+            print(f"Could not write extraction cache entry {key[:12]}: {e}")
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.disk_hits
+        stats = {
+            "enabled": self.enabled,
+            "memory": memory,
+            "lookups": lookups,
+            "hits": hits,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            "disk": None,
+        }
+        if self.disk is not None:
+            try:
+                entries, size = self.disk.usage()
+            except (sqlite3.Error, OSError):
+                entries, size = None, None
+            stats["disk"] = {
+                "hits": self.disk_hits,
+                "hit_ratio": round(self.disk_hits / memory["misses"], 4) if memory["misses"] else None,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.disk.max_bytes,
+                "evictions": self.disk.evictions,
+                "errors": self.disk_errors,
+            }
+        return stats
+
+
+_extraction_cache = ExtractionCache(
+    EXTRACT_CACHE_MAX_ENTRIES,
+    EXTRACT_CACHE_PATH,
+    EXTRACT_CACHE_MAX_BYTES,
+    enabled=EXTRACT_CACHE_ENABLED,
+)
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Return the process-wide extraction cache."""
+    return _extraction_cache
@@ -0,0 +1,247 @@
+"""
+Plain-text extraction from uploaded documents.
+
+PDF and DOCX parsing is CPU-bound; extract_document runs in the extraction
+pool's worker processes (see pool.py), so everything here must be importable
+and its arguments, results and exceptions picklable.
+"""
+
+import io
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Bump when extraction output changes so cached results are not reused
+EXTRACTOR_VERSION = "3"
+
+# Pages with fewer non-whitespace characters are treated as scans without a text layer
+TEXTLESS_PAGE_CHARS = 10
+
+PLAIN_TEXT_EXTENSIONS = ("txt", "md", "csv", "json", "js", "ts", "py", "html", "xml")
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+@dataclass
+class ExtractedDocument:
+    """Extracted text and the part of the document it covers."""
+    text: str
+    truncated: bool
+    unit: Optional[str] = None  # 'page' (PDF) or 'paragraph' (DOCX)
+    start: int = 0  # First and last unit (1-based) the text was taken from
+    end: int = 0
+    total: Optional[int] = None  # Units in the document, when known
+    offsets: Optional[List[int]] = None  # Character offset in text where each kept unit starts
+    textless: Optional[List[int]] = None  # PDF pages without a text layer (scans), 1-based
+    ocr: Optional[Dict[str, Any]] = None  # OCR outcome once textless pages went through vision
+
+    def range_info(self) -> Optional[Dict[str, Any]]:
+        """Describe the kept range for API responses (None for plain text)."""
+        if self.unit is None:
+            return None
+        return {"unit": self.unit, "start": self.start, "end": self.end, "total": self.total}
+
+
+class ExtractionError(Exception):
+    """Raised when a document cannot be parsed."""
+
+
+class ExtractorUnavailable(ExtractionError):
+    """Raised when the parser library for a document kind is not installed."""
+
+
+def detect_kind(filename: str, content_type: str) -> Optional[str]:
+    """
+    Decide how an upload is parsed.
+
+    Returns:
+        'text', 'docx' or 'pdf', or None for unknown types (decoded as UTF-8)
+    """
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if ext in PLAIN_TEXT_EXTENSIONS or content_type.startswith("text/"):
+        return "text"
+    if ext == "docx" or content_type == DOCX_CONTENT_TYPE:
+        return "docx"
+    if ext == "pdf" or content_type == "application/pdf":
+        return "pdf"
+    return None
+
+
+def extract_document(kind: str, file_bytes: bytes, max_chars: Optional[int] = None) -> ExtractedDocument:
+    """
+    Extract the text of a PDF or DOCX document.
+
+    Pages (PDF) or paragraphs (DOCX) are read one at a time and reading
+    stops once max_chars characters have been produced.
+
+    Args:
+        kind: 'docx' or 'pdf'
+        file_bytes: The uploaded file
+        max_chars: Character budget (None for the whole document)
+
+    Returns:
+        ExtractedDocument with the text (at most max_chars) and the range kept
+
+    Raises:
+        ExtractorUnavailable: If the parser library is not installed
+        ExtractionError: If the document cannot be parsed
+    """
+    if kind == "docx":
+        return _extract_docx(file_bytes, max_chars)
+    if kind == "pdf":
+        return _extract_pdf(file_bytes, max_chars)
+    raise ValueError(f"Unknown document kind: {kind}")
+
+
+def extract_plain_text(file_bytes: bytes, max_chars: Optional[int] = None) -> ExtractedDocument:
+    """Decode a text upload as UTF-8, decoding no more than the budget needs."""
+    if max_chars is not None:
+        file_bytes = file_bytes[:max_chars * 4 + 4]  # UTF-8 uses at most 4 bytes per character
+    text = file_bytes.decode("utf-8", errors="replace")
+    truncated = max_chars is not None and len(text) > max_chars
+    return ExtractedDocument(text=text[:max_chars] if truncated else text, truncated=truncated)
+
+
+def replace_units(
+    extracted: ExtractedDocument,
+    replacements: Dict[int, str],
+    max_chars: Optional[int] = None
+) -> ExtractedDocument:
+    """
+    Rebuild an extraction with the text of some pages/paragraphs replaced.
+
+    Used to merge OCR text for scanned pages back in page order; the
+    character budget applies to the rebuilt text.
+
+    Args:
+        extracted: Extraction with unit offsets
+        replacements: 1-based unit number -> new text
+        max_chars: Character budget (None for no limit)
+    """
+    bounds = list(extracted.offsets or []) + [len(extracted.text)]
+    budget = _Budget(max_chars)
+    kept = 0
+    for kept, (start, end) in enumerate(zip(bounds, bounds[1:]), start=1):
+        budget.start_unit()
+        budget.add(replacements.get(kept, extracted.text[start:end]))
+        if budget.full:
+            break
+    result = budget.result(extracted.unit, kept, extracted.total)
+    if extracted.truncated and kept == extracted.end:
+        result.truncated = True  # The last unit was already cut short
+    result.textless = extracted.textless
+    return result
+
+
+def _extract_docx(file_bytes: bytes, max_chars: Optional[int]) -> ExtractedDocument:
+    try:
+        import docx
+        from docx.oxml.ns import qn
+        from docx.text.paragraph import Paragraph
+    except ImportError:
+        raise ExtractorUnavailable("DOCX extraction not available on this server.")
+    try:
+        doc = docx.Document(io.BytesIO(file_bytes))
+        paragraphs = doc.element.body.findall(qn("w:p"))  # Top-level paragraphs, as doc.paragraphs
+        budget = _Budget(max_chars)
+        kept = 0
+        for index, element in enumerate(paragraphs, start=1):
+            text = Paragraph(element, doc).text
+            budget.start_unit()
+            if text.strip():
+                budget.add(text + "\n")
+            kept = index
+            if budget.full:
+                break
+    except Exception as e:
+        # Re-raised as a plain message: parser exceptions may not pickle
+        raise ExtractionError(f"Failed to parse DOCX: {e}")
+    return budget.result("paragraph", kept, len(paragraphs), strip_newline=True)
+
+
+def _extract_pdf(file_bytes: bytes, max_chars: Optional[int]) -> ExtractedDocument:
+    try:
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+    except ImportError:
+        raise ExtractorUnavailable("PDF extraction not available on this server.")
+    try:
+        output = io.StringIO()
+        resources = PDFResourceManager(caching=True)
+        # Same converter and layout settings as pdfminer's extract_text
+        with TextConverter(resources, output, codec="utf-8", laparams=LAParams()) as device:
+            interpreter = PDFPageInterpreter(resources, device)
+            budget = _Budget(max_chars)
+            kept = 0
+            textless = []
+            pages = PDFPage.get_pages(io.BytesIO(file_bytes), caching=True)
+            for kept, page in enumerate(pages, start=1):
+                interpreter.process_page(page)
+                page_text = output.getvalue()
+                if len("".join(page_text.split())) < TEXTLESS_PAGE_CHARS:
+                    textless.append(kept)
+                budget.start_unit()
+                budget.add(page_text)
+                output.seek(0)
+                output.truncate()
+                if budget.full:
+                    break
+        total = _pdf_page_count(file_bytes) if budget.full else kept
+    except Exception as e:
+        raise ExtractionError(f"Failed to parse PDF: {e}")
+    result = budget.result("page", kept, total)
+    result.textless = textless
+    return result
+
+
+def _pdf_page_count(file_bytes: bytes) -> Optional[int]:
+    """Page count from the document catalogue, without parsing the pages."""
+    try:
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfparser import PDFParser
+        from pdfminer.pdftypes import resolve1
+        document = PDFDocument(PDFParser(io.BytesIO(file_bytes)))
+        return int(resolve1(resolve1(document.catalog["Pages"])["Count"]))
+    except Exception:
+        return None
+
+
+class _Budget:
+    """Collects text up to a character budget."""
+
+    def __init__(self, max_chars: Optional[int]):
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.offsets: List[int] = []
+        self.length = 0
+        self.truncated = False
+
+    @property
+    def full(self) -> bool:
+        return self.max_chars is not None and self.length >= self.max_chars
+
+    def start_unit(self) -> None:
+        self.offsets.append(self.length)
+
+    def add(self, text: str) -> None:
+        if self.max_chars is not None and self.length + len(text) > self.max_chars:
+            text = text[:self.max_chars - self.length]
+            self.truncated = True
+        self.parts.append(text)
+        self.length += len(text)
+
+    def result(self, unit: str, kept: int, total: Optional[int], strip_newline: bool = False) -> ExtractedDocument:
+        text = "".join(self.parts)
+        if strip_newline and text.endswith("\n"):
+            text = text[:-1]
+        if total is not None and kept < total:
+            self.truncated = True
+        return ExtractedDocument(
+            text=text,
+            truncated=self.truncated,
+            unit=unit,
+            start=1 if kept else 0,
+            end=kept,
+            total=total,
+            offsets=self.offsets,
+        )
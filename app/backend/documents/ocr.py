@@ -0,0 +1,177 @@
+"""
+OCR for scanned PDF pages through the vision pipeline.
+
+Pages on which pdfminer found no text layer are rendered to JPEG in the
+extraction pool (with the optional pypdfium2 and Pillow packages) and sent
+through process_images_to_context, so OCR gets the vision cache, model
+fallbacks and bounded parallelism of image messages. The recognised text is
+merged back into the extraction in page order.
+"""
+
+import dataclasses
+import io
+import time
+from typing import Any, Dict, List, Optional
+
+from ..config import (
+    OCR_ENABLED,
+    OCR_MAX_PAGES,
+    OCR_RENDER_SCALE,
+    OCR_MAX_CONCURRENCY,
+    OPENROUTER_API_KEY as DEFAULT_API_KEY,
+)
+from .extract import ExtractedDocument, ExtractionError, ExtractorUnavailable, replace_units
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+try:
+    import PIL  # noqa: F401 - pypdfium2 converts bitmaps through Pillow
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+OCR_JPEG_QUALITY = 90
+
+
+def rasterize_pages(file_bytes: bytes, pages: List[int], scale: float = OCR_RENDER_SCALE) -> List[bytes]:
+    """
+    Render PDF pages to JPEG. Runs in the extraction pool.
+
+    Args:
+        file_bytes: The PDF
+        pages: 1-based page numbers
+        scale: Render scale (1.0 = 72 DPI)
+
+    Returns:
+        JPEG bytes per requested page, in order
+
+    Raises:
+        ExtractorUnavailable: If pypdfium2 or Pillow is not installed
+        ExtractionError: If the PDF cannot be rendered
+    """
+    if pdfium is None or not HAS_PIL:
+        raise ExtractorUnavailable("Scanned-PDF OCR needs pypdfium2 and Pillow on this server.")
+    try:
+        document = pdfium.PdfDocument(file_bytes)
+        try:
+            images = []
+            for number in pages:
+                page = document[number - 1]
+                try:
+                    image = page.render(scale=scale).to_pil().convert("RGB")
+                finally:
+                    page.close()
+                buffer = io.BytesIO()
+                image.save(buffer, format="JPEG", quality=OCR_JPEG_QUALITY)
+                images.append(buffer.getvalue())
+            return images
+        finally:
+            document.close()
+    except Exception as e:
+        # Re-raised as a plain message: pdfium exceptions may not pickle
+        raise ExtractionError(f"Failed to render PDF pages: {e}")
+
+
+def _page_text(context: Any) -> str:
+    """Text of one OCR'd page: the extracted text followed by any tables."""
+    parts = [context.extracted_text.strip()]
+    parts.extend(table.get("raw", "").strip() for table in context.tables)
+    return "\n\n".join(part for part in parts if part)
+
+
+async def ocr_textless_pages(
+    extracted: ExtractedDocument,
+    file_bytes: bytes,
+    api_key: Optional[str] = None,
+    max_chars: Optional[int] = None
+) -> ExtractedDocument:
+    """
+    OCR the pages of a PDF extraction that have no text layer.
+
+    Pages are rendered and recognised OCR_MAX_CONCURRENCY at a time, in
+    page order, stopping once the character budget is reached or after
+    OCR_MAX_PAGES pages.
+
+    Args:
+        extracted: PDF extraction with 'textless' pages
+        file_bytes: The PDF
+        api_key: OpenRouter API key for the vision calls
+        max_chars: Character budget of the merged text
+
+    Returns:
+        The extraction with OCR text merged in and 'ocr' describing the
+        outcome; unchanged when there is nothing to OCR. ocr['skipped'] is
+        the number of pages left out, or the reason OCR could not run
+        (e.g. "pdfium_not_installed"). ocr['complete'] is False when a page
+        failed or OCR could not run, so the result should not be cached.
+    """
+    # Imported here so pool workers that only load rasterize_pages stay light
+    from ..vision.ingest import ImageInput
+    from ..vision.processor import process_images_to_context
+    from .pool import get_extraction_pool
+
+    if not OCR_ENABLED or not extracted.textless:
+        return extracted
+
+    started = time.perf_counter()
+    pages = extracted.textless[:OCR_MAX_PAGES]
+    info: Dict[str, Any] = {"pages": [], "failed": [], "skipped": len(extracted.textless) - len(pages)}
+    texts: Dict[int, str] = {}
+    length = len(extracted.text)
+    batch_size = max(1, OCR_MAX_CONCURRENCY)
+
+    if pdfium is None or not HAS_PIL:
+        # Reported as a reason, like image preprocessing without Pillow
+        info["skipped"] = "pdfium_not_installed" if pdfium is None else "pillow_not_installed"
+        info["skipped_pages"] = len(extracted.textless)
+        pages = []
+    elif not (api_key or DEFAULT_API_KEY):
+        info["error"] = "An OpenRouter API key is required to read scanned pages."
+        pages = []
+
+    for offset in range(0, len(pages), batch_size):
+        if max_chars is not None and length >= max_chars:
+            info["skipped"] += len(pages) - offset
+            break
+        batch = pages[offset:offset + batch_size]
+        try:
+            images = await get_extraction_pool().run(rasterize_pages, file_bytes, batch)
+        except ExtractionError as e:
+            info["error"] = str(e)
+            info["failed"].extend(pages[offset:])
+            break
+        try:
+            contexts = await process_images_to_context(
+                [ImageInput(image, "image/jpeg") for image in images],
+                api_key=api_key,
+                max_concurrency=batch_size
+            )
+        except ValueError as e:
+            # Every page of the batch failed (e.g. a rejected or rate-limited
+            # key); keep the text read so far
+            info["error"] = str(e)
+            info["failed"].extend(batch)
+            continue
+        for page, context in zip(batch, contexts):
+            if context is None:
+                info["failed"].append(page)
+                continue
+            texts[page] = _page_text(context) + "\n\x0c"  # Same page separator as pdfminer
+            length += len(texts[page])
+            info["pages"].append({
+                "page": page,
+                "model": context.model_used,
+                "confidence": context.confidence,
+                "cache": context.metadata.get("cache"),
+            })
+
+    merged = replace_units(extracted, texts, max_chars) if texts else dataclasses.replace(extracted)
+    merged.ocr = {
+        **info,
+        "complete": not info["failed"] and "error" not in info and "skipped_pages" not in info,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    return merged
@@ -0,0 +1,197 @@
+"""
+Bounded process pool for document extraction.
+
+Each of the EXTRACT_POOL_SIZE slots owns a single-worker process pool, so a
+job that times out or is cancelled can be stopped by killing its own worker
+without failing the jobs running in the other slots. Requests wait for a free
+slot; once EXTRACT_MAX_QUEUE requests are waiting, further ones are rejected.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from ..config import EXTRACT_POOL_SIZE, EXTRACT_MAX_QUEUE, EXTRACT_TIMEOUT_SECONDS
+from .extract import ExtractionError
+
+# Parse times kept for the reported percentiles
+PARSE_TIME_WINDOW = 200
+
+
+class ExtractionTimeout(ExtractionError):
+    """Raised when a job runs past the pool's timeout; its worker is killed."""
+
+
+class ExtractionQueueFull(Exception):
+    """Raised when every slot is busy and the wait queue is full."""
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _kill(executor: ProcessPoolExecutor) -> None:
+    """Stop an executor's worker immediately, including a job in progress."""
+    kill_workers = getattr(executor, "kill_workers", None)  # Python 3.14+
+    if kill_workers is not None:
+        kill_workers()
+        return
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.kill()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ExtractionPool:
+    """Process pool with per-job timeouts, cancellation and queue metrics."""
+
+    def __init__(self, size: int, max_queue: int, timeout: float):
+        self.size = max(1, size)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        # Idle slots; None means the slot's worker has not been started yet
+        self._idle: List[Optional[ProcessPoolExecutor]] = [None] * self.size
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._executors: Set[ProcessPoolExecutor] = set()
+        self._parse_ms: Deque[float] = deque(maxlen=PARSE_TIME_WINDOW)
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.crashed = 0
+        self.rejected = 0
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self._executors.add(executor)
+        return executor
+
+    def _replace(self, executor: ProcessPoolExecutor) -> None:
+        """Kill a slot's worker; the slot starts a fresh one when next used."""
+        self._executors.discard(executor)
+        _kill(executor)
+
+    async def _acquire(self) -> Optional[ProcessPoolExecutor]:
+        if self._idle:
+            return self._idle.pop()
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise ExtractionQueueFull(f"Extraction queue is full ({self.max_queue} waiting)")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(waiter.result())  # Handed a slot just as we were cancelled
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _release(self, executor: Optional[ProcessPoolExecutor]) -> None:
+        if executor is not None and executor not in self._executors:
+            executor = None  # Killed by shutdown() while its job was running
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(executor)
+                return
+        self._idle.append(executor)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Run fn(*args) in a worker process.
+
+        Args:
+            fn: Module-level (picklable) function
+            *args: Picklable arguments
+            timeout: Seconds before the job is killed (defaults to the pool's)
+
+        Returns:
+            fn's return value
+
+        Raises:
+            ExtractionQueueFull: If too many jobs are already waiting
+            ExtractionTimeout: If the job runs past the timeout
+            ExtractionError: If the worker process dies mid-job
+        """
+        executor = await self._acquire()
+        if executor is None:
+            executor = self._new_executor()
+        self.busy += 1
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(executor, fn, *args),
+                timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._replace(executor)
+            executor = None
+            raise ExtractionTimeout(f"Extraction took longer than {timeout or self.timeout:g}s")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            self._replace(executor)
+            executor = None
+            raise
+        except BrokenProcessPool:
+            self.crashed += 1
+            self._replace(executor)
+            executor = None
+            raise ExtractionError("Extraction worker stopped unexpectedly")
+        except Exception:
+            self.failed += 1
+            self._parse_ms.append((time.perf_counter() - started) * 1000)
+            raise
+        finally:
+            self.busy -= 1
+            self._release(executor)
+
+        self.completed += 1
+        self._parse_ms.append((time.perf_counter() - started) * 1000)
+        return result
+
+    def shutdown(self) -> None:
+        """Kill every worker; the pool restarts workers if used again."""
+        for executor in list(self._executors):
+            self._replace(executor)
+        self._idle = [None] * (self.size - self.busy)
+
+    def stats(self) -> Dict[str, Any]:
+        parse_ms = list(self._parse_ms)
+        return {
+            "workers": self.size,
+            "busy": self.busy,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "crashed": self.crashed,
+            "rejected": self.rejected,
+            "parse_ms": {
+                "count": len(parse_ms),
+                "p50": round(_percentile(parse_ms, 50), 1),
+                "p95": round(_percentile(parse_ms, 95), 1),
+                "max": round(max(parse_ms), 1),
+            } if parse_ms else {"count": 0},
+        }
+
+
+_extraction_pool = ExtractionPool(EXTRACT_POOL_SIZE, EXTRACT_MAX_QUEUE, EXTRACT_TIMEOUT_SECONDS)
+
+
+def get_extraction_pool() -> ExtractionPool:
+    """Return the process-wide extraction pool."""
+    return _extraction_pool
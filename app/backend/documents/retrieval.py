@@ -0,0 +1,373 @@
+"""
+Local BM25 retrieval over uploaded documents.
+
+Extracted text is split into overlapping chunks, and an inverted index with
+BM25 scoring is built in memory for each document. Documents are scoped
+to the API key that uploaded them like runs are: the document_id returned
+by /api/files/extract hashes the key hash with the file's SHA-256, and
+indexes are looked up under the caller's key hash. A message that references
+documents gets only the chunks most relevant to the student's question,
+within RETRIEVAL_TOKEN_BUDGET, instead of the first MAX_EXTRACT_CHARS
+characters of each file in every council prompt.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..cache import LRUCache
+from ..config import (
+    RETRIEVAL_MAX_CHARS,
+    RETRIEVAL_CHUNK_CHARS,
+    RETRIEVAL_CHUNK_OVERLAP,
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_TOKEN_BUDGET,
+    RETRIEVAL_MAX_DOCUMENTS,
+    RETRIEVAL_EXTRACT_TIMEOUT_SECONDS,
+)
+from ..context_guard import estimate_tokens
+from ..run_store import hash_api_key
+from .cache import extraction_cache_key, get_extraction_cache
+from .extract import ExtractedDocument, extract_document, extract_plain_text
+from .pool import get_extraction_pool
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its me my of on or "
+    "please so than that the their them then there these this to was we were what when where which who "
+    "why will with would you your".split()
+)
+
+
+def scoped_document_id(doc_hash: str, api_key: Optional[str]) -> str:
+    """The document_id given to a client: the file's hash bound to its API key."""
+    return hashlib.sha256(f"{hash_api_key(api_key) or ''}\n{doc_hash}".encode("utf-8")).hexdigest()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords and single letters."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS and (len(t) > 1 or t.isdigit())]
+
+
+def chunk_spans(text: str, chunk_chars: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Split text into overlapping (start, end) spans of about chunk_chars.
+
+    Spans end at a paragraph, line, sentence or word break in their last
+    third when there is one.
+    """
+    spans = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_chars)
+        if end < len(text):
+            earliest = start + chunk_chars * 2 // 3
+            for separator in ("\n\n", "\n", ". ", " "):
+                cut = text.rfind(separator, earliest, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        spans.append((start, end))
+        if end >= len(text):
+            break
+        next_start = max(end - overlap, start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return spans
+
+
+@dataclass
+class Chunk:
+    """A span of the document text with the pages/paragraphs it covers."""
+    index: int
+    start: int
+    end: int
+    first_unit: Optional[int] = None
+    last_unit: Optional[int] = None
+
+
+class DocumentIndex:
+    """Chunked document with an inverted index for BM25 search."""
+
+    def __init__(
+        self,
+        document_id: str,
+        extracted: ExtractedDocument,
+        filename: Optional[str] = None,
+        chunk_chars: int = RETRIEVAL_CHUNK_CHARS,
+        overlap: int = RETRIEVAL_CHUNK_OVERLAP
+    ):
+        self.document_id = document_id
+        self.filename = filename
+        self.text = extracted.text
+        self.unit = extracted.unit
+        self.total_units = extracted.total
+        self.truncated = extracted.truncated
+        self._offsets = extracted.offsets or []
+        self.chunks: List[Chunk] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)  # term -> [(chunk, tf)]
+        for index, (start, end) in enumerate(chunk_spans(self.text, chunk_chars, overlap)):
+            first_unit, last_unit = self._units(start, end)
+            self.chunks.append(Chunk(index, start, end, first_unit, last_unit))
+            counts = Counter(tokenize(self.text[start:end]))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((index, tf))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def _units(self, start: int, end: int) -> Tuple[Optional[int], Optional[int]]:
+        """1-based first and last page/paragraph a span of the text falls in."""
+        if not self._offsets:
+            return None, None
+        first = max(1, bisect.bisect_right(self._offsets, start))
+        last = max(first, bisect.bisect_right(self._offsets, max(start, end - 1)))
+        return first, last
+
+    def search(self, query: str) -> List[Tuple[float, int]]:
+        """BM25 (score, chunk index) pairs for the query, best first."""
+        scores: Dict[int, float] = defaultdict(float)
+        count = len(self.chunks)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, tf in postings:
+                norm = 1 - BM25_B + BM25_B * self.lengths[index] / (self.average_length or 1)
+                scores[index] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+        return sorted(((score, index) for index, score in scores.items()), reverse=True)
+
+    def select(self, query: str, top_k: int = RETRIEVAL_TOP_K, token_budget: int = RETRIEVAL_TOKEN_BUDGET) -> Dict[str, Any]:
+        """
+        Pick the text to put in the prompt for a question.
+
+        The whole text is used when it fits the budget. Otherwise up to
+        top_k best-scoring chunks are taken while they fit, and the
+        document's opening chunks when no query term matches. Selected
+        chunks are returned in document order, with overlapping neighbours
+        merged.
+
+        Returns:
+            Dict with 'method' (full, bm25 or leading), 'excerpts' as
+            [{'text', 'first_unit', 'last_unit', 'score'}] and 'tokens'
+        """
+        if estimate_tokens(self.text) <= token_budget:
+            first, last = self._units(0, len(self.text))
+            excerpt = {"text": self.text, "first_unit": first, "last_unit": last, "score": None}
+            return {"method": "full", "excerpts": [excerpt], "tokens": estimate_tokens(self.text)}
+
+        ranked = self.search(query)[:top_k]
+        method = "bm25"
+        if not ranked:
+            method = "leading"
+            ranked = [(0.0, chunk.index) for chunk in self.chunks]
+
+        chosen: Dict[int, float] = {}
+        used = 0
+        for score, index in ranked:
+            chunk = self.chunks[index]
+            tokens = estimate_tokens(self.text[chunk.start:chunk.end])
+            if used + tokens > token_budget:
+                if method == "leading":
+                    break
+                continue
+            chosen[index] = score
+            used += tokens
+
+        excerpts: List[Dict[str, Any]] = []
+        previous: Optional[Chunk] = None
+        for index in sorted(chosen):
+            chunk = self.chunks[index]
+            if previous is not None and chunk.start <= previous.end:
+                merged = excerpts[-1]
+                merged["end"] = chunk.end
+                merged["last_unit"] = chunk.last_unit
+                merged["score"] = max(merged["score"] or 0.0, chosen[index]) if method == "bm25" else None
+            else:
+                excerpts.append({
+                    "start": chunk.start,
+                    "end": chunk.end,
+                    "first_unit": chunk.first_unit,
+                    "last_unit": chunk.last_unit,
+                    "score": chosen[index] if method == "bm25" else None,
+                })
+            previous = chunk
+        for excerpt in excerpts:
+            excerpt["text"] = self.text[excerpt.pop("start"):excerpt.pop("end")].strip()
+            if excerpt["score"] is not None:
+                excerpt["score"] = round(excerpt["score"], 3)
+        return {"method": method, "excerpts": excerpts, "tokens": used}
+
+
+def _entry_key(document_id: str, api_key: Optional[str]) -> str:
+    """Store key of a document as seen by the caller's API key."""
+    return f"{hash_api_key(api_key) or ''}:{document_id}"
+
+
+class DocumentStore:
+    """Per-process LRU of document indexes keyed by (API key hash, document_id)."""
+
+    def __init__(self, max_documents: int):
+        self.indexes: LRUCache[DocumentIndex] = LRUCache(max_documents)
+        self._building: Dict[str, asyncio.Task] = {}
+
+    def schedule(
+        self,
+        document_id: str,
+        kind: str,
+        file_bytes: bytes,
+        extracted: ExtractedDocument,
+        filename: Optional[str] = None,
+        api_key: Optional[str] = None
+    ) -> None:
+        """Start indexing a document in the background unless it is indexed or in progress."""
+        entry = _entry_key(document_id, api_key)
+        if entry in self.indexes or entry in self._building:
+            return
+        task = asyncio.create_task(self._build(entry, document_id, kind, file_bytes, extracted, filename))
+        self._building[entry] = task
+        task.add_done_callback(lambda _: self._building.pop(entry, None))
+
+    async def _build(
+        self,
+        entry: str,
+        document_id: str,
+        kind: str,
+        file_bytes: Optional[bytes],
+        extracted: Optional[ExtractedDocument],
+        filename: Optional[str]
+    ) -> Optional[DocumentIndex]:
+        cache = get_extraction_cache()
+        # Keyed by the entry, not the file hash, so a rebuild needs the uploader's key
+        key = extraction_cache_key(entry, kind, RETRIEVAL_MAX_CHARS)
+        if extracted is None or (extracted.truncated and not extracted.ocr):
+            # The upload response stopped at MAX_EXTRACT_CHARS; index up to RETRIEVAL_MAX_CHARS
+            # (OCR'd scans are indexed as returned: re-reading them would lose the OCR text)
+            cached, _ = await cache.get(key)
+            if cached is not None:
+                extracted = cached
+            elif file_bytes is None:
+                return None
+            elif kind == "text":
+                extracted = extract_plain_text(file_bytes, RETRIEVAL_MAX_CHARS)
+            else:
+                try:
+                    extracted = await get_extraction_pool().run(
+                        extract_document, kind, file_bytes, RETRIEVAL_MAX_CHARS,
+                        timeout=RETRIEVAL_EXTRACT_TIMEOUT_SECONDS
+                    )
+                except Exception as e:
+                    print(f"Indexing document {document_id[:12]} failed: {e}")
+                    return None
+        await cache.put(key, extracted)
+        index = await asyncio.to_thread(DocumentIndex, document_id, extracted, filename)
+        self.indexes.put(entry, index)
+        return index
+
+    async def get(self, document_id: str, api_key: Optional[str] = None) -> Optional[DocumentIndex]:
+        """
+        Return a document's index, waiting for a build in progress.
+
+        Only documents uploaded with the same API key are found. Documents
+        indexed by another worker or before a restart are rebuilt from the
+        extraction cache when it still holds their text.
+        """
+        entry = _entry_key(document_id, api_key)
+        index = self.indexes.get(entry)
+        if index is not None:
+            return index
+        building = self._building.get(entry)
+        if building is not None:
+            return await asyncio.shield(building)
+        for kind in ("pdf", "docx", "text"):
+            index = await self._build(entry, document_id, kind, None, None, None)
+            if index is not None:
+                return index
+        return None
+
+
+_document_store = DocumentStore(RETRIEVAL_MAX_DOCUMENTS)
+
+
+def get_document_store() -> DocumentStore:
+    """Return the process-wide document index store."""
+    return _document_store
+
+
+def _unit_label(unit: Optional[str], first: Optional[int], last: Optional[int]) -> Optional[str]:
+    if not unit or first is None:
+        return None
+    name = "Page" if unit == "page" else "Paragraph"
+    return f"{name} {first}" if first == last else f"{name}s {first}-{last}"
+
+
+async def build_document_context(
+    document_ids: List[str],
+    question: str,
+    token_budget: int = RETRIEVAL_TOKEN_BUDGET,
+    api_key: Optional[str] = None
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Render the parts of the referenced documents relevant to a question.
+
+    The token budget is shared equally between the documents.
+
+    Args:
+        document_ids: document_id values returned by /api/files/extract
+        question: The student's message, used as the BM25 query
+        token_budget: Estimated tokens of document text allowed in the prompt
+        api_key: The caller's API key; only documents it uploaded are found
+
+    Returns:
+        Tuple of (context text to put before the question, per-document
+        retrieval info for metadata)
+
+    Raises:
+        KeyError: If a document is unknown (not uploaded to this server with
+            this API key, or evicted and no longer cached)
+    """
+    store = get_document_store()
+    share = max(1, token_budget // max(1, len(document_ids)))
+    sections = []
+    info = []
+    for document_id in document_ids:
+        index = await store.get(document_id, api_key)
+        if index is None:
+            raise KeyError(document_id)
+        selection = index.select(question, token_budget=share)
+        name = index.filename or "document"
+        lines = [f'The user has attached a file "{name}".']
+        if selection["method"] != "full" or index.truncated:
+            lines.append("Only the excerpts most relevant to the question are included.")
+        lines.append("")
+        lines.append("CONTENT OF FILE:" if selection["method"] == "full" else "EXCERPTS FROM FILE:")
+        for excerpt in selection["excerpts"]:
+            label = _unit_label(index.unit, excerpt["first_unit"], excerpt["last_unit"])
+            if selection["method"] != "full" and label:
+                lines.append(f"[{label}]")
+            lines.append(excerpt["text"])
+            lines.append("")
+        sections.append("\n".join(lines).rstrip())
+        info.append({
+            "document_id": document_id,
+            "filename": index.filename,
+            "method": selection["method"],
+            "chunks": len(index.chunks),
+            "tokens": selection["tokens"],
+            "excerpts": [
+                {"first_unit": e["first_unit"], "last_unit": e["last_unit"], "score": e["score"]}
+                for e in selection["excerpts"]
+            ],
+            "unit": index.unit,
+        })
+    return "\n\n".join(sections), info
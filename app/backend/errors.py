@@ -16,6 +16,9 @@ class ErrorCode(str, Enum):
     RATE_LIMIT_EXCEEDED = "RATE_LIMIT_EXCEEDED"
     INVALID_REQUEST = "INVALID_REQUEST"
     CONVERSATION_NOT_FOUND = "CONVERSATION_NOT_FOUND"
+    RUN_NOT_FOUND = "RUN_NOT_FOUND"
+    FILE_TOO_LARGE = "FILE_TOO_LARGE"
+    DOCUMENT_NOT_FOUND = "DOCUMENT_NOT_FOUND"
     
     # Provider errors
     MODEL_UNAVAILABLE = "MODEL_UNAVAILABLE"
@@ -24,6 +27,7 @@ class ErrorCode(str, Enum):
     
     # System errors
     INTERNAL_ERROR = "INTERNAL_ERROR"
+    SERVER_BUSY = "SERVER_BUSY"
 
 
 class APIError(BaseModel):
@@ -0,0 +1,120 @@
+"""
+Per-stage generation budgets and reasoning cleanup.
+
+Each council stage sends a max_tokens cap and an OpenRouter "reasoning"
+setting with its upstream calls. Defaults come from config and can be
+overridden per request. Reasoning output is removed from responses before
+they reach later stages, so hidden chains of thought never inflate the
+ranking or chairman prompts.
+"""
+
+import re
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
+
+from .config import (
+    STAGE1_MAX_TOKENS,
+    STAGE2_MAX_TOKENS,
+    STAGE3_MAX_TOKENS,
+    STAGE1_REASONING_EFFORT,
+    STAGE2_REASONING_EFFORT,
+    STAGE3_REASONING_EFFORT,
+    REASONING_EXCLUDE,
+)
+
+REASONING_EFFORTS = ("low", "medium", "high")
+STAGES = ("stage1", "stage2", "stage3")
+
+# Fields OpenRouter may attach to a message alongside the answer
+REASONING_FIELDS = ("reasoning", "reasoning_details", "reasoning_content")
+
+# Inline reasoning some open models emit in the content itself; an
+# unterminated block (output cut off by max_tokens) runs to the end
+_THINK_PATTERN = re.compile(r"<think(?:ing)?>.*?(?:</think(?:ing)?>|\Z)\s*", re.DOTALL | re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class GenerationParams:
+    """Generation budget for one stage's upstream calls."""
+    max_tokens: Optional[int] = None  # None or 0 = no cap
+    reasoning_effort: Optional[str] = None  # None = model default
+    exclude_reasoning: bool = True
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Extra chat-completion fields for this budget."""
+        payload: Dict[str, Any] = {}
+        if self.max_tokens:
+            payload["max_tokens"] = self.max_tokens
+        reasoning: Dict[str, Any] = {}
+        if self.reasoning_effort:
+            reasoning["effort"] = self.reasoning_effort
+        if self.exclude_reasoning:
+            reasoning["exclude"] = True
+        if reasoning:
+            payload["reasoning"] = reasoning
+        return payload
+
+
+def _validated_effort(effort: Optional[str]) -> Optional[str]:
+    if not effort:
+        return None
+    effort = effort.lower()
+    if effort not in REASONING_EFFORTS:
+        raise ValueError(f"Unknown reasoning effort '{effort}'. Expected one of: {', '.join(REASONING_EFFORTS)}.")
+    return effort
+
+
+STAGE_DEFAULTS: Dict[str, GenerationParams] = {
+    "stage1": GenerationParams(STAGE1_MAX_TOKENS, _validated_effort(STAGE1_REASONING_EFFORT), REASONING_EXCLUDE),
+    "stage2": GenerationParams(STAGE2_MAX_TOKENS, _validated_effort(STAGE2_REASONING_EFFORT), REASONING_EXCLUDE),
+    "stage3": GenerationParams(STAGE3_MAX_TOKENS, _validated_effort(STAGE3_REASONING_EFFORT), REASONING_EXCLUDE),
+}
+
+
+def apply_overrides(params: GenerationParams, fields: Optional[Dict[str, Any]]) -> GenerationParams:
+    """Return params with the non-None override fields applied."""
+    changes = {k: v for k, v in (fields or {}).items() if v is not None}
+    if "reasoning_effort" in changes:
+        changes["reasoning_effort"] = _validated_effort(changes["reasoning_effort"])
+    return replace(params, **changes) if changes else params
+
+
+def resolve_generation(
+    overrides: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, GenerationParams]:
+    """
+    Merge per-request overrides into the deployment defaults.
+
+    Args:
+        overrides: Optional mapping of stage name to any of 'max_tokens',
+            'reasoning_effort' and 'exclude_reasoning' (None values are ignored)
+
+    Returns:
+        Dict mapping each stage name to its GenerationParams
+
+    Raises:
+        ValueError: If a stage name or reasoning effort is unknown
+    """
+    resolved = dict(STAGE_DEFAULTS)
+    for stage, fields in (overrides or {}).items():
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage '{stage}'. Expected one of: {', '.join(STAGES)}.")
+        resolved[stage] = apply_overrides(resolved[stage], fields)
+    return resolved
+
+
+def strip_reasoning(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the message without reasoning fields or inline <think> blocks.
+
+    Args:
+        message: A chat-completion message from OpenRouter
+
+    Returns:
+        A copy with only the answer in 'content'
+    """
+    cleaned = {k: v for k, v in message.items() if k not in REASONING_FIELDS}
+    content = cleaned.get("content")
+    if isinstance(content, str) and "<think" in content.lower():
+        cleaned["content"] = _THINK_PATTERN.sub("", content).strip()
+    return cleaned
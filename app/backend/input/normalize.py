@@ -5,8 +5,16 @@ Normalizes all user inputs (text, images, or both) into a single textual prompt
 that can be passed to the council. This ensures the council only ever receives text.
 """
 
-from typing import Optional, Tuple, Dict, Any
-from ..vision.processor import process_image_to_context, VisionContext
+from typing import Optional, Tuple, Dict, Any, AsyncIterator, List
+from ..config import VISION_PROMPT_MAX_CHARS
+from ..vision.processor import (
+    process_image_to_context,
+    process_images_to_context,
+    merge_contexts,
+    VisionContext,
+)
+from ..vision.ingest import ImageInput
+from ..vision.stream import stream_image_to_context
 
 
 async def render_context_as_prompt(
@@ -81,11 +89,88 @@ async def render_context_as_prompt(
     return "\n".join(parts)
 
 
+async def render_pages_as_prompt(
+    contexts: List[Optional[VisionContext]],
+    user_caption: Optional[str] = None,
+    max_chars: int = VISION_PROMPT_MAX_CHARS
+) -> str:
+    """
+    Render the contexts of several images into one prompt with a section per page.
+
+    The extracted text of all pages shares a budget of max_chars characters,
+    split evenly across the pages that were processed.
+
+    Args:
+        contexts: Per-page contexts in page order (None for pages that failed)
+        user_caption: Optional user-provided caption or question about the images
+        max_chars: Total characters of extracted text across pages
+
+    Returns:
+        Formatted prompt string
+    """
+    total = len(contexts)
+    succeeded = [c for c in contexts if c is not None]
+    per_page = max_chars // max(1, len(succeeded))
+
+    parts = []
+    parts.append("## Image Context")
+    parts.append(f"The following information was extracted from {total} uploaded images, in order.")
+    parts.append("")
+
+    if any(c.confidence < 0.6 for c in succeeded):
+        parts.append("> ⚠️ **Low Confidence Extraction**: Some pages were hard to read. Results may be incomplete.")
+        parts.append("")
+
+    for page, context in enumerate(contexts, start=1):
+        parts.append(f"### Page {page} of {total}")
+        if context is None:
+            parts.append("- ⚠️ This page could not be processed.")
+            parts.append("")
+            continue
+
+        text = context.extracted_text
+        if len(text) > per_page:
+            text = text[:per_page] + " [...]"
+        if text:
+            parts.append(text)
+            parts.append("")
+
+        if context.entities:
+            parts.append("Key entities: " + "; ".join(context.entities[:10]))
+            parts.append("")
+
+        for table in context.tables[:2]:
+            if "raw" in table:
+                parts.append(table["raw"])
+                parts.append("")
+
+        for warning in context.warnings[:3]:
+            parts.append(f"- ⚠️ {warning}")
+        if context.warnings:
+            parts.append("")
+
+    parts.append("---")
+    if user_caption:
+        parts.append("### User Question")
+        parts.append(user_caption)
+    else:
+        parts.append("### User Request")
+        parts.append("Please analyze and respond based on the extracted content of all pages above.")
+
+    parts.append("")
+    parts.append("---")
+    parts.append("*Note: Base your response ONLY on the extracted content above. The original images are not available to you.*")
+
+    return "\n".join(parts)
+
+
 async def normalize_user_input(
     text: Optional[str] = None,
     image_bytes: Optional[bytes] = None,
     mime_type: Optional[str] = None,
-    api_key: Optional[str] = None
+    api_key: Optional[str] = None,
+    images: Optional[List[ImageInput]] = None,
+    image_base64: Optional[bytes] = None
 ) -> Tuple[str, Optional[Dict[str, Any]]]:
     """
     Normalize user input into a single textual prompt.
@@ -95,6 +180,9 @@ async def normalize_user_input(
         image_bytes: Optional image bytes
         mime_type: MIME type of image (required if image_bytes provided)
         api_key: OpenRouter API key
+        images: Optional further images for multi-page uploads;
+            processed concurrently after image_bytes, if given
+        image_base64: Optional base64 of image_bytes as sent by the client
         
     Returns:
         Tuple of (normalized_prompt, vision_context_dict)
@@ -103,6 +191,17 @@ async def normalize_user_input(
     Raises:
         ValueError: If neither text nor image provided, or if image processing fails
     """
+    # Multiple images: process concurrently and render a section per page
+    pages = ([ImageInput(image_bytes, mime_type, image_base64)] if image_bytes else []) + list(images or [])
+    if len(pages) > 1:
+        if not all(page.mime_type for page in pages):
+            raise ValueError("mime_type is required for every image")
+        contexts = await process_images_to_context(pages, api_key=api_key)
+        prompt = await render_pages_as_prompt(contexts, user_caption=text)
+        return prompt, merge_contexts(contexts).to_dict()
+    if pages and not image_bytes:
+        image_bytes, mime_type, image_base64 = pages[0].data, pages[0].mime_type, pages[0].base64_data
+
     # Case 1: Text only - return as-is
     if text and not image_bytes:
         return text, None
@@ -116,7 +215,8 @@ async def normalize_user_input(
         vision_context = await process_image_to_context(
             image_bytes=image_bytes,
             mime_type=mime_type,
-            api_key=api_key
+            api_key=api_key,
+            image_base64=image_base64
         )
         
         # Render context as prompt, with user text as caption
@@ -129,3 +229,33 @@ async def normalize_user_input(
     
     # Case 3: Neither text nor image
     raise ValueError("At least one of text or image must be provided")
+
+
+async def stream_user_input(
+    text: Optional[str],
+    image_bytes: bytes,
+    mime_type: str,
+    api_key: Optional[str] = None,
+    image_base64: Optional[bytes] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Normalize an image (plus optional text) while the vision answer streams.
+
+    Yields:
+        {'type': 'vision_delta', 'data': section} for each completed section,
+        {'type': 'prompt_ready', 'prompt': str} once the council can start,
+        {'type': 'vision_complete', 'data': vision_context_dict} at the end.
+
+    Raises:
+        ValueError: If image processing fails
+    """
+    async for event in stream_image_to_context(
+        image_bytes, mime_type, api_key=api_key, image_base64=image_base64
+    ):
+        if event["type"] == "vision_delta":
+            yield event
+        elif event["type"] == "vision_ready":
+            prompt = await render_context_as_prompt(event["data"], user_caption=text)
+            yield {"type": "prompt_ready", "prompt": prompt}
+        elif event["type"] == "vision_final":
+            yield {"type": "vision_complete", "data": event["data"].to_dict()}
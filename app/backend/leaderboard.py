@@ -0,0 +1,244 @@
+"""
+Incremental model leaderboard and ranking-driven council pruning.
+
+Every Stage 2 round counts once per ranked model, whatever the number of
+rankers: it updates a running mean of the model's normalized rank score
+(1.0 = ranked first, 0.0 = ranked last, averaged over the rankers), the
+share of rankers that put it last, and an exponentially weighted Stage 1
+latency. The table is persisted as a
+small JSON file so it survives restarts. Updates only mark the table dirty;
+it is written at most every LEADERBOARD_FLUSH_SECONDS in a worker thread,
+so the event loop never blocks on the file.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import (
+    LEADERBOARD_ENABLED,
+    LEADERBOARD_PATH,
+    LEADERBOARD_FLUSH_SECONDS,
+    AUTO_COUNCIL_MIN_MEMBERS,
+    AUTO_COUNCIL_MIN_SAMPLES,
+    AUTO_COUNCIL_LAST_PLACE_RATE,
+    AUTO_COUNCIL_SLOW_FACTOR,
+)
+from .ranking import build_rank_matrix, parsed_rankings_for
+
+LATENCY_EWMA_ALPHA = 0.2
+
+
+@dataclass
+class ModelStats:
+    """Running statistics for one model."""
+    rounds: int = 0  # Stage 2 rounds (council runs) that ranked the model
+    mean_score: float = 0.0
+    last_place: float = 0.0  # Sum over rounds of the share of rankers that put it last
+    latency_ms: Optional[float] = None
+
+    @property
+    def last_place_rate(self) -> float:
+        return self.last_place / self.rounds if self.rounds else 0.0
+
+    def to_row(self) -> List[Any]:
+        latency = round(self.latency_ms, 1) if self.latency_ms is not None else None
+        return [self.rounds, round(self.mean_score, 4), round(self.last_place, 4), latency]
+
+    @classmethod
+    def from_row(cls, row: List[Any]) -> "ModelStats":
+        return cls(rounds=row[0], mean_score=row[1], last_place=row[2], latency_ms=row[3])
+
+
+class Leaderboard:
+    """Running mean-rank leaderboard persisted as compact JSON rows."""
+
+    def __init__(self, path: Optional[str] = None, enabled: bool = True, flush_seconds: float = LEADERBOARD_FLUSH_SECONDS):
+        self.path = path
+        self.enabled = enabled
+        self.flush_seconds = flush_seconds
+        self.models: Dict[str, ModelStats] = {}
+        self.dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()  # One write at a time: they share the .tmp file
+        if path and enabled:
+            self.load()
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                rows = json.load(f)
+            self.models = {model: ModelStats.from_row(row) for model, row in rows.items()}
+        except (OSError, ValueError, TypeError, IndexError) as e:
+            print(f"Ignoring unreadable leaderboard {self.path}: {e}")
+
+    def _rows(self) -> Dict[str, List[Any]]:
+        return {model: stats.to_row() for model, stats in self.models.items()}
+
+    def _write(self, rows: Dict[str, List[Any]]) -> None:
+        """Write a snapshot of the table (blocking; called from a worker thread)."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(rows, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def save(self) -> None:
+        """Write the table now (blocking)."""
+        if not self.path:
+            return
+        self.dirty = False
+        self._write(self._rows())
+
+    def mark_dirty(self) -> None:
+        """Schedule a write of the table, coalescing updates within flush_seconds."""
+        if not self.path:
+            return
+        self.dirty = True
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()  # No event loop (scripts): write synchronously
+            return
+        self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        # Updates made while a write is running find this task still pending
+        # and only set dirty, so keep flushing until nothing is left
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+            if not self.dirty:
+                return
+
+    async def flush(self) -> None:
+        """Write the table in a worker thread if it changed since the last write."""
+        async with self._write_lock:
+            if not self.dirty or not self.path:
+                return
+            self.dirty = False
+            rows = self._rows()  # Snapshot on the loop; only the file I/O is offloaded
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except OSError as e:
+                self.dirty = True
+                print(f"Could not write leaderboard {self.path}: {e}")
+
+    def record_latency(self, model: str, latency_ms: float) -> None:
+        """Fold one Stage 1 response time into the model's latency average."""
+        if not self.enabled:
+            return
+        stats = self.models.setdefault(model, ModelStats())
+        if stats.latency_ms is None:
+            stats.latency_ms = latency_ms
+        else:
+            stats.latency_ms += LATENCY_EWMA_ALPHA * (latency_ms - stats.latency_ms)
+
+    def record_round(
+        self,
+        stage2_results: List[Dict[str, Any]],
+        label_to_model: Dict[str, str]
+    ) -> None:
+        """Update running scores from one Stage 2 round and schedule a write."""
+        if not self.enabled:
+            return
+        labels = list(label_to_model)
+        matrix = build_rank_matrix(parsed_rankings_for(stage2_results, label_to_model), labels)
+
+        # Collect every ranker's verdict first so the round counts once per model
+        scores: Dict[str, List[float]] = {}
+        last: Dict[str, int] = {}
+        for row in matrix:
+            ranked = sum(1 for position in row if position is not None)
+            if ranked < 2:
+                continue
+            for j, position in enumerate(row):
+                if position is None:
+                    continue
+                model = label_to_model[labels[j]]
+                scores.setdefault(model, []).append(1 - (position - 1) / (ranked - 1))
+                last[model] = last.get(model, 0) + (position == ranked)
+        if not scores:
+            return
+
+        for model, model_scores in scores.items():
+            stats = self.models.setdefault(model, ModelStats())
+            stats.rounds += 1
+            stats.mean_score += (statistics.fmean(model_scores) - stats.mean_score) / stats.rounds
+            stats.last_place += last[model] / len(model_scores)
+        self.mark_dirty()
+
+    def standings(self) -> List[Dict[str, Any]]:
+        """Models sorted best first."""
+        rows = [
+            {
+                "model": model,
+                "rounds": stats.rounds,
+                "mean_score": round(stats.mean_score, 4),
+                "last_place_rate": round(stats.last_place_rate, 4),
+                "latency_ms": round(stats.latency_ms, 1) if stats.latency_ms is not None else None,
+            }
+            for model, stats in self.models.items()
+        ]
+        rows.sort(key=lambda r: (-r["mean_score"], -r["rounds"]))
+        return rows
+
+    def select_council(
+        self,
+        members: List[str],
+        min_members: int = AUTO_COUNCIL_MIN_MEMBERS,
+        min_samples: int = AUTO_COUNCIL_MIN_SAMPLES
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Drop members that are consistently ranked last or slow for their quality.
+
+        Only models with at least min_samples rounds are judged, and the
+        council never shrinks below min_members.
+
+        Returns:
+            Tuple of (selected members, list of {model, reason} for dropped ones)
+        """
+        judged = {
+            m: self.models[m] for m in members
+            if m in self.models and self.models[m].rounds >= min_samples
+        }
+        efficiencies = {
+            m: stats.mean_score / stats.latency_ms
+            for m, stats in judged.items() if stats.latency_ms
+        }
+        median_efficiency = statistics.median(efficiencies.values()) if len(efficiencies) >= 2 else None
+
+        candidates = []
+        for model, stats in judged.items():
+            if stats.last_place_rate >= AUTO_COUNCIL_LAST_PLACE_RATE:
+                candidates.append((model, "ranked_last"))
+            elif (
+                median_efficiency
+                and model in efficiencies
+                and efficiencies[model] * AUTO_COUNCIL_SLOW_FACTOR < median_efficiency
+            ):
+                candidates.append((model, "slow_for_quality"))
+
+        # Drop the weakest first so the floor keeps the strongest members
+        candidates.sort(key=lambda c: judged[c[0]].mean_score)
+        droppable = max(0, len(members) - max(1, min_members))
+        dropped = [{"model": model, "reason": reason} for model, reason in candidates[:droppable]]
+        dropped_models = {d["model"] for d in dropped}
+        return [m for m in members if m not in dropped_models], dropped
+
+
+_leaderboard = Leaderboard(LEADERBOARD_PATH, enabled=LEADERBOARD_ENABLED)
+
+
+def get_leaderboard() -> Leaderboard:
+    """Return the process-wide leaderboard."""
+    return _leaderboard
@@ -4,30 +4,69 @@ This API provides LLM computation endpoints only. All data persistence
 is handled by Convex on the client side.
 """
 
-from fastapi import FastAPI, HTTPException, Header, Request, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, Header, Request, File, UploadFile, Form, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field, ValidationError
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Any, Literal, Optional, Tuple
 import json
 import asyncio
-import base64
-import io
-
-from .input.normalize import normalize_user_input
+import time
+
+from .input.normalize import normalize_user_input, stream_user_input
+from .streams import merge_streams
+from .config import (
+    VISION_STREAMING_ENABLED,
+    VISION_MAX_IMAGES,
+    EXTRACT_BATCH_MAX_FILES,
+    EXTRACT_BATCH_MAX_BYTES,
+    TITLE_LLM_UPGRADE,
+    TITLE_MIN_CONFIDENCE,
+)
+from .titles import DEFAULT_TITLE, generate_local_title
+from .vision.ingest import ImageInput, ImageTooLarge, image_from_base64, read_upload as read_image_upload
+from .uploads import UploadTooLarge, read_upload
+from .documents.extract import (
+    ExtractionError,
+    ExtractorUnavailable,
+    detect_kind,
+    extract_document,
+    extract_plain_text,
+)
+from .documents.pool import ExtractionQueueFull, ExtractionTimeout, get_extraction_pool
+from .documents.cache import document_hash, extraction_cache_key, get_extraction_cache
+from .documents.retrieval import build_document_context, get_document_store, scoped_document_id
+from .documents.ocr import ocr_textless_pages
 
 from .council import (
     run_full_council,
+    stream_council,
+    resolve_mode,
     generate_conversation_title,
-    stage1_collect_responses,
-    stage2_collect_rankings,
-    stage3_synthesize_final,
-    calculate_aggregate_rankings,
+    resynthesize_run,
+    COUNCIL_MODES,
 )
+from .run_store import get_run_store
+from .leaderboard import get_leaderboard
 from .errors import CouncilException, APIError, ErrorCode
+from .admission import AdmissionMiddleware, get_admission_controller
+from .ws import CouncilSocket
 
-app = FastAPI(title="LLM Council API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_admission_controller().start()
+    yield
+    await get_admission_controller().stop()
+    await get_leaderboard().flush()
+    get_extraction_pool().shutdown()
+    get_extraction_cache().close()
 
+
+app = FastAPI(title="LLM Council API", version="1.0.0", lifespan=lifespan)
+
+# Added before CORS so that CORS wraps it and shed responses carry CORS headers
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -54,6 +93,10 @@ async def council_exception_handler(request: Request, exc: CouncilException):
         status_code = 500
     elif exc.code == ErrorCode.RATE_LIMIT_EXCEEDED:
         status_code = 429
+    elif exc.code in [ErrorCode.CONVERSATION_NOT_FOUND, ErrorCode.RUN_NOT_FOUND, ErrorCode.DOCUMENT_NOT_FOUND]:
+        status_code = 404
+    elif exc.code == ErrorCode.FILE_TOO_LARGE:
+        status_code = 413
     
     return JSONResponse(
         status_code=status_code,
@@ -65,24 +108,88 @@ async def council_exception_handler(request: Request, exc: CouncilException):
     )
 
 
+def resolve_mode_or_raise(mode: Optional[str]) -> str:
+    """Validate a requested council mode, raising INVALID_REQUEST if unknown."""
+    try:
+        return resolve_mode(mode)
+    except ValueError as e:
+        raise CouncilException(code=ErrorCode.INVALID_REQUEST, message=str(e))
+
+
 # ============================================================================
 # Request/Response Models
 # ============================================================================
 
+class StageGeneration(BaseModel):
+    """Per-request override of one stage's generation budget."""
+    max_tokens: Optional[int] = Field(None, ge=0, le=32768)  # 0 = no cap
+    reasoning_effort: Optional[Literal["low", "medium", "high"]] = None
+    exclude_reasoning: Optional[bool] = None
+
+
 class SendMessageRequest(BaseModel):
     """Request to send a message in a conversation."""
     content: str
     council_members: Optional[List[str]] = None
     chairman_model: Optional[str] = None
     image_data: Optional[Dict[str, str]] = None  # {data: base64_str, mime_type: str}
+    images: Optional[List[Dict[str, str]]] = None  # Further pages, same shape as image_data
     system_prompt: Optional[str] = None
     history: Optional[List[Dict[str, str]]] = None
+    auto_council: Optional[bool] = None  # Prune weak/slow members using the leaderboard
+    consensus_shortcut: Optional[bool] = None  # Skip Stage 2 when Stage 1 answers agree
+    mode: Optional[str] = None  # "fast" | "balanced" | "thorough" (default from COUNCIL_MODE)
+    run_id: Optional[str] = Field(None, max_length=128)  # Key for resynthesis (generated if omitted)
+    generation: Optional[Dict[Literal["stage1", "stage2", "stage3"], StageGeneration]] = None
+    # document_id values from /api/files/extract; relevant excerpts are added to the prompt
+    document_ids: Optional[List[str]] = Field(None, max_length=5)
+    llm_title: Optional[bool] = None  # Ask a model when the local title is low-confidence (default TITLE_LLM_UPGRADE)
+
+    def generation_overrides(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        if not self.generation:
+            return None
+        return {stage: params.model_dump(exclude_none=True) for stage, params in self.generation.items()}
+
+
+class ResynthesizeRequest(BaseModel):
+    """Request to re-run only the chairman for a completed run."""
+    chairman_model: Optional[str] = None
+    system_prompt: Optional[str] = None
+    generation: Optional[StageGeneration] = None  # Overrides the run's Stage 3 budget
 
 
 # ============================================================================
 # Endpoints
 # ============================================================================
 
+async def content_with_documents(
+    request: SendMessageRequest,
+    api_key: Optional[str]
+) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+    """
+    Prefix the message with the parts of its documents relevant to it.
+
+    Only documents uploaded with the same API key are used.
+
+    Returns:
+        Tuple of (message text for the council, retrieval info or None)
+
+    Raises:
+        CouncilException: DOCUMENT_NOT_FOUND if a document is not available
+    """
+    if not request.document_ids:
+        return request.content, None
+    try:
+        context, documents = await build_document_context(request.document_ids, request.content, api_key=api_key)
+    except KeyError as e:
+        raise CouncilException(
+            code=ErrorCode.DOCUMENT_NOT_FOUND,
+            message="An attached document is no longer available. Please attach it again.",
+            details={"document_id": e.args[0]}
+        )
+    return f"{context}\n\n{request.content}", documents
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -96,6 +203,27 @@ async def get_free_models_endpoint():
     return await get_free_models()
 
 
+@app.get("/api/council/modes")
+async def get_council_modes():
+    """Describe the latency tiers and their latency/call-count budgets."""
+    return {
+        name: {
+            "description": budget.description,
+            "calls_per_member": budget.calls_per_member,
+            "fixed_calls": budget.fixed_calls,
+            "critical_path_rounds": budget.critical_path_rounds,
+            "max_seconds": budget.max_seconds,
+        }
+        for name, budget in COUNCIL_MODES.items()
+    }
+
+
+@app.get("/api/leaderboard")
+async def get_leaderboard_endpoint():
+    """Get the running model leaderboard built from Stage 2 peer rankings."""
+    return {"models": get_leaderboard().standings()}
+
+
 @app.post("/api/conversations/{conversation_id}/message")
 async def send_message(
     conversation_id: str,
@@ -114,11 +242,15 @@ async def send_message(
             code=ErrorCode.MISSING_API_KEY,
             message="OpenRouter API key is required. Please configure your API key in Settings."
         )
-    
+
+    mode = resolve_mode_or_raise(request.mode)
+
     try:
+        content, documents = await content_with_documents(request, x_openrouter_key)
+
         # Normalize input (text only here, but interface requires tuple unpacking)
         normalized_prompt, _ = await normalize_user_input(
-            text=request.content,
+            text=content,
             api_key=x_openrouter_key
         )
 
@@ -129,8 +261,16 @@ async def send_message(
             chairman_model=request.chairman_model,
             api_key=x_openrouter_key,
             system_prompt=request.system_prompt,
-            history=request.history or []
+            history=request.history or [],
+            mode=mode,
+            auto_council=request.auto_council,
+            consensus_shortcut=request.consensus_shortcut,
+            run_id=request.run_id,
+            generation=request.generation_overrides(),
+            degradation=get_admission_controller().degradation()
         )
+        if documents:
+            metadata["documents"] = documents
 
         # Return the complete response with metadata (no persistence)
         return {
@@ -155,7 +295,10 @@ async def send_message_with_vision(
     content: Optional[str] = Form(None),
     council_members: Optional[str] = Form(None),  # JSON string of list
     chairman_model: Optional[str] = Form(None),
+    mode: Optional[str] = Form(None),
+    auto_council: Optional[bool] = Form(None),
     image: Optional[UploadFile] = File(None),
+    images: Optional[List[UploadFile]] = File(None),
     x_openrouter_key: Optional[str] = Header(None, alias="X-OpenRouter-Key")
 ):
     """
@@ -166,7 +309,10 @@ async def send_message_with_vision(
         content: Optional text message
         council_members: Optional JSON string of model IDs
         chairman_model: Optional chairman model ID
+        mode: Optional latency tier ("fast", "balanced" or "thorough")
+        auto_council: Optional flag to prune weak/slow members using the leaderboard
         image: Optional image file upload
+        images: Optional further image uploads (pages of the same problem)
         
     Note: This endpoint does NOT persist messages - Convex handles persistence.
     Pass your OpenRouter API key in the X-OpenRouter-Key header to use BYOK.
@@ -177,6 +323,8 @@ async def send_message_with_vision(
             message="OpenRouter API key is required. Please configure your API key in Settings."
         )
     
+    mode = resolve_mode_or_raise(mode)
+
     # Parse council_members from JSON string if provided
     parsed_council_members = None
     if council_members:
@@ -187,18 +335,22 @@ async def send_message_with_vision(
     
     try:
         # Read image bytes if provided
-        image_bytes = None
-        mime_type = None
-        if image:
-            image_bytes = await image.read()
-            mime_type = image.content_type
+        uploads = ([image] if image else []) + list(images or [])
+        if len(uploads) > VISION_MAX_IMAGES:
+            raise CouncilException(
+                code=ErrorCode.INVALID_REQUEST,
+                message=f"At most {VISION_MAX_IMAGES} images can be sent at once."
+            )
+        try:
+            pages = [ImageInput(await read_image_upload(upload), upload.content_type) for upload in uploads]
+        except ImageTooLarge as e:
+            raise CouncilException(code=ErrorCode.FILE_TOO_LARGE, message=str(e))
         
-        # Normalize input (text, image, or both) into council-ready prompt
+        # Normalize input (text, images, or both) into council-ready prompt
         normalized_prompt, vision_context = await normalize_user_input(
             text=content,
-            image_bytes=image_bytes,
-            mime_type=mime_type,
-            api_key=x_openrouter_key
+            api_key=x_openrouter_key,
+            images=pages
         )
         
         # Run the 3-stage council process on normalized prompt
@@ -206,11 +358,14 @@ async def send_message_with_vision(
             normalized_prompt,
             council_members=parsed_council_members,
             chairman_model=chairman_model,
-            api_key=x_openrouter_key
+            api_key=x_openrouter_key,
+            mode=mode,
+            auto_council=auto_council,
+            degradation=get_admission_controller().degradation()
         )
         
         # Include vision processing info in metadata
-        metadata["vision_processed"] = image_bytes is not None
+        metadata["vision_processed"] = bool(pages)
         if vision_context:
             metadata["vision_context"] = vision_context
 
@@ -237,6 +392,157 @@ async def send_message_with_vision(
         )
 
 
+async def council_stream_events(
+    request: SendMessageRequest,
+    api_key: str,
+    mode: str
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run one streamed council turn and yield its events.
+
+    Shared by the SSE endpoint and the WebSocket transport so both send the
+    same event schema. Failures are reported as a final 'error' event.
+
+    Args:
+        request: The message
+        api_key: OpenRouter API key
+        mode: Resolved council mode
+    """
+    try:
+        # Normalize input (text, image, or both) into council-ready prompt
+        # Check for image data
+        pages = []
+
+        image_payloads = ([request.image_data] if request.image_data else []) + list(request.images or [])
+        image_payloads = [p for p in image_payloads if p and p.get("data")]
+        if len(image_payloads) > VISION_MAX_IMAGES:
+            yield {'type': 'error', 'error_code': ErrorCode.INVALID_REQUEST, 'message': f'At most {VISION_MAX_IMAGES} images can be sent at once.'}
+            return
+        if image_payloads:
+            try:
+                # Decode base64 data (size checked first; the base64 is kept for upload)
+                pages = [image_from_base64(p["data"], p.get("mime_type", "image/jpeg")) for p in image_payloads]
+                # Let client know vision processing is starting (can take 5-20s)
+                yield {'type': 'vision_processing', 'data': {'images': len(pages)}}
+            except ImageTooLarge as e:
+                yield {'type': 'error', 'error_code': ErrorCode.FILE_TOO_LARGE, 'message': str(e)}
+                return
+            except Exception as e:
+                # Report invalid image data to client
+                yield {'type': 'error', 'error_code': ErrorCode.INVALID_REQUEST, 'message': 'Failed to decode image data. Please check the file and try again.'}
+                return
+
+        input_events = None
+        try:
+            content, documents = await content_with_documents(request, api_key)
+        except CouncilException as e:
+            yield {'type': 'error', 'error_code': e.code, 'message': e.message}
+            return
+
+        if len(pages) == 1 and VISION_STREAMING_ENABLED:
+            # Stream the vision answer and start the council once the
+            # extracted text and entities are in; the rest arrives alongside
+            page = pages[0]
+            input_events = stream_user_input(
+                content, page.data, page.mime_type, api_key=api_key, image_base64=page.base64_data
+            )
+            normalized_prompt = None
+            async for event in input_events:
+                if event['type'] == 'prompt_ready':
+                    normalized_prompt = event['prompt']
+                    break
+                yield event
+            if normalized_prompt is None:
+                raise ValueError("Vision processing produced no usable context")
+        else:
+            normalized_prompt, vision_context = await normalize_user_input(
+                text=content,
+                api_key=api_key,
+                images=pages
+            )
+
+            # Emit vision context if available
+            if vision_context:
+                yield {'type': 'vision_complete', 'data': vision_context}
+
+        # Under brownout the run does less work (no LLM title from level 1)
+        degradation = get_admission_controller().degradation()
+
+        # Title the conversation on its first turn only: extracted locally,
+        # with an optional LLM title (in parallel) when that is low-confidence
+        title, title_info, title_task = None, None, None
+        if not request.history:
+            title, confidence = generate_local_title(request.content.strip() or normalized_prompt)
+            title_info = {"source": "local", "confidence": confidence}
+            llm_title = TITLE_LLM_UPGRADE if request.llm_title is None else request.llm_title
+            if llm_title and confidence < TITLE_MIN_CONFIDENCE and not degradation.skip_llm_title:
+                title_task = asyncio.create_task(generate_conversation_title(normalized_prompt, api_key=api_key))
+
+        # Stream the council stages as they complete
+        metadata = {}
+        council_events = stream_council(
+            normalized_prompt,
+            request.council_members,
+            chairman_model=request.chairman_model,
+            api_key=api_key,
+            system_prompt=request.system_prompt,
+            history=request.history or [],
+            mode=mode,
+            auto_council=request.auto_council,
+            consensus_shortcut=request.consensus_shortcut,
+            run_id=request.run_id,
+            generation=request.generation_overrides(),
+            degradation=degradation
+        )
+        if input_events is not None:
+            council_events = merge_streams(input_events, council_events)
+        async for event in council_events:
+            if event['type'] == 'council_complete':
+                metadata = event['metadata']
+                continue
+            yield event
+            if event['type'] == 'error':
+                if title_task:
+                    title_task.cancel()
+                await council_events.aclose()
+                return
+
+        if documents:
+            metadata["documents"] = documents
+
+        # Wait for the LLM title if one was requested (kept only if it succeeded)
+        if title_task:
+            llm_result = await title_task
+            if llm_result != DEFAULT_TITLE:
+                title = llm_result
+                title_info["source"] = "llm"
+        if title is not None:
+            metadata["title"] = title_info
+            # Emit the title event (Convex handles persistence)
+            yield {'type': 'title_complete', 'data': {'title': title}}
+
+        # Send completion event (no persistence - Convex handles it)
+        yield {'type': 'complete', 'metadata': metadata}
+
+    except Exception as e:
+        # Send error event with structured error code
+        error_code = ErrorCode.INTERNAL_ERROR
+        message = "Council processing failed. Please try again."
+        
+        error_str = str(e).lower()
+        if "api key" in error_str or "unauthorized" in error_str or "401" in error_str:
+            error_code = ErrorCode.INVALID_API_KEY
+            message = "Invalid API key. Please check your OpenRouter API key in Settings."
+        elif "rate limit" in error_str or "429" in error_str:
+            error_code = ErrorCode.RATE_LIMIT_EXCEEDED
+            message = "Rate limit exceeded. Please wait before trying again."
+        elif "timeout" in error_str:
+            error_code = ErrorCode.TIMEOUT
+            message = "Request timed out. Please try again."
+        
+        yield {'type': 'error', 'error_code': error_code, 'message': message}
+
+
 @app.post("/api/conversations/{conversation_id}/message/stream")
 async def send_message_stream(
     conversation_id: str,
@@ -263,109 +569,17 @@ async def send_message_stream(
     # Capture api_key for closure
     api_key = x_openrouter_key
 
-    # Use provided members or fallback to default
-    from .config import COUNCIL_MODELS
-    council_members = request.council_members or COUNCIL_MODELS
+    try:
+        mode = resolve_mode(request.mode)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error_code": ErrorCode.INVALID_REQUEST, "message": str(e)}
+        )
 
     async def event_generator():
-        try:
-            # Validate quorum
-            if len(council_members) < 1:
-                yield f"data: {json.dumps({'type': 'error', 'error_code': ErrorCode.INVALID_REQUEST, 'message': 'Council requires at least 1 member.'})}\n\n"
-                return
-
-            # Normalize input (text, image, or both) into council-ready prompt
-            # Check for image data
-            image_bytes = None
-            mime_type = None
-
-            if request.image_data and request.image_data.get("data"):
-                try:
-                    # Decode base64 data
-                    image_bytes = base64.b64decode(request.image_data["data"])
-                    mime_type = request.image_data.get("mime_type", "image/jpeg")
-                    # Let client know vision processing is starting (can take 5-20s)
-                    yield f"data: {json.dumps({'type': 'vision_processing'})}\n\n"
-                except Exception as e:
-                    # Report invalid image data to client
-                    yield f"data: {json.dumps({'type': 'error', 'error_code': ErrorCode.INVALID_REQUEST, 'message': 'Failed to decode image data. Please check the file and try again.'})}\n\n"
-                    return
-
-            normalized_prompt, vision_context = await normalize_user_input(
-                text=request.content,
-                image_bytes=image_bytes,
-                mime_type=mime_type,
-                api_key=api_key
-            )
-
-            # Emit vision context if available
-            if vision_context:
-                yield f"data: {json.dumps({'type': 'vision_complete', 'data': vision_context})}\n\n"
-
-            # Start title generation in parallel (don't await yet)
-            title_task = asyncio.create_task(generate_conversation_title(normalized_prompt, api_key=api_key))
-
-            # Stage 1: Collect responses
-            yield f"data: {json.dumps({'type': 'stage1_start'})}\n\n"
-            stage1_results = await stage1_collect_responses(
-                normalized_prompt, 
-                council_members, 
-                api_key=api_key,
-                system_prompt=request.system_prompt,
-                history=request.history or []
-            )
-
-            # Check quorum after response
-            if len(stage1_results) < 1:
-                yield f"data: {json.dumps({'type': 'error', 'error_code': ErrorCode.MODEL_UNAVAILABLE, 'message': 'No models responded. Please check your API key and try again.'})}\n\n"
-                return
-
-            yield f"data: {json.dumps({'type': 'stage1_complete', 'data': stage1_results})}\n\n"
-
-            # Stage 2: Collect rankings
-            yield f"data: {json.dumps({'type': 'stage2_start'})}\n\n"
-            stage2_results, label_to_model = await stage2_collect_rankings(normalized_prompt, stage1_results, council_members, api_key=api_key)
-            aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
-            yield f"data: {json.dumps({'type': 'stage2_complete', 'data': stage2_results, 'metadata': {'label_to_model': label_to_model, 'aggregate_rankings': aggregate_rankings}})}\n\n"
-
-            # Stage 3: Synthesize final answer
-            yield f"data: {json.dumps({'type': 'stage3_start'})}\n\n"
-            stage3_result = await stage3_synthesize_final(
-                normalized_prompt,
-                stage1_results,
-                stage2_results,
-                chairman_model=request.chairman_model,
-                api_key=api_key,
-                system_prompt=request.system_prompt,
-                history=request.history or []
-            )
-            yield f"data: {json.dumps({'type': 'stage3_complete', 'data': stage3_result})}\n\n"
-
-            # Wait for title generation and emit event (Convex handles persistence)
-            if title_task:
-                title = await title_task
-                yield f"data: {json.dumps({'type': 'title_complete', 'data': {'title': title}})}\n\n"
-
-            # Send completion event (no persistence - Convex handles it)
-            yield f"data: {json.dumps({'type': 'complete'})}\n\n"
-
-        except Exception as e:
-            # Send error event with structured error code
-            error_code = ErrorCode.INTERNAL_ERROR
-            message = "Council processing failed. Please try again."
-            
-            error_str = str(e).lower()
-            if "api key" in error_str or "unauthorized" in error_str or "401" in error_str:
-                error_code = ErrorCode.INVALID_API_KEY
-                message = "Invalid API key. Please check your OpenRouter API key in Settings."
-            elif "rate limit" in error_str or "429" in error_str:
-                error_code = ErrorCode.RATE_LIMIT_EXCEEDED
-                message = "Rate limit exceeded. Please wait before trying again."
-            elif "timeout" in error_str:
-                error_code = ErrorCode.TIMEOUT
-                message = "Request timed out. Please try again."
-            
-            yield f"data: {json.dumps({'type': 'error', 'error_code': error_code, 'message': message})}\n\n"
+        async for event in council_stream_events(request, api_key, mode):
+            yield f"data: {json.dumps(event)}\n\n"
 
     return StreamingResponse(
         event_generator(),
@@ -377,6 +591,90 @@ async def send_message_stream(
     )
 
 
+async def websocket_run_events(payload: Dict[str, Any], api_key: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+    """Validate a WebSocket 'start' message and stream its run like send_message_stream."""
+    if not api_key:
+        yield {'type': 'error', 'error_code': ErrorCode.MISSING_API_KEY, 'message': 'OpenRouter API key is required. Please configure your API key in Settings.'}
+        return
+    try:
+        request = SendMessageRequest.model_validate(payload)
+        mode = resolve_mode(request.mode)
+    except (ValidationError, ValueError) as e:
+        yield {'type': 'error', 'error_code': ErrorCode.INVALID_REQUEST, 'message': str(e)}
+        return
+    async for event in council_stream_events(request, api_key, mode):
+        yield event
+
+
+@app.websocket("/ws")
+async def council_websocket(
+    websocket: WebSocket,
+    x_openrouter_key: Optional[str] = Header(None, alias="X-OpenRouter-Key")
+):
+    """
+    Start, stream and cancel several council runs over one connection.
+
+    Runs are started with {"type": "start", ...} messages carrying the body of
+    /message/stream (and optionally "run_id" and "api_key"), and their events
+    are sent tagged with "run_id"; see backend/ws.py for the protocol. The API
+    key can also be given once in the X-OpenRouter-Key header.
+    """
+    await websocket.accept()
+    await CouncilSocket(websocket, websocket_run_events, api_key=x_openrouter_key).serve()
+
+
+@app.post("/api/runs/{run_id}/resynthesize")
+async def resynthesize(
+    run_id: str,
+    request: ResynthesizeRequest,
+    x_openrouter_key: Optional[str] = Header(None, alias="X-OpenRouter-Key")
+):
+    """
+    Re-run only the chairman (Stage 3) for a completed run.
+
+    Reuses the cached Stage 1 and Stage 2 results, so regenerating the final
+    answer or switching chairman costs one upstream call. Runs are kept for
+    a limited time and only for the API key that created them.
+    """
+    if not x_openrouter_key:
+        raise CouncilException(
+            code=ErrorCode.MISSING_API_KEY,
+            message="OpenRouter API key is required. Please configure your API key in Settings."
+        )
+
+    record = get_run_store().get(run_id, api_key=x_openrouter_key)
+    if record is None:
+        raise CouncilException(
+            code=ErrorCode.RUN_NOT_FOUND,
+            message="This council run is no longer available. Please send the message again.",
+            details={"run_id": run_id}
+        )
+
+    try:
+        stage3_result = await resynthesize_run(
+            record,
+            chairman_model=request.chairman_model,
+            system_prompt=request.system_prompt,
+            api_key=x_openrouter_key,
+            generation=request.generation.model_dump(exclude_none=True) if request.generation else None
+        )
+    except Exception as e:
+        raise CouncilException(
+            code=ErrorCode.INTERNAL_ERROR,
+            message="Resynthesis failed. Please try again.",
+            details={"original_error": str(e)}
+        )
+
+    return {
+        "stage3": stage3_result,
+        "metadata": {
+            "run_id": run_id,
+            "chairman": stage3_result["model"],
+            "resynthesized": True
+        }
+    }
+
+
 # ============================================================================
 # File Text Extraction Endpoint
 # ============================================================================
@@ -393,52 +691,58 @@ async def extract_file_text(
     """
     Extract plain text from an uploaded file.
     Supports: .txt, .md, .csv, .json, .docx, .pdf
-    Returns extracted text (truncated to MAX_EXTRACT_CHARS).
+    Returns extracted text (truncated to MAX_EXTRACT_CHARS) and, for PDF
+    and DOCX, the range of pages or paragraphs the text was taken from.
     """
-    filename = file.filename or ""
-    content_type = file.content_type or ""
+    try:
+        file_bytes = await read_upload(file, MAX_FILE_SIZE_BYTES)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File too large. Maximum size is 10MB.")
 
-    file_bytes = await file.read()
+    return await extract_upload_text(file.filename or "", file.content_type or "", file_bytes, x_openrouter_key)
 
-    if len(file_bytes) > MAX_FILE_SIZE_BYTES:
-        raise HTTPException(status_code=413, detail="File too large. Maximum size is 10MB.")
 
-    extracted_text = ""
+async def extract_upload_text(
+    filename: str,
+    content_type: str,
+    file_bytes: bytes,
+    api_key: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Extract the text of one uploaded file (see extract_file_text).
+
+    Raises:
+        HTTPException: With the status code for the failure (415, 422, 501, 503, 504, 500)
+    """
     ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    kind = detect_kind(filename, content_type)
+    doc_hash = document_hash(file_bytes)
+    cache_tier = None
 
     try:
         # --- Plain text formats ---
-        if ext in ("txt", "md", "csv", "json", "js", "ts", "py", "html", "xml") or content_type.startswith("text/"):
-            extracted_text = file_bytes.decode("utf-8", errors="replace")
-
-        # --- DOCX ---
-        elif ext in ("docx",) or content_type in (
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        ):
-            try:
-                import docx
-                doc = docx.Document(io.BytesIO(file_bytes))
-                paragraphs = [p.text for p in doc.paragraphs if p.text.strip()]
-                extracted_text = "\n".join(paragraphs)
-            except ImportError:
-                raise HTTPException(status_code=501, detail="DOCX extraction not available on this server.")
-            except Exception as e:
-                raise HTTPException(status_code=422, detail=f"Failed to parse DOCX: {str(e)}")
-
-        # --- PDF ---
-        elif ext == "pdf" or content_type == "application/pdf":
-            try:
-                from pdfminer.high_level import extract_text as pdf_extract_text
-                extracted_text = pdf_extract_text(io.BytesIO(file_bytes))
-            except ImportError:
-                raise HTTPException(status_code=501, detail="PDF extraction not available on this server.")
-            except Exception as e:
-                raise HTTPException(status_code=422, detail=f"Failed to parse PDF: {str(e)}")
+        if kind == "text":
+            extracted = extract_plain_text(file_bytes, MAX_EXTRACT_CHARS)
+
+        # --- DOCX / PDF: cached by content hash, otherwise parsed page by page
+        # in the extraction pool, off the event loop ---
+        elif kind in ("docx", "pdf"):
+            cache = get_extraction_cache()
+            cache_key = extraction_cache_key(doc_hash, kind, MAX_EXTRACT_CHARS)
+            extracted, cache_tier = await cache.get(cache_key)
+            if extracted is None:
+                extracted = await get_extraction_pool().run(extract_document, kind, file_bytes, MAX_EXTRACT_CHARS)
+                await cache.put(cache_key, extracted)
+            # Scanned pages: OCR through the vision models (cached once every page succeeded)
+            if extracted.textless and not (extracted.ocr and extracted.ocr["complete"]):
+                extracted = await ocr_textless_pages(extracted, file_bytes, api_key, MAX_EXTRACT_CHARS)
+                if extracted.ocr and extracted.ocr["complete"]:
+                    await cache.put(cache_key, extracted)
 
         else:
             # Attempt UTF-8 decode as last resort
             try:
-                extracted_text = file_bytes.decode("utf-8", errors="replace")
+                extracted = extract_plain_text(file_bytes, MAX_EXTRACT_CHARS)
             except Exception:
                 raise HTTPException(
                     status_code=415,
@@ -447,20 +751,115 @@ async def extract_file_text(
 
     except HTTPException:
         raise
+    except ExtractorUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ExtractionQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"{e}. Please try again shortly.")
+    except ExtractionTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ExtractionError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
 
-    # Truncate to limit
-    is_truncated = len(extracted_text) > MAX_EXTRACT_CHARS
-    if is_truncated:
-        extracted_text = extracted_text[:MAX_EXTRACT_CHARS]
+    # Index the document for retrieval (in the background: large files are re-read past MAX_EXTRACT_CHARS)
+    document_id = scoped_document_id(doc_hash, api_key)
+    get_document_store().schedule(
+        document_id, kind or "text", file_bytes, extracted, filename=filename or None, api_key=api_key
+    )
 
-    return {
+    response = {
         "filename": filename,
-        "text": extracted_text,
-        "char_count": len(extracted_text),
-        "truncated": is_truncated,
+        "document_id": document_id,
+        "text": extracted.text,
+        "char_count": len(extracted.text),
+        "truncated": extracted.truncated,
     }
+    if extracted.unit:
+        response["range"] = extracted.range_info()
+        response["cache"] = cache_tier or "miss"
+    if extracted.ocr:
+        response["ocr"] = extracted.ocr
+    return response
+
+
+@app.post("/api/files/extract/batch")
+async def extract_files_batch(
+    files: List[UploadFile] = File(...),
+    x_openrouter_key: Optional[str] = Header(None, alias="X-OpenRouter-Key")
+):
+    """
+    Extract several files concurrently, streaming each result as it finishes.
+
+    Returns NDJSON: one line per file, in completion order, shaped like the
+    /api/files/extract response plus 'index' (position in the upload) and
+    'status' (200, or the HTTP status of the failure with 'error'), then a
+    final {'done': true, ...} line. Files past EXTRACT_BATCH_MAX_BYTES in
+    total are rejected with status 413 without being parsed.
+    """
+    if len(files) > EXTRACT_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {EXTRACT_BATCH_MAX_FILES} files can be extracted at once.")
+
+    started = time.perf_counter()
+    pending: List[Any] = []
+    rejected: List[Dict[str, Any]] = []
+    remaining = EXTRACT_BATCH_MAX_BYTES
+    for index, upload in enumerate(files):
+        filename = upload.filename or ""
+        # The per-file cap is checked first so an oversized file gets the
+        # same error as on /api/files/extract, whatever budget is left
+        try:
+            file_bytes = await read_upload(upload, MAX_FILE_SIZE_BYTES)
+        except UploadTooLarge:
+            rejected.append({"index": index, "filename": filename, "status": 413, "error": "File too large. Maximum size is 10MB."})
+            continue
+        if len(file_bytes) > remaining:
+            rejected.append({
+                "index": index, "filename": filename, "status": 413,
+                "error": f"Batch size budget of {EXTRACT_BATCH_MAX_BYTES // (1024 * 1024)}MB exceeded."
+            })
+            continue
+        remaining -= len(file_bytes)
+        pending.append((index, filename, upload.content_type or "", file_bytes))
+
+    async def extract_one(index: int, filename: str, content_type: str, file_bytes: bytes) -> Dict[str, Any]:
+        try:
+            result = await extract_upload_text(filename, content_type, file_bytes, x_openrouter_key)
+            return {"index": index, "status": 200, **result}
+        except HTTPException as e:
+            return {"index": index, "filename": filename, "status": e.status_code, "error": e.detail}
+
+    async def ndjson_lines():
+        tasks = [asyncio.create_task(extract_one(*item)) for item in pending]
+        try:
+            for line in rejected:
+                yield json.dumps(line) + "\n"
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+            yield json.dumps({
+                "done": True,
+                "files": len(files),
+                "failed": len(rejected) + sum(1 for task in tasks if task.result()["status"] != 200),
+                "bytes": EXTRACT_BATCH_MAX_BYTES - remaining,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            }) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()  # Client went away: stop parsing (the pool kills the workers)
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@app.get("/api/files/metrics")
+async def get_file_metrics():
+    """Extraction pool load (busy workers, queue depth, parse times) and cache hit ratios."""
+    return {"pool": get_extraction_pool().stats(), "cache": get_extraction_cache().stats()}
+
+
+@app.get("/api/admission")
+async def get_admission_stats():
+    """Admission control load (loop lag, in-flight runs, pending upstream calls) and shed counts."""
+    return get_admission_controller().stats()
 
 
 if __name__ == "__main__":
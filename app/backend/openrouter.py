@@ -5,6 +5,8 @@ import httpx
 import time
 from typing import List, Dict, Any, Optional, Tuple, Set
 from .config import OPENROUTER_API_URL, OPENROUTER_API_KEY as DEFAULT_API_KEY
+from .cassette import upstream_request
+from .generation import GenerationParams, strip_reasoning
 
 # Fallback models for text queries (high availability, free)
 FALLBACK_MODELS = [
@@ -18,7 +20,8 @@ FALLBACK_MODELS = [
 # Simple in-memory cache
 MODEL_CACHE = {
     "data": [],
-    "timestamp": 0
+    "timestamp": 0,
+    "context_lengths": {}
 }
 CACHE_TTL = 300  # 5 minutes
 
@@ -102,10 +105,14 @@ async def query_model(
     model: str,
     messages: List[Dict[str, str]],
     timeout: float = 60.0,
-    api_key: Optional[str] = None
+    api_key: Optional[str] = None,
+    generation: Optional[GenerationParams] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Query a single model via OpenRouter.
+
+    The generation budget (max_tokens, reasoning) is added to the payload,
+    and reasoning is stripped from the returned message.
     """
     key = api_key or DEFAULT_API_KEY
     if not key:
@@ -123,10 +130,15 @@ async def query_model(
         "model": model,
         "messages": messages
     }
+    if generation:
+        payload.update(generation.to_payload())
     
     async with httpx.AsyncClient() as client:
         try:
-            response = await client.post(
+            response = await upstream_request(
+                "query_model",
+                client,
+                "POST",
                 OPENROUTER_API_URL,
                 headers=headers,
                 json=payload,
@@ -141,7 +153,7 @@ async def query_model(
             if "choices" not in data or not data["choices"]:
                 return None
                 
-            return data["choices"][0]["message"]
+            return strip_reasoning(data["choices"][0]["message"])
                 
         except httpx.TimeoutException:
             print(f"Timeout querying {model}")
@@ -154,16 +166,24 @@ async def query_model(
 async def query_models_parallel_with_fallbacks(
     models: List[str],
     messages: List[Dict[str, str]],
-    api_key: Optional[str] = None
+    api_key: Optional[str] = None,
+    quorum: Optional[int] = None,
+    quorum_grace: float = 0.0,
+    generation: Optional[GenerationParams] = None
 ) -> Dict[str, Optional[Dict[str, Any]]]:
     """
     Query multiple models in parallel with built-in retries using fallback models.
+
+    With a quorum, stops waiting once that many models have answered and a
+    further quorum_grace seconds have passed; models still running are
+    cancelled and reported as failed.
     
     Returns:
         Dict mapping original requested model to dict with:
         - "model_used": The actual model that succeeded
         - "message": The response message (or None if all failed)
         - "original_model": The original model requested
+        - "latency_ms": Response time of the successful call (absent on failure)
     """
     output = {}
     
@@ -172,9 +192,11 @@ async def query_models_parallel_with_fallbacks(
     
     async def worker(original_model: str):
         # 1. Try original model
-        result = await query_model(original_model, messages, api_key=api_key)
+        started = time.perf_counter()
+        result = await query_model(original_model, messages, api_key=api_key, generation=generation)
         if result is not None:
-             return original_model, {"model_used": original_model, "message": result, "original_model": original_model}
+             latency_ms = (time.perf_counter() - started) * 1000
+             return original_model, {"model_used": original_model, "message": result, "original_model": original_model, "latency_ms": latency_ms}
         
         # 2. Original failed, try fallbacks sequentially
         for fallback in FALLBACK_MODELS:
@@ -185,35 +207,66 @@ async def query_models_parallel_with_fallbacks(
             
             used_fallbacks.add(fallback) # claim it
             print(f"Fallback triggered: replacing {original_model} with {fallback}")
-            fallback_result = await query_model(fallback, messages, api_key=api_key)
+            started = time.perf_counter()
+            fallback_result = await query_model(fallback, messages, api_key=api_key, generation=generation)
             if fallback_result is not None:
-                return original_model, {"model_used": fallback, "message": fallback_result, "original_model": original_model}
+                latency_ms = (time.perf_counter() - started) * 1000
+                return original_model, {"model_used": fallback, "message": fallback_result, "original_model": original_model, "latency_ms": latency_ms}
                 
         # 3. All fallbacks failed
         print(f"All fallbacks failed for {original_model}")
         return original_model, {"model_used": original_model, "message": None, "original_model": original_model}
 
-    tasks = [worker(m) for m in models]
-    results = await asyncio.gather(*tasks)
-    
-    for req_model, data in results:
-        output[req_model] = data
-        
-    return output
+    if not quorum or quorum >= len(models):
+        tasks = [worker(m) for m in models]
+        results = await asyncio.gather(*tasks)
+
+        for req_model, data in results:
+            output[req_model] = data
+
+        return output
+
+    # Early quorum: collect answers as they arrive
+    pending = {asyncio.create_task(worker(m)): m for m in models}
+    answered = 0
+    deadline = None
+    try:
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break  # grace period over
+            for task in done:
+                pending.pop(task)
+                req_model, data = task.result()
+                output[req_model] = data
+                if data["message"] is not None:
+                    answered += 1
+            if deadline is None and answered >= quorum:
+                deadline = time.monotonic() + quorum_grace
+    finally:
+        for task, req_model in pending.items():
+            task.cancel()
+            print(f"Quorum reached: cancelled {req_model}")
+            output[req_model] = {"model_used": req_model, "message": None, "original_model": req_model}
+
+    # Keep the requested order
+    return {m: output[m] for m in models}
 
 
 async def query_model_with_fallback(
     model: str,
     messages: List[Dict[str, str]],
     timeout: float = 60.0,
-    api_key: Optional[str] = None
+    api_key: Optional[str] = None,
+    generation: Optional[GenerationParams] = None
 ) -> Tuple[Optional[Dict[str, Any]], str]:
     """
     Queries a single model and falls back if it fails.
     Useful for the Chairman model (Stage 3).
     Returns (response_message, actual_model_used)
     """
-    result = await query_model(model, messages, timeout=timeout, api_key=api_key)
+    result = await query_model(model, messages, timeout=timeout, api_key=api_key, generation=generation)
     if result is not None:
         return result, model
         
@@ -221,7 +274,7 @@ async def query_model_with_fallback(
         if fallback == model:
             continue
         print(f"Stage 3 Fallback triggered: replacing {model} with {fallback}")
-        fallback_result = await query_model(fallback, messages, timeout=timeout, api_key=api_key)
+        fallback_result = await query_model(fallback, messages, timeout=timeout, api_key=api_key, generation=generation)
         if fallback_result is not None:
             return fallback_result, fallback
             
@@ -241,7 +294,7 @@ async def get_free_models() -> List[Dict[str, Any]]:
     
     async with httpx.AsyncClient() as client:
         try:
-            response = await client.get(url)
+            response = await upstream_request("get_free_models", client, "GET", url)
             
             if response.status_code != 200:
                 return MODEL_CACHE["data"] # Return stale data if fetch fails
@@ -267,8 +320,21 @@ async def get_free_models() -> List[Dict[str, Any]]:
             # Update cache
             MODEL_CACHE["data"] = free_models
             MODEL_CACHE["timestamp"] = now
+            MODEL_CACHE["context_lengths"] = {
+                m["id"]: m["context_length"] for m in free_models if m["context_length"]
+            }
             
             return free_models
         except Exception as e:
             print(f"Error fetching models: {e}")
             return MODEL_CACHE["data"] # Return stale data on error
+
+
+def cached_context_lengths() -> Dict[str, int]:
+    """
+    Context window per model id from the last fetched catalogue.
+
+    Never fetches; stale data is returned as is and the dict is empty until
+    get_free_models() has succeeded once.
+    """
+    return MODEL_CACHE["context_lengths"]
@@ -0,0 +1,234 @@
+"""
+Ranking engine for Stage 2 peer reviews.
+
+Parses "FINAL RANKING:" sections with precompiled patterns in a single scan,
+supports any number of anonymized labels (Response A..Z, AA, AB, ...), and
+aggregates rankings through a rank matrix (rows = rankers, columns = labels)
+so Borda, mean-rank and agreement scores can be computed in one pass even
+for large batch evaluations.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+RANKING_MARKER = "FINAL RANKING:"
+
+# One pattern covers both "1. Response A" and bare "Response A" mentions;
+# group 1 is set only for numbered entries.
+_LABEL_PATTERN = re.compile(r"(\d+\.\s*)?Response ([A-Z]+)\b")
+
+RankMatrix = List[List[Optional[int]]]
+
+
+def response_label(index: int) -> str:
+    """Return the anonymized label for a 0-based response index (A..Z, AA, AB, ...)."""
+    letters = ""
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return f"Response {letters}"
+
+
+def parse_ranking_from_text(
+    ranking_text: str,
+    valid_labels: Optional[Iterable[str]] = None,
+    require_marker: bool = False
+) -> List[str]:
+    """
+    Parse the FINAL RANKING section from the model's response.
+
+    Numbered entries ("1. Response C") are preferred; if the section has
+    none, every label mention in it is used in order. Without a FINAL
+    RANKING section the whole text is scanned, unless require_marker is set.
+    Repeated labels keep their first position.
+
+    Args:
+        ranking_text: The full text response from the model
+        valid_labels: Optional set of labels to accept (others are ignored)
+        require_marker: Return no ranking when the FINAL RANKING section is
+            missing, e.g. because the review was cut off by max_tokens,
+            instead of guessing from the order labels are mentioned in
+
+    Returns:
+        List of response labels in ranked order
+    """
+    start = ranking_text.find(RANKING_MARKER)
+    if start == -1 and require_marker:
+        return []
+    if start == -1:
+        section = ranking_text
+    else:
+        start += len(RANKING_MARKER)
+        end = ranking_text.find(RANKING_MARKER, start)
+        section = ranking_text[start:] if end == -1 else ranking_text[start:end]
+
+    allowed = set(valid_labels) if valid_labels is not None else None
+    numbered: List[str] = []
+    mentioned: List[str] = []
+    for match in _LABEL_PATTERN.finditer(section):
+        label = f"Response {match.group(2)}"
+        if allowed is not None and label not in allowed:
+            continue
+        if match.group(1) and start != -1:
+            numbered.append(label)
+        elif not numbered:
+            mentioned.append(label)
+
+    ordered = numbered or mentioned
+    return list(dict.fromkeys(ordered))
+
+
+def build_rank_matrix(
+    parsed_rankings: Sequence[Sequence[str]],
+    labels: Sequence[str]
+) -> RankMatrix:
+    """
+    Build a rank matrix from parsed rankings.
+
+    Returns one row per ranker with the 1-based position of each label,
+    or None where the ranker did not rank that label.
+    """
+    column = {label: i for i, label in enumerate(labels)}
+    matrix = []
+    for ranking in parsed_rankings:
+        row: List[Optional[int]] = [None] * len(labels)
+        position = 0
+        for label in ranking:
+            index = column.get(label)
+            if index is not None and row[index] is None:
+                position += 1
+                row[index] = position
+        matrix.append(row)
+    return matrix
+
+
+def mean_ranks(matrix: RankMatrix) -> List[Optional[float]]:
+    """Average position of each column, ignoring rankers that skipped it."""
+    if not matrix:
+        return []
+    totals = [0] * len(matrix[0])
+    counts = [0] * len(matrix[0])
+    for row in matrix:
+        for j, position in enumerate(row):
+            if position is not None:
+                totals[j] += position
+                counts[j] += 1
+    return [totals[j] / counts[j] if counts[j] else None for j in range(len(totals))]
+
+
+def rank_counts(matrix: RankMatrix) -> List[int]:
+    """Number of rankers that ranked each column."""
+    if not matrix:
+        return []
+    counts = [0] * len(matrix[0])
+    for row in matrix:
+        for j, position in enumerate(row):
+            if position is not None:
+                counts[j] += 1
+    return counts
+
+
+def borda_scores(matrix: RankMatrix) -> List[int]:
+    """Borda count per column: a label ranked p-th of n scores n - p points."""
+    if not matrix:
+        return []
+    scores = [0] * len(matrix[0])
+    for row in matrix:
+        ranked = sum(1 for position in row if position is not None)
+        for j, position in enumerate(row):
+            if position is not None:
+                scores[j] += ranked - position
+    return scores
+
+
+def ranking_agreement(matrix: RankMatrix) -> Optional[float]:
+    """
+    Kendall's W (coefficient of concordance) across complete rankings.
+
+    Returns a value in [0, 1] where 1 means every ranker produced the same
+    order, or None when fewer than two complete rankings of two or more
+    labels are available.
+    """
+    complete = [row for row in matrix if row and all(position is not None for position in row)]
+    m = len(complete)
+    n = len(complete[0]) if complete else 0
+    if m < 2 or n < 2:
+        return None
+    sums = [0] * n
+    for row in complete:
+        for j, position in enumerate(row):
+            sums[j] += position
+    mean_sum = m * (n + 1) / 2
+    spread = sum((total - mean_sum) ** 2 for total in sums)
+    return round(12 * spread / (m * m * (n ** 3 - n)), 4)
+
+
+def parsed_rankings_for(
+    stage2_results: List[Dict[str, Any]],
+    label_to_model: Dict[str, str]
+) -> List[List[str]]:
+    """Reuse each result's parsed_ranking, parsing only when it is missing."""
+    parsed = []
+    for ranking in stage2_results:
+        labels = ranking.get("parsed_ranking")
+        if labels is None:
+            labels = parse_ranking_from_text(ranking.get("ranking", ""), label_to_model, require_marker=True)
+        parsed.append(labels)
+    return parsed
+
+
+def calculate_aggregate_rankings(
+    stage2_results: List[Dict[str, Any]],
+    label_to_model: Dict[str, str]
+) -> List[Dict[str, Any]]:
+    """
+    Calculate aggregate rankings across all models.
+
+    Args:
+        stage2_results: Rankings from each model
+        label_to_model: Mapping from anonymous labels to model names
+
+    Returns:
+        List of dicts with model name, average rank and Borda score, sorted best to worst
+    """
+    labels = list(label_to_model)
+    matrix = build_rank_matrix(parsed_rankings_for(stage2_results, label_to_model), labels)
+    means = mean_ranks(matrix)
+    counts = rank_counts(matrix)
+    borda = borda_scores(matrix)
+
+    # Merge columns per model (two labels can resolve to the same model after fallbacks)
+    totals: Dict[str, Dict[str, float]] = {}
+    for j, label in enumerate(labels):
+        if not counts[j]:
+            continue
+        model = label_to_model[label]
+        entry = totals.setdefault(model, {"sum": 0, "count": 0, "borda": 0})
+        entry["sum"] += means[j] * counts[j]
+        entry["count"] += counts[j]
+        entry["borda"] += borda[j]
+
+    aggregate = [
+        {
+            "model": model,
+            "average_rank": round(entry["sum"] / entry["count"], 2),
+            "rankings_count": entry["count"],
+            "borda_score": entry["borda"],
+        }
+        for model, entry in totals.items()
+    ]
+
+    # Sort by average rank (lower is better)
+    aggregate.sort(key=lambda x: x['average_rank'])
+
+    return aggregate
+
+
+def aggregate_agreement(
+    stage2_results: List[Dict[str, Any]],
+    label_to_model: Dict[str, str]
+) -> Optional[float]:
+    """Kendall's W for a Stage 2 round, reusing already-parsed rankings."""
+    matrix = build_rank_matrix(parsed_rankings_for(stage2_results, label_to_model), list(label_to_model))
+    return ranking_agreement(matrix)
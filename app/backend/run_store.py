@@ -0,0 +1,69 @@
+"""
+Store of completed council runs.
+
+Stage 1 and Stage 2 results are kept per run id in a bounded LRU so the
+chairman can be re-run alone (a single upstream call) with a different
+model or system prompt instead of repeating the whole council. Run ids may
+be chosen by the client, so runs are keyed by (API key hash, run id): a key
+reusing another key's run id stores a separate run rather than replacing it.
+"""
+
+import hashlib
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .cache import LRUCache
+from .config import RUN_STORE_MAX_RUNS, RUN_STORE_TTL_SECONDS
+from .generation import GenerationParams
+
+
+@dataclass
+class RunRecord:
+    """Everything Stage 3 needs to synthesize again."""
+    run_id: str
+    user_query: str
+    stage1_results: List[Dict[str, Any]]
+    stage2_results: List[Dict[str, Any]]
+    chairman_model: Optional[str] = None
+    system_prompt: Optional[str] = None
+    history: List[Dict[str, str]] = field(default_factory=list)
+    consensus: Optional[Dict[str, Any]] = None
+    generation: Optional[GenerationParams] = None  # Stage 3 budget of the run
+    api_key_hash: Optional[str] = None
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+def hash_api_key(api_key: Optional[str]) -> Optional[str]:
+    """Runs are bound to the key that created them without storing the key."""
+    if not api_key:
+        return None
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class RunStore:
+    """Bounded, expiring store of completed runs keyed by (API key hash, run id)."""
+
+    def __init__(self, max_runs: int = RUN_STORE_MAX_RUNS, ttl_seconds: float = RUN_STORE_TTL_SECONDS):
+        self._runs: LRUCache[RunRecord] = LRUCache(max_runs, ttl_seconds)
+
+    def save(self, record: RunRecord) -> None:
+        self._runs.put((record.api_key_hash, record.run_id), record)
+
+    def get(self, run_id: str, api_key: Optional[str] = None) -> Optional[RunRecord]:
+        """Return the run with this id created with the same API key, if any."""
+        return self._runs.get((hash_api_key(api_key), run_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return self._runs.stats()
+
+
+_run_store = RunStore()
+
+
+def get_run_store() -> RunStore:
+    """Return the process-wide run store."""
+    return _run_store
@@ -0,0 +1,41 @@
+"""Helpers for combining async event streams."""
+
+import asyncio
+from typing import Any, AsyncIterator
+
+_DONE = object()
+
+
+async def merge_streams(*streams: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """
+    Yield items from several async iterators as they arrive.
+
+    Each stream is drained by its own task. An exception in any stream is
+    re-raised to the consumer, and closing the merged stream cancels the
+    tasks still running.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump(stream: AsyncIterator[Any]) -> None:
+        try:
+            async for item in stream:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((None, e))
+        finally:
+            await queue.put((_DONE, None))
+
+    tasks = [asyncio.create_task(pump(stream)) for stream in streams]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is _DONE:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
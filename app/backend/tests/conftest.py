@@ -0,0 +1,11 @@
+"""Keep tests away from the files a running server persists to."""
+
+import os
+
+# Read by backend.config at import time, so set before any backend import
+os.environ.update({
+    "LEADERBOARD_ENABLED": "false",
+    "EXTRACT_CACHE_PATH": "",
+    "VISION_CACHE_DIR": "",
+    "COUNCIL_CASSETTE_MODE": "off",
+})
@@ -0,0 +1,63 @@
+"""Tests for admission control and brownout hysteresis."""
+
+import pytest
+
+from backend import admission
+from backend.admission import AdmissionController
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    controller = AdmissionController(
+        max_inflight_runs=100,
+        brownout_enabled=True,
+        brownout_thresholds=(0.5, 0.75),
+        brownout_hysteresis=0.15,
+        brownout_hold_seconds=10,
+    )
+    controller.clock = clock
+    return controller
+
+
+def _level_at(controller, load, after=0.0):
+    controller.clock.now += after
+    controller.inflight_runs = round(load * 100)
+    return controller.brownout_level()
+
+
+def test_levels_rise_at_once_and_fall_one_at_a_time(controller):
+    assert _level_at(controller, 0.8) == 2
+    assert _level_at(controller, 0.1) == 2
+    assert _level_at(controller, 0.1, after=10) == 1
+    # Each level down needs its own hold
+    assert _level_at(controller, 0.1) == 1
+    assert _level_at(controller, 0.1, after=9) == 1
+    assert _level_at(controller, 0.1, after=1) == 0
+
+
+def test_hold_counts_from_when_load_dropped_not_from_the_last_change(controller):
+    assert _level_at(controller, 0.6) == 1
+    # Load stays high well past the hold, then dips once
+    assert _level_at(controller, 0.6, after=60) == 1
+    assert _level_at(controller, 0.2) == 1
+    assert _level_at(controller, 0.2, after=9) == 1
+    assert _level_at(controller, 0.2, after=1) == 0
+
+
+def test_load_back_inside_the_margin_restarts_the_hold(controller):
+    assert _level_at(controller, 0.6) == 1
+    assert _level_at(controller, 0.2) == 1
+    assert _level_at(controller, 0.4, after=8) == 1  # Above 0.5 - 0.15
+    assert _level_at(controller, 0.2, after=1) == 1
+    assert _level_at(controller, 0.2, after=9) == 1
+    assert _level_at(controller, 0.2, after=1) == 0
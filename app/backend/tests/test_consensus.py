@@ -0,0 +1,52 @@
+"""Tests for the Stage 1 consensus check."""
+
+from backend.consensus import STOPWORDS, NEGATIONS, answer_polarity, check_consensus
+
+EXPLANATION = (
+    "Photosynthesis converts light energy into chemical energy. Plants use chlorophyll "
+    "to absorb sunlight, take in carbon dioxide and water, and produce glucose and oxygen."
+)
+
+
+def _results(*answers):
+    return [{"model": f"m{i}", "response": answer} for i, answer in enumerate(answers)]
+
+
+def test_negations_are_not_stopwords():
+    assert not NEGATIONS & STOPWORDS
+
+
+def test_matching_answers_agree():
+    info = check_consensus(_results(EXPLANATION, EXPLANATION + " It happens in chloroplasts."), enabled=True)
+    assert info["agreed"]
+
+
+def test_contradicting_short_answers_do_not_agree():
+    info = check_consensus(_results(
+        "91 is a prime number. It equals 7 times 13.",
+        "91 is not a prime number. It equals 7 times 13.",
+    ), enabled=True, threshold=0.5)
+    assert not info["agreed"]
+
+
+def test_contradicting_long_answers_do_not_agree():
+    # Nearly every shingle is shared; only the verdict differs
+    info = check_consensus(_results(
+        "Yes, the function is thread safe. " + EXPLANATION,
+        "No, the function is thread safe only with a lock. " + EXPLANATION,
+    ), enabled=True)
+    assert info["min_similarity"] >= info["threshold"]
+    assert not info["agreed"]
+
+
+def test_answer_polarity():
+    assert answer_polarity("Yes. Because...") == "yes"
+    assert answer_polarity("No, it is not.") == "no"
+    assert answer_polarity("It isn't safe to do that.") == "negative"
+    assert answer_polarity("It is not never true.") == "positive"
+    assert answer_polarity("Pi is 3.14 roughly, not 3.") == "negative"
+
+
+def test_disabled_or_single_answer_never_agrees():
+    assert not check_consensus(_results(EXPLANATION, EXPLANATION), enabled=False)["agreed"]
+    assert not check_consensus(_results(EXPLANATION), enabled=True)["agreed"]
@@ -0,0 +1,65 @@
+"""Tests for the council latency tiers."""
+
+import asyncio
+import time
+
+import pytest
+
+import backend.openrouter as openrouter
+from backend import context_guard
+from backend.council import run_full_council, wait_background_tasks
+from backend.run_store import get_run_store
+from benchmarks.council_replay import check_budgets
+
+MEMBERS = ["test/m1", "test/m2", "test/m3"]
+RANKING_DELAY = 0.5
+
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    async def query_model(model, messages, timeout=60.0, api_key=None, **kwargs):
+        if "FINAL RANKING" in messages[-1]["content"]:
+            await asyncio.sleep(RANKING_DELAY)
+            return {"role": "assistant", "content": "FINAL RANKING:\n1. Response B\n2. Response A\n3. Response C"}
+        return {"role": "assistant", "content": f"Answer from {model}."}
+
+    async def get_free_models():
+        return []
+
+    monkeypatch.setattr(openrouter, "query_model", query_model)
+    monkeypatch.setattr(context_guard, "get_free_models", get_free_models)
+
+
+def test_fast_mode_completes_without_waiting_for_the_ranking(fake_upstream):
+    async def run():
+        started = time.perf_counter()
+        stage1, stage2, stage3, metadata = await run_full_council(
+            "What is 2 + 2?", MEMBERS, api_key="key", mode="fast", run_id="fast-run"
+        )
+        elapsed = time.perf_counter() - started
+        await wait_background_tasks()
+        return stage2, stage3, metadata, elapsed
+
+    stage2, stage3, metadata, elapsed = asyncio.run(run())
+    assert elapsed < RANKING_DELAY
+    assert stage2 == []
+    assert stage3["response"]
+    assert metadata["critical_path"] == ["stage1", "stage3"]
+    # The detached ranking still reaches the run store and the metadata
+    assert len(get_run_store().get("fast-run", api_key="key").stage2_results) == len(MEMBERS)
+    assert metadata["aggregate_rankings"]
+
+
+def test_thorough_mode_waits_for_every_stage(fake_upstream):
+    _, stage2, _, metadata = asyncio.run(run_full_council("What is 2 + 2?", MEMBERS, api_key="key", mode="thorough"))
+    assert len(stage2) == len(MEMBERS)
+    assert metadata["critical_path"] == ["stage1", "stage2", "stage3"]
+
+
+def test_check_budgets_flags_extra_rounds():
+    budget = {"max_calls": 7, "critical_path_rounds": 2, "max_seconds": 30.0}
+    timing = {"query": "q", "seconds": 1.0, "upstream_calls": 7, "budget": budget,
+              "critical_path": ["stage1", "stage3"]}
+    assert check_budgets([[timing]], 1.0) == []
+    timing["critical_path"] = ["stage1", "stage3", "stage2"]
+    assert len(check_budgets([[timing]], 1.0)) == 1
@@ -0,0 +1,82 @@
+"""Tests for budgeted document extraction."""
+
+import io
+
+import pytest
+
+from backend.documents.extract import ExtractedDocument, _Budget, extract_document, extract_plain_text, replace_units
+
+
+def test_budget_cuts_the_unit_that_crosses_it():
+    budget = _Budget(10)
+    for text in ("abcdef", "ghijkl", "mnop"):
+        budget.start_unit()
+        budget.add(text)
+        if budget.full:
+            break
+    result = budget.result("page", kept=2, total=3)
+
+    assert result.text == "abcdefghij"
+    assert result.truncated
+    assert result.offsets == [0, 6]
+    assert (result.start, result.end, result.total) == (1, 2, 3)
+
+
+def test_unlimited_budget_keeps_everything():
+    budget = _Budget(None)
+    budget.start_unit()
+    budget.add("one\n")
+    result = budget.result("paragraph", kept=1, total=1, strip_newline=True)
+
+    assert result.text == "one"
+    assert not result.truncated
+
+
+def test_plain_text_stops_at_the_budget():
+    extracted = extract_plain_text("é".encode("utf-8") * 100, max_chars=10)
+
+    assert extracted.text == "é" * 10
+    assert extracted.truncated
+
+
+def test_docx_reading_stops_once_the_budget_is_reached():
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    for i in range(1, 51):
+        document.add_paragraph(f"Paragraph {i} " + "x" * 20)
+    buffer = io.BytesIO()
+    document.save(buffer)
+
+    extracted = extract_document("docx", buffer.getvalue(), max_chars=100)
+
+    assert len(extracted.text) == 100
+    assert extracted.truncated
+    assert extracted.unit == "paragraph"
+    assert (extracted.start, extracted.end, extracted.total) == (1, 4, 50)
+    assert extracted.text.startswith("Paragraph 1 ")
+
+
+def _scanned_pdf_extraction():
+    text = "Page one.\n\fPage three.\n\f"
+    return ExtractedDocument(
+        text=text, truncated=False, unit="page", start=1, end=3, total=3,
+        offsets=[0, 11, 11], textless=[2],
+    )
+
+
+def test_ocr_text_is_merged_in_page_order():
+    merged = replace_units(_scanned_pdf_extraction(), {2: "Page two (OCR).\n"})
+
+    assert merged.text == "Page one.\n\fPage two (OCR).\nPage three.\n\f"
+    assert merged.offsets == [0, 11, 27]
+    assert (merged.start, merged.end, merged.total) == (1, 3, 3)
+    assert merged.textless == [2]
+    assert not merged.truncated
+
+
+def test_merged_text_keeps_to_the_budget():
+    merged = replace_units(_scanned_pdf_extraction(), {2: "x" * 50}, max_chars=20)
+
+    assert merged.text == "Page one.\n\f" + "x" * 9
+    assert merged.end == 2
+    assert merged.truncated
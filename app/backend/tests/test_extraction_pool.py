@@ -0,0 +1,35 @@
+"""Tests for the document extraction pool."""
+
+import asyncio
+
+import pytest
+
+from backend.documents.pool import ExtractionPool, ExtractionQueueFull
+
+
+def test_executor_killed_by_shutdown_is_not_reused():
+    pool = ExtractionPool(size=1, max_queue=0, timeout=1)
+
+    async def run():
+        executor = pool._new_executor()
+        assert await pool._acquire() is None
+        pool.busy = 1
+        pool.shutdown()  # The job using `executor` is still running
+        pool.busy = 0
+        pool._release(executor)
+        assert pool._idle == [None]
+        return await pool._acquire()
+
+    assert asyncio.run(run()) is None
+
+
+def test_waiters_beyond_the_queue_limit_are_rejected():
+    pool = ExtractionPool(size=1, max_queue=0, timeout=1)
+
+    async def run():
+        await pool._acquire()
+        with pytest.raises(ExtractionQueueFull):
+            await pool._acquire()
+
+    asyncio.run(run())
+    assert pool.rejected == 1
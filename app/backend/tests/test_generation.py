@@ -0,0 +1,45 @@
+"""Tests for per-stage generation budgets."""
+
+import asyncio
+
+import backend.openrouter as openrouter
+from backend.council import _compact_ranking_generation, stage2_collect_rankings
+from backend.config import COMPACT_RANKING_MAX_TOKENS
+from backend.generation import STAGE_DEFAULTS, GenerationParams, resolve_generation
+
+
+def test_stage1_and_stage2_are_uncapped_by_default():
+    for stage in ("stage1", "stage2"):
+        assert "max_tokens" not in STAGE_DEFAULTS[stage].to_payload()
+        assert STAGE_DEFAULTS[stage].reasoning_effort is None
+
+
+def test_overrides_apply_per_stage():
+    resolved = resolve_generation({"stage2": {"max_tokens": 300}})
+    assert resolved["stage2"].max_tokens == 300
+    assert resolved["stage1"] == STAGE_DEFAULTS["stage1"]
+
+
+def test_compact_ranking_gets_the_tighter_cap():
+    assert _compact_ranking_generation(GenerationParams()).max_tokens == COMPACT_RANKING_MAX_TOKENS
+    assert _compact_ranking_generation(GenerationParams(max_tokens=100)).max_tokens == 100
+    assert _compact_ranking_generation(GenerationParams()).reasoning_effort == "low"
+
+
+def test_truncated_ranking_is_reported_unparsed(monkeypatch):
+    payloads = []
+
+    async def query_model(model, messages, timeout=60.0, api_key=None, generation=None, **kwargs):
+        payloads.append(generation.to_payload())
+        if model == "test/cut":
+            # The review ran out of tokens before its FINAL RANKING section
+            return {"role": "assistant", "content": "Response B is clear. Response A is"}
+        return {"role": "assistant", "content": "Reviews...\nFINAL RANKING:\n1. Response A\n2. Response B"}
+
+    monkeypatch.setattr(openrouter, "query_model", query_model)
+    stage1 = [{"model": "test/a", "response": "one"}, {"model": "test/b", "response": "two"}]
+    results, _ = asyncio.run(stage2_collect_rankings("q", stage1, ["test/full", "test/cut"], api_key="key"))
+
+    parsed = {r["model"]: r["parsed_ranking"] for r in results}
+    assert parsed == {"test/full": ["Response A", "Response B"], "test/cut": []}
+    assert all("max_tokens" not in payload for payload in payloads)
@@ -0,0 +1,68 @@
+"""Tests for the model leaderboard."""
+
+import asyncio
+import json
+
+from backend.leaderboard import Leaderboard
+
+LABEL_TO_MODEL = {"Response A": "m1", "Response B": "m2", "Response C": "m3"}
+
+
+def _round(*rankings):
+    return [{"model": f"ranker{i}", "parsed_ranking": ranking} for i, ranking in enumerate(rankings)]
+
+
+def test_round_counts_once_per_run_whatever_the_rankers():
+    board = Leaderboard(enabled=True)
+    board.record_round(_round(
+        ["Response A", "Response B", "Response C"],
+        ["Response A", "Response C", "Response B"],
+        ["Response B", "Response A", "Response C"],
+        ["Response A", "Response B", "Response C"],
+    ), LABEL_TO_MODEL)
+
+    m1, m3 = board.models["m1"], board.models["m3"]
+    assert m1.rounds == 1 and m3.rounds == 1
+    assert m1.mean_score == (1 + 1 + 0.5 + 1) / 4
+    assert m3.last_place_rate == 0.75
+
+
+def test_rounds_without_usable_rankings_are_ignored():
+    board = Leaderboard(enabled=True)
+    board.record_round(_round(["Response A"], []), LABEL_TO_MODEL)
+    assert board.models == {}
+
+
+def test_select_council_needs_min_samples_runs():
+    board = Leaderboard(enabled=True)
+    worst_last = _round(["Response A", "Response B", "Response C"], ["Response B", "Response A", "Response C"])
+    members = ["m1", "m2", "m3"]
+    for _ in range(4):
+        board.record_round(worst_last, LABEL_TO_MODEL)
+    assert board.select_council(members, min_members=2, min_samples=5)[0] == members
+    board.record_round(worst_last, LABEL_TO_MODEL)
+    selected, dropped = board.select_council(members, min_members=2, min_samples=5)
+    assert selected == ["m1", "m2"]
+    assert dropped == [{"model": "m3", "reason": "ranked_last"}]
+
+
+def test_update_during_a_write_is_flushed(tmp_path):
+    path = tmp_path / "leaderboard.json"
+    board = Leaderboard(str(path), enabled=True, flush_seconds=0.01)
+    original_write = board._write
+
+    def slow_write(rows):
+        original_write(rows)
+        # A round recorded while this write is in progress
+        board.models["late"] = board.models["m1"]
+        board.dirty = True
+
+    async def run():
+        board._write = slow_write
+        board.record_round(_round(["Response A", "Response B"]), LABEL_TO_MODEL)
+        await asyncio.sleep(0.05)
+        board._write = original_write
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert "late" in json.loads(path.read_text())
@@ -0,0 +1,77 @@
+"""Tests for the Stage 2 ranking engine."""
+
+from backend.ranking import (
+    borda_scores,
+    build_rank_matrix,
+    calculate_aggregate_rankings,
+    mean_ranks,
+    parse_ranking_from_text,
+    ranking_agreement,
+    response_label,
+)
+
+LABELS = ["Response A", "Response B", "Response C"]
+
+
+def test_response_label_continues_past_z():
+    assert response_label(0) == "Response A"
+    assert response_label(25) == "Response Z"
+    assert response_label(26) == "Response AA"
+    assert response_label(27) == "Response AB"
+
+
+def test_parse_prefers_numbered_entries_of_final_section():
+    text = (
+        "Response A is thorough. Response B is wrong.\n\n"
+        "FINAL RANKING:\n1. Response C\n2. Response A\n3. Response B"
+    )
+    assert parse_ranking_from_text(text, LABELS) == ["Response C", "Response A", "Response B"]
+
+
+def test_parse_ignores_unknown_and_repeated_labels():
+    text = "FINAL RANKING:\n1. Response B\n2. Response Q\n3. Response B\n4. Response A"
+    assert parse_ranking_from_text(text, LABELS) == ["Response B", "Response A"]
+
+
+def test_parse_falls_back_to_mentions_without_numbers():
+    text = "FINAL RANKING:\nResponse B, then Response C, then Response A"
+    assert parse_ranking_from_text(text, LABELS) == ["Response B", "Response C", "Response A"]
+
+
+def test_rank_matrix_marks_unranked_labels():
+    matrix = build_rank_matrix([["Response B", "Response A"], []], LABELS)
+    assert matrix == [[2, 1, None], [None, None, None]]
+
+
+def test_mean_ranks_and_borda():
+    matrix = build_rank_matrix(
+        [["Response A", "Response B", "Response C"], ["Response A", "Response C", "Response B"]],
+        LABELS
+    )
+    assert mean_ranks(matrix) == [1.0, 2.5, 2.5]
+    assert borda_scores(matrix) == [4, 1, 1]
+
+
+def test_kendall_w_bounds():
+    same = build_rank_matrix([LABELS, LABELS, LABELS], LABELS)
+    assert ranking_agreement(same) == 1.0
+    opposite = build_rank_matrix([LABELS, LABELS[::-1]], LABELS)
+    assert ranking_agreement(opposite) == 0.0
+    assert ranking_agreement(build_rank_matrix([LABELS], LABELS)) is None
+
+
+def test_aggregate_merges_labels_of_the_same_model():
+    label_to_model = {"Response A": "m1", "Response B": "m2", "Response C": "m1"}
+    results = [
+        {"model": "m1", "parsed_ranking": ["Response A", "Response B", "Response C"]},
+        {"model": "m2", "parsed_ranking": ["Response B", "Response A", "Response C"]},
+    ]
+    aggregate = calculate_aggregate_rankings(results, label_to_model)
+    assert [entry["model"] for entry in aggregate] == ["m2", "m1"]
+    assert aggregate[1]["rankings_count"] == 4
+
+
+def test_truncated_review_is_not_guessed_when_the_marker_is_required():
+    truncated = "Response B is accurate and well argued. Response A misses the second case, and Response C"
+    assert parse_ranking_from_text(truncated, LABELS, require_marker=True) == []
+    assert parse_ranking_from_text(truncated, LABELS) == ["Response B", "Response A", "Response C"]
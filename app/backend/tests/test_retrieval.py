@@ -0,0 +1,72 @@
+"""Tests for document chunking, BM25 selection and document scoping."""
+
+import asyncio
+
+from backend.documents.extract import ExtractedDocument, extract_plain_text
+from backend.documents.retrieval import DocumentIndex, DocumentStore, chunk_spans, scoped_document_id
+
+PAGES = [
+    "Photosynthesis turns light into chemical energy in the chloroplast. " * 4,
+    "The Krebs cycle runs in the mitochondria and releases carbon dioxide. " * 4,
+    "Meiosis halves the chromosome number to produce gametes. " * 4,
+]
+
+
+def _document():
+    offsets, text = [], ""
+    for page in PAGES:
+        offsets.append(len(text))
+        text += page + "\n\n"
+    return ExtractedDocument(text=text, truncated=False, unit="page", start=1, end=3, total=3, offsets=offsets)
+
+
+def test_chunks_cover_the_text_and_end_at_breaks():
+    text = _document().text
+    spans = chunk_spans(text, 120, 20)
+
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    for (_, end), (next_start, _) in zip(spans, spans[1:]):
+        assert next_start < end  # overlapping
+        assert text[end - 1] in " \n"
+
+
+def test_whole_document_is_used_when_it_fits():
+    index = DocumentIndex("doc", _document(), chunk_chars=120, overlap=20)
+    selection = index.select("krebs", token_budget=10_000)
+
+    assert selection["method"] == "full"
+    assert selection["excerpts"][0]["first_unit"] == 1
+    assert selection["excerpts"][0]["last_unit"] == 3
+
+
+def test_best_matching_chunks_are_selected_with_their_pages():
+    index = DocumentIndex("doc", _document(), chunk_chars=120, overlap=20)
+    selection = index.select("Where does the Krebs cycle run?", top_k=2, token_budget=80)
+
+    assert selection["method"] == "bm25"
+    assert selection["tokens"] <= 80
+    assert all("Krebs" in e["text"] for e in selection["excerpts"])
+    assert {e["last_unit"] for e in selection["excerpts"]} == {2}
+
+
+def test_opening_chunks_are_used_when_nothing_matches():
+    index = DocumentIndex("doc", _document(), chunk_chars=120, overlap=20)
+    selection = index.select("quantum chromodynamics", token_budget=40)
+
+    assert selection["method"] == "leading"
+    assert selection["excerpts"][0]["text"].startswith("Photosynthesis")
+
+
+def test_documents_are_only_found_with_the_uploading_key():
+    file_bytes = b"Lecture notes on enzymes."
+    document_id = scoped_document_id("0" * 64, "key-a")
+    store = DocumentStore(max_documents=4)
+
+    async def run():
+        store.schedule(document_id, "text", file_bytes, extract_plain_text(file_bytes), api_key="key-a")
+        return await store.get(document_id, "key-a"), await store.get(document_id, "key-b")
+
+    own, other = asyncio.run(run())
+    assert own is not None and own.text == "Lecture notes on enzymes."
+    assert other is None
+    assert scoped_document_id("0" * 64, "key-b") != document_id
@@ -0,0 +1,34 @@
+"""Tests for local conversation titles."""
+
+from backend.titles import DEFAULT_TITLE, MAX_TITLE_CHARS, generate_local_title
+
+
+def test_question_words_are_left_out():
+    assert generate_local_title("What is the difference between mitosis and meiosis?") == ("Mitosis Meiosis", 1.0)
+
+
+def test_acronyms_keep_their_case():
+    title, _ = generate_local_title("Can you explain how DNA replication works in eukaryotes?")
+
+    assert title.startswith("DNA Replication")
+
+
+def test_image_prompt_boilerplate_is_ignored():
+    text = "# Image\nThe following information was extracted from an image:\nSolve the quadratic equation"
+
+    assert generate_local_title(text)[0] == "Solve Quadratic Equation"
+
+
+def test_messages_without_content_words_get_the_default_title():
+    assert generate_local_title("hi, can you help?") == (DEFAULT_TITLE, 0.0)
+
+
+def test_many_topics_give_a_short_low_confidence_title():
+    text = (
+        "I have a long question about photosynthesis, the Krebs cycle, Roman history, "
+        "calculus limits, and French grammar rules"
+    )
+    title, confidence = generate_local_title(text, max_words=5)
+
+    assert len(title.split()) <= 5 and len(title) <= MAX_TITLE_CHARS
+    assert confidence < 0.7
@@ -0,0 +1,53 @@
+"""Tests for the staggered vision model race."""
+
+import asyncio
+
+from backend.vision import processor
+
+ANSWER = "## EXTRACTED TEXT\nHello\n## CONFIDENCE\n90"
+
+
+def _fake_models(monkeypatch, behaviour):
+    """Every call waits for a shared gate, so the calls finish together."""
+    gate = asyncio.Event()
+
+    async def request(model, image_base64, mime_type, api_key, timeout=90.0):
+        await gate.wait()
+        outcome = behaviour[model]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(processor, "_request_vision_model", request)
+    return gate
+
+
+def _race(monkeypatch, behaviour):
+    async def run():
+        gate = _fake_models(monkeypatch, behaviour)
+        asyncio.get_running_loop().call_later(0.05, gate.set)
+        return await processor._race_vision_models(
+            list(behaviour), b"", "image/png", "key", stagger=0.001, accept_confidence=0.5
+        )
+
+    return asyncio.run(run())
+
+
+def test_calls_finishing_together_are_all_recorded(monkeypatch):
+    context, attempts = _race(monkeypatch, {
+        "test/first": processor.VisionModelError("HTTP 500: boom"),
+        "test/second": ANSWER,
+    })
+
+    assert context.model_used == "test/second"
+    outcomes = {a["model"]: a for a in attempts}
+    assert outcomes["test/first"]["outcome"] == "failed"
+    assert outcomes["test/first"]["error"] == "HTTP 500: boom"
+    assert outcomes["test/second"]["outcome"] == "accepted"
+
+
+def test_higher_priority_model_wins_a_tie(monkeypatch):
+    context, attempts = _race(monkeypatch, {"test/first": ANSWER, "test/second": ANSWER})
+
+    assert context.model_used == "test/first"
+    assert [a["outcome"] for a in attempts] == ["accepted", "superseded"]
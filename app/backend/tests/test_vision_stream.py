@@ -0,0 +1,89 @@
+"""Tests for streamed vision extraction."""
+
+import asyncio
+import time
+
+import pytest
+
+from backend.vision import processor, stream
+from backend.vision.stream import VisionSectionParser
+
+ANSWER = (
+    "## EXTRACTED TEXT\nSolve x + 1 = 3\n### Part (a)\nShow working\n"
+    "## KEY ENTITIES\n- x\n"
+    "## CONFIDENCE\n90\n"
+)
+
+
+def _feed_in_chunks(parser, text, size):
+    sections = []
+    for i in range(0, len(text), size):
+        sections.extend(parser.feed(text[i:i + size]))
+    return sections + parser.close()
+
+
+@pytest.mark.parametrize("size", [1, 7, len(ANSWER)])
+def test_parser_splits_sections_whatever_the_chunking(size):
+    sections = _feed_in_chunks(VisionSectionParser(), ANSWER, size)
+
+    assert [s["kind"] for s in sections] == ["text", "entities", "confidence"]
+    # "###" subheadings stay inside the extracted text
+    assert sections[0]["content"] == "Solve x + 1 = 3\n### Part (a)\nShow working"
+    assert sections[1]["content"] == "- x"
+
+
+def test_parser_is_ready_once_text_and_entities_are_complete():
+    parser = VisionSectionParser()
+    parser.feed("## EXTRACTED TEXT\nSolve x\n## KEY ENTITIES\n- x\n")
+    assert not parser.ready
+
+    parser.feed("## TABLES\n")
+    assert parser.ready
+    assert parser.completed_text() == "## EXTRACTED TEXT\nSolve x\n## KEY ENTITIES\n- x\n"
+
+
+@pytest.fixture
+def fake_vision(monkeypatch):
+    """Primary model streams slowly; the non-streaming fallbacks answer at once."""
+    async def prepare_upload(image_bytes, mime_type, image_base64=None):
+        return b"", mime_type, {}
+
+    async def slow_stream(model, image_base64, mime_type, api_key, timeout=90.0):
+        await asyncio.sleep(5)
+        yield ANSWER
+
+    async def request(model, image_base64, mime_type, api_key, timeout=90.0):
+        return ANSWER
+
+    monkeypatch.setattr(stream, "_prepare_upload", prepare_upload)
+    monkeypatch.setattr(stream, "_stream_vision_model", slow_stream)
+    monkeypatch.setattr(stream, "vision_models", lambda preferred=None: ["test/primary", "test/fallback"])
+    monkeypatch.setattr(processor, "_request_vision_model", request)
+    monkeypatch.setattr(stream, "VISION_RACE_STAGGER_SECONDS", 0.05)
+
+
+def _collect(image_bytes):
+    async def run():
+        return [event async for event in stream.stream_image_to_context(image_bytes, "image/png", api_key="key")]
+
+    started = time.perf_counter()
+    events = asyncio.run(run())
+    return events, time.perf_counter() - started
+
+
+def test_fallback_races_a_slow_stream(fake_vision):
+    events, elapsed = _collect(b"slow-stream-image")
+
+    assert elapsed < 2
+    final = events[-1]["data"]
+    assert final.model_used == "test/fallback"
+    outcomes = {a["model"]: a["outcome"] for a in final.metadata["attempts"]}
+    assert outcomes == {"test/primary": "cancelled", "test/fallback": "accepted"}
+
+
+def test_stream_has_a_total_deadline(fake_vision, monkeypatch):
+    monkeypatch.setattr(stream, "vision_models", lambda preferred=None: ["test/primary"])
+    monkeypatch.setattr(stream, "VISION_STREAM_DEADLINE_SECONDS", 0.1)
+
+    with pytest.raises(ValueError, match="no complete answer after 0.1s"):
+        _collect(b"deadline-image")
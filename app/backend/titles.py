@@ -0,0 +1,119 @@
+"""
+Local conversation titles.
+
+The title of a conversation is extracted from its first message instead of
+asking a model for it. Candidate phrases are the runs of words between
+stopwords and punctuation; each word scores its degree over its frequency
+(RAKE), a phrase scores the sum of its words, and the best phrases up to
+TITLE_MAX_WORDS make the title. No network calls are made.
+
+The confidence is the share of all phrase scores covered by the title: a
+short question about one topic scores 1.0, a long message touching many
+topics scores low. Only low-confidence titles are worth an LLM call.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from .consensus import STOPWORDS
+from .config import TITLE_MAX_WORDS
+
+DEFAULT_TITLE = "New Conversation"
+MAX_TITLE_CHARS = 50
+
+# Question and request words that say nothing about the topic
+_TITLE_STOPWORDS = STOPWORDS | frozenset("""
+please explain tell describe give show help need want know understand find get make let difference
+between vs versus like using use thing things something anyone someone am has have had im i'm dont
+don't doesn't can't cannot thanks thank hi hello hey ok okay example examples question questions write
+what's how's where's who's it's that's there's
+not no yes never
+""".split())
+
+# Headings and the fixed sentences that render_context_as_prompt and
+# render_pages_as_prompt put around text extracted from images
+_BOILERPLATE = re.compile(
+    r"^\s*(#+\s.*|>.*|-\s*⚠️.*|\*Note:.*|Key entities:|The following information was extracted from .*"
+    r"|Please analyze and respond based on .*)\s*$",
+    re.MULTILINE
+)
+_PHRASE_SPLIT = re.compile(r"[^\w\s'-]+|\s-\s|\n")
+_WORD = re.compile(r"[\w'-]+")
+
+
+def _candidate_phrases(text: str) -> List[List[str]]:
+    """Runs of content words, in order of appearance."""
+    phrases: List[List[str]] = []
+    for fragment in _PHRASE_SPLIT.split(_BOILERPLATE.sub("", text)):
+        current: List[str] = []
+        for word in _WORD.findall(fragment):
+            word = word.strip("'-")
+            if len(word) < 2 or word.lower() in _TITLE_STOPWORDS or word.isdigit() and len(word) < 3:
+                if current:
+                    phrases.append(current)
+                current = []
+            else:
+                current.append(word)
+        if current:
+            phrases.append(current)
+    return phrases
+
+
+def _display(word: str) -> str:
+    """Capitalize a word, keeping acronyms and mixed case (DNA, iPhone) as typed."""
+    return word if any(c.isupper() for c in word[1:]) or word.isupper() else word[:1].upper() + word[1:]
+
+
+def generate_local_title(text: str, max_words: int = TITLE_MAX_WORDS) -> Tuple[str, float]:
+    """
+    Extract a short title from a message.
+
+    Args:
+        text: The first user message
+        max_words: Most words in the title
+
+    Returns:
+        Tuple of (title, confidence between 0 and 1); DEFAULT_TITLE with
+        confidence 0 when the message has no content words
+    """
+    phrases = _candidate_phrases(text or "")
+    if not phrases:
+        return DEFAULT_TITLE, 0.0
+
+    frequency: Dict[str, int] = defaultdict(int)
+    degree: Dict[str, int] = defaultdict(int)
+    for phrase in phrases:
+        for word in phrase:
+            frequency[word.lower()] += 1
+            degree[word.lower()] += len(phrase)
+
+    # Long runs are split so that one rambling sentence cannot fill the title
+    candidates: Dict[str, Tuple[float, int, List[str]]] = {}
+    for position, phrase in enumerate(phrases):
+        for start in range(0, len(phrase), max_words):
+            words = phrase[start:start + max_words]
+            key = " ".join(w.lower() for w in words)
+            score = sum(degree[w.lower()] / frequency[w.lower()] for w in words)
+            if key not in candidates or score > candidates[key][0]:
+                candidates[key] = (score, position, words)
+
+    total = sum(score for score, _, _ in candidates.values())
+    ranked = sorted(candidates.values(), key=lambda c: (-c[0], c[1]))
+    chosen: List[Tuple[float, int, List[str]]] = []
+    length = 0
+    for candidate in ranked:
+        if length + len(candidate[2]) > max_words:
+            continue
+        chosen.append(candidate)
+        length += len(candidate[2])
+        if length >= max_words:
+            break
+
+    # Chosen phrases read in the order the user wrote them
+    chosen.sort(key=lambda c: c[1])
+    title = " ".join(_display(word) for _, _, words in chosen for word in words)
+    if len(title) > MAX_TITLE_CHARS:
+        title = title[:MAX_TITLE_CHARS - 3].rstrip() + "..."
+    confidence = sum(score for score, _, _ in chosen) / total if total else 0.0
+    return title, round(confidence, 3)
@@ -0,0 +1,44 @@
+"""Size-capped reading of multipart uploads."""
+
+from typing import Any, Type
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds its size limit."""
+
+    noun = "File"
+
+    def __init__(self, size: int, limit: int):
+        self.size = size
+        self.limit = limit
+        super().__init__(f"{self.noun} is larger than the {limit // (1024 * 1024)}MB limit.")
+
+
+async def read_upload(upload: Any, max_bytes: int, error: Type[UploadTooLarge] = UploadTooLarge) -> bytes:
+    """
+    Read an UploadFile in chunks, stopping as soon as it exceeds max_bytes.
+
+    Args:
+        upload: FastAPI UploadFile (or anything with an async read(size))
+        max_bytes: Largest accepted size
+        error: UploadTooLarge subclass to raise
+
+    Raises:
+        UploadTooLarge: If the upload is larger than max_bytes
+    """
+    declared = getattr(upload, "size", None)
+    if declared is not None and declared > max_bytes:
+        raise error(declared, max_bytes)
+    chunks = []
+    total = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise error(total, max_bytes)
+        chunks.append(chunk)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
@@ -0,0 +1,101 @@
+"""
+Content-addressed cache of vision extractions.
+
+Results are keyed by the SHA-256 of the image bytes together with the vision
+prompt version, so the same worksheet photo is only sent to a vision model
+once until the prompt changes. A bounded LRU holds recent results in memory;
+when a directory is configured, results are also written there as JSON and
+survive restarts.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+from ..cache import LRUCache
+from ..config import VISION_CACHE_ENABLED, VISION_CACHE_MAX_ENTRIES, VISION_CACHE_DIR
+
+
+def vision_cache_key(image_bytes: bytes, prompt_version: str, model: Optional[str] = None) -> str:
+    """SHA-256 over the prompt version, optional requested model and image bytes."""
+    hasher = hashlib.sha256()
+    hasher.update(f"{prompt_version}\n{model or ''}\n".encode("utf-8"))
+    hasher.update(image_bytes)
+    return hasher.hexdigest()
+
+
+class VisionCache:
+    """Two-tier (memory LRU + optional JSON files) store of vision context dicts."""
+
+    def __init__(self, max_entries: int, directory: Optional[str] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.directory = directory or None
+        self.memory: LRUCache[Dict[str, Any]] = LRUCache(max_entries)
+        self.disk_hits = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable vision cache entry {key[:12]}: {e}")
+            return None
+
+    def _write(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look a context up in memory, then on disk.
+
+        Returns:
+            Dict of the cached VisionContext with metadata['cache']
+            set to "memory" or "disk", or None on a miss
+        """
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        tier = "memory"
+        if value is None and self.directory:
+            value = await asyncio.to_thread(self._read, key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.put(key, value)
+                tier = "disk"
+        if value is None:
+            return None
+        return {**value, "metadata": {**value.get("metadata", {}), "cache": tier}}
+
+    async def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a context dict in memory and, if configured, on disk."""
+        if not self.enabled:
+            return
+        self.memory.put(key, value)
+        if self.directory:
+            try:
+                await asyncio.to_thread(self._write, key, value)
+            except OSError as e:
+                print(f"Could not write vision cache entry {key[:12]}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.memory.stats(), "disk_hits": self.disk_hits, "disk": bool(self.directory)}
+
+
+_vision_cache = VisionCache(VISION_CACHE_MAX_ENTRIES, VISION_CACHE_DIR, enabled=VISION_CACHE_ENABLED)
+
+
+def get_vision_cache() -> VisionCache:
+    """Return the process-wide vision cache."""
+    return _vision_cache
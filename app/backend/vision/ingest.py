@@ -0,0 +1,129 @@
+"""
+Size-capped, low-copy image ingestion.
+
+Uploads are read in chunks and rejected as soon as they pass the size limit.
+Base64 that arrives in a JSON body is kept and sent upstream as is unless
+preprocessing re-encodes the image. The upstream request body is assembled
+around the base64 bytes, so a full-size JSON string of the image is never
+built.
+"""
+
+import base64
+import binascii
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from ..config import VISION_MAX_IMAGE_BYTES
+from ..uploads import UploadTooLarge, read_upload as read_capped_upload
+
+# Placeholder spliced out of the serialized payload; base64 needs no JSON escaping
+_IMAGE_PLACEHOLDER = "\x00IMAGE\x00"
+_IMAGE_PLACEHOLDER_JSON = json.dumps(_IMAGE_PLACEHOLDER)[1:-1].encode("ascii")
+
+
+class ImageTooLarge(UploadTooLarge):
+    """Raised when an image exceeds VISION_MAX_IMAGE_BYTES."""
+
+    noun = "Image"
+
+
+@dataclass
+class ImageInput:
+    """One uploaded image, with its base64 form when the client sent one."""
+    data: bytes
+    mime_type: str
+    base64_data: Optional[bytes] = None  # Canonical base64 of data, if already available
+
+
+def image_from_base64(data: str, mime_type: str, max_bytes: int = VISION_MAX_IMAGE_BYTES) -> ImageInput:
+    """
+    Decode base64 image data, checking the size before decoding.
+
+    Canonical base64 is kept for pass-through; data with whitespace or
+    other stray characters is decoded leniently and re-encoded later.
+
+    Raises:
+        ImageTooLarge: If the decoded image would exceed max_bytes
+        ValueError: If the data is not valid base64
+    """
+    estimated = len(data) * 3 // 4
+    if estimated > max_bytes:
+        raise ImageTooLarge(estimated, max_bytes)
+    try:
+        encoded = data.encode("ascii")
+        return ImageInput(base64.b64decode(encoded, validate=True), mime_type, encoded)
+    except (UnicodeEncodeError, binascii.Error):
+        pass
+    try:
+        raw = base64.b64decode(data)
+    except (ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid base64 image data: {e}")
+    if not raw:
+        raise ValueError("Empty image data")
+    return ImageInput(raw, mime_type)
+
+
+async def read_upload(upload: Any, max_bytes: int = VISION_MAX_IMAGE_BYTES) -> bytes:
+    """
+    Read an image upload in chunks, stopping as soon as it exceeds max_bytes.
+
+    Raises:
+        ImageTooLarge: If the upload is larger than max_bytes
+    """
+    return await read_capped_upload(upload, max_bytes, error=ImageTooLarge)
+
+
+def build_json_body(payload: Dict[str, Any], image_base64: bytes) -> bytes:
+    """
+    Serialize a payload whose image URL contains _IMAGE_PLACEHOLDER.
+
+    The small JSON skeleton is serialized once and the base64 bytes are
+    joined into it, so the image is copied a single time.
+    """
+    prefix, suffix = json.dumps(payload).encode("utf-8").split(_IMAGE_PLACEHOLDER_JSON, 1)
+    return b"".join((prefix, image_base64, suffix))
+
+
+def image_data_url_placeholder(mime_type: str) -> str:
+    """Data URL whose base64 part build_json_body fills in."""
+    return f"data:{mime_type};base64,{_IMAGE_PLACEHOLDER}"
+
+
+def current_rss_kb() -> Optional[int]:
+    """Current resident set size of this process in KiB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+class MemoryProbe:
+    """
+    Current-RSS samples taken while one image is processed.
+
+    Unlike the lifetime peak (ru_maxrss), current RSS falls again once an
+    image's buffers are freed, so growth is measured per image. RSS is
+    process-wide: images processed concurrently count towards each other,
+    and memory the allocator kept from earlier work is reused without
+    growing RSS, so the growth is a lower bound.
+    """
+
+    def __init__(self):
+        self.before = current_rss_kb()
+        self.high = self.before
+
+    def sample(self) -> None:
+        """Record the current RSS, e.g. while the image's buffers are alive."""
+        rss = current_rss_kb()
+        if rss is not None and self.high is not None:
+            self.high = max(self.high, rss)
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.before is None:
+            return {}
+        self.sample()
+        return {"rss_before_kb": self.before, "rss_high_kb": self.high, "rss_growth_kb": self.high - self.before}
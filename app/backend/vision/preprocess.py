@@ -0,0 +1,107 @@
+"""
+Image preprocessing before vision extraction.
+
+Phone photos are often 4-12 MB. Before an image is base64-encoded for the
+vision model it is decoded, its longest edge is capped at VISION_MAX_EDGE
+(enough for OCR of a worksheet), and it is re-encoded as JPEG or WebP
+without EXIF metadata. Decoding is CPU bound, so it runs in a worker thread.
+
+The re-encoded image is always the one sent, even when it is not smaller,
+so that EXIF (including GPS location) never leaves the server. Pillow is an
+optional extra (`vision`); without it, or for formats it cannot decode, the
+original bytes are sent unchanged, metadata included.
+"""
+
+import asyncio
+import io
+import time
+from typing import Any, Dict, Tuple
+
+from ..config import (
+    VISION_PREPROCESS_ENABLED,
+    VISION_MAX_EDGE,
+    VISION_IMAGE_FORMAT,
+    VISION_IMAGE_QUALITY,
+)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depends on the deployment
+    Image = None
+    ImageOps = None
+
+OUTPUT_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+def preprocess_image(
+    image_bytes: bytes,
+    mime_type: str,
+    max_edge: int = VISION_MAX_EDGE,
+    output_format: str = VISION_IMAGE_FORMAT,
+    quality: int = VISION_IMAGE_QUALITY
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    Downscale, re-encode and strip metadata from an image.
+
+    The re-encoded image is used even when it is larger than the original,
+    since the original still carries its EXIF metadata.
+
+    Args:
+        image_bytes: Raw image bytes as uploaded
+        mime_type: MIME type of the upload
+        max_edge: Longest edge in pixels after downscaling
+        output_format: "JPEG" or "WEBP"
+        quality: Encoder quality (1-100)
+
+    Returns:
+        Tuple of (image bytes, MIME type, info dict for vision metadata)
+    """
+    started = time.perf_counter()
+    info: Dict[str, Any] = {"original_bytes": len(image_bytes)}
+
+    if not VISION_PREPROCESS_ENABLED:
+        info["skipped"] = "disabled"
+        return image_bytes, mime_type, info
+    if Image is None:
+        info["skipped"] = "pillow_not_installed"
+        return image_bytes, mime_type, info
+    if output_format not in OUTPUT_MIME_TYPES:
+        raise ValueError(f"Unsupported VISION_IMAGE_FORMAT '{output_format}'. Expected JPEG or WEBP.")
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            original_size = image.size
+            # JPEG can decode directly at a reduced scale, which is much faster
+            image.draft("RGB", (max_edge, max_edge))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "L"):
+                rgba = image.convert("RGBA")
+                image = Image.new("RGB", rgba.size, (255, 255, 255))
+                image.paste(rgba, mask=rgba.getchannel("A"))
+            resized = max(original_size) > max_edge
+            if resized:
+                image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, format=output_format, quality=quality, optimize=True)
+            processed = output.getvalue()
+            processed_size = image.size
+    except Exception as e:
+        info.update({"skipped": "decode_failed", "error": str(e)})
+        return image_bytes, mime_type, info
+
+    info.update({
+        "processed_bytes": len(processed),
+        "bytes_saved": len(image_bytes) - len(processed),
+        "original_size": list(original_size),
+        "processed_size": list(processed_size),
+        "resized": resized,
+        "format": output_format,
+        "metadata_stripped": True,
+        "preprocess_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+    return processed, OUTPUT_MIME_TYPES[output_format], info
+
+
+async def preprocess_image_async(image_bytes: bytes, mime_type: str) -> Tuple[bytes, str, Dict[str, Any]]:
+    """Run preprocess_image in a worker thread so decoding does not block the event loop."""
+    return await asyncio.to_thread(preprocess_image, image_bytes, mime_type)
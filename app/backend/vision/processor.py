@@ -5,11 +5,24 @@ Processes images using vision models and returns structured textual context.
 The council never receives raw images - only this extracted context.
 """
 
+import asyncio
 import base64
+import time
 import httpx
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass, asdict
-from ..config import OPENROUTER_API_URL, OPENROUTER_API_KEY as DEFAULT_API_KEY
+from typing import Dict, Any, Optional, List, Tuple
+from dataclasses import dataclass, asdict, field
+from ..config import (
+    VISION_API_URL,
+    OPENROUTER_API_KEY as DEFAULT_API_KEY,
+    VISION_RACE_ENABLED,
+    VISION_RACE_STAGGER_SECONDS,
+    VISION_ACCEPT_CONFIDENCE,
+    VISION_MAX_CONCURRENCY,
+)
+from ..cassette import upstream_request
+from .cache import get_vision_cache, vision_cache_key
+from .preprocess import preprocess_image_async
+from .ingest import ImageInput, MemoryProbe, build_json_body, image_data_url_placeholder
 
 
 # Default vision model (free tier, good balance of quality and speed)
@@ -22,6 +35,32 @@ FALLBACK_VISION_MODELS = [
     "google/gemma-3-4b-it:free",
 ]
 
+# Bump whenever VISION_SYSTEM_PROMPT or the parsing changes so cached
+# extractions made with the old prompt are not reused
+VISION_PROMPT_VERSION = "1"
+
+VISION_SYSTEM_PROMPT = """You are an expert at extracting information from images.
+Analyze the provided image and extract ALL textual and visual information.
+
+Your response MUST follow this exact format:
+
+## EXTRACTED TEXT
+[All text visible in the image, preserving structure]
+
+## KEY ENTITIES
+[List of important entities: names, dates, numbers, organizations, etc.]
+
+## TABLES/STRUCTURED DATA
+[If any tables or structured data, represent as markdown tables]
+
+## CONFIDENCE
+[Rate 0-100 how confident you are in your extraction]
+
+## WARNINGS
+[Any issues: blur, partial visibility, unclear text, etc.]
+
+Be thorough and accurate. If text is unclear, note it in warnings but attempt extraction anyway."""
+
 
 @dataclass
 class VisionContext:
@@ -33,23 +72,20 @@ class VisionContext:
     confidence: float  # 0.0 to 1.0
     warnings: List[str]
     model_used: str
+    metadata: Dict[str, Any] = field(default_factory=dict)  # Timing, cache and preprocessing info
     
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
 
 
-async def _call_vision_model(
+def _vision_request(
     model: str,
-    image_base64: str,
+    image_base64: bytes,
     mime_type: str,
     api_key: str,
-    timeout: float = 90.0
-) -> Optional[str]:
-    """
-    Call a vision model with an image and get text response.
-    
-    Returns the extracted text or None on failure.
-    """
+    stream: bool = False
+) -> Tuple[Dict[str, str], bytes]:
+    """Build the headers and JSON body of a vision call without copying the image twice."""
     headers = {
         "Authorization": f"Bearer {api_key}",
         "HTTP-Referer": "https://llm-council.vercel.app",
@@ -57,38 +93,15 @@ async def _call_vision_model(
         "Content-Type": "application/json"
     }
     
-    # Create the vision prompt
-    system_prompt = """You are an expert at extracting information from images.
-Analyze the provided image and extract ALL textual and visual information.
-
-Your response MUST follow this exact format:
-
-## EXTRACTED TEXT
-[All text visible in the image, preserving structure]
-
-## KEY ENTITIES
-[List of important entities: names, dates, numbers, organizations, etc.]
-
-## TABLES/STRUCTURED DATA
-[If any tables or structured data, represent as markdown tables]
-
-## CONFIDENCE
-[Rate 0-100 how confident you are in your extraction]
-
-## WARNINGS
-[Any issues: blur, partial visibility, unclear text, etc.]
-
-Be thorough and accurate. If text is unclear, note it in warnings but attempt extraction anyway."""
-
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": VISION_SYSTEM_PROMPT},
         {
             "role": "user",
             "content": [
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:{mime_type};base64,{image_base64}"
+                        "url": image_data_url_placeholder(mime_type)
                     }
                 },
                 {
@@ -104,32 +117,77 @@ Be thorough and accurate. If text is unclear, note it in warnings but attempt ex
         "messages": messages,
         "max_tokens": 4096
     }
-    
+    if stream:
+        payload["stream"] = True
+    return headers, build_json_body(payload, image_base64)
+
+
+class VisionModelError(Exception):
+    """Raised when a vision model call fails; the message says why (HTTP status, timeout, ...)."""
+
+
+async def _request_vision_model(
+    model: str,
+    image_base64: bytes,
+    mime_type: str,
+    api_key: str,
+    timeout: float = 90.0
+) -> str:
+    """
+    Call a vision model with an image and get its text response.
+
+    Raises:
+        VisionModelError: If the call fails or returns no answer
+    """
+    headers, body = _vision_request(model, image_base64, mime_type, api_key)
+
     async with httpx.AsyncClient() as client:
         try:
-            response = await client.post(
-                OPENROUTER_API_URL,
+            response = await upstream_request(
+                "vision",
+                client,
+                "POST",
+                VISION_API_URL,
                 headers=headers,
-                json=payload,
+                content=body,
                 timeout=timeout
             )
-            
-            if response.status_code != 200:
-                print(f"Vision model {model} failed: {response.status_code} - {response.text}")
-                return None
-            
-            data = response.json()
-            if "choices" not in data or not data["choices"]:
-                return None
-            
-            return data["choices"][0]["message"]["content"]
-            
         except httpx.TimeoutException:
-            print(f"Timeout calling vision model {model}")
-            return None
+            raise VisionModelError(f"timeout after {timeout:g}s")
         except Exception as e:
-            print(f"Exception calling vision model {model}: {e}")
-            return None
+            raise VisionModelError(str(e) or type(e).__name__)
+
+    if response.status_code != 200:
+        raise VisionModelError(f"HTTP {response.status_code}: {response.text[:200]}")
+    try:
+        data = response.json()
+        content = data["choices"][0]["message"]["content"] if data.get("choices") else None
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise VisionModelError(f"malformed response: {e}")
+    if not content:
+        raise VisionModelError("empty response")
+    return content
+
+
+def section_kind(header: str) -> Optional[str]:
+    """
+    Classify a "## ..." section header of the vision answer.
+
+    Returns:
+        "text", "entities", "tables", "confidence", "warnings" or None
+    """
+    header = header.upper()
+    if "EXTRACTED TEXT" in header:
+        return "text"
+    if "KEY ENTITIES" in header or "ENTITIES" in header:
+        return "entities"
+    if "TABLE" in header or "STRUCTURED" in header:
+        return "tables"
+    if "CONFIDENCE" in header:
+        return "confidence"
+    if "WARNING" in header:
+        return "warnings"
+    return None
 
 
 def _parse_vision_response(raw_response: str, model_used: str) -> VisionContext:
@@ -151,28 +209,28 @@ def _parse_vision_response(raw_response: str, model_used: str) -> VisionContext:
             continue
             
         lines = section.split("\n", 1)
-        header = lines[0].strip().upper()
+        kind = section_kind(lines[0].strip())
         content = lines[1].strip() if len(lines) > 1 else ""
         
-        if "EXTRACTED TEXT" in header:
+        if kind == "text":
             extracted_text = content
-        elif "KEY ENTITIES" in header or "ENTITIES" in header:
+        elif kind == "entities":
             # Parse entity list
             for line in content.split("\n"):
                 line = line.strip().lstrip("-•*").strip()
                 if line:
                     entities.append(line)
-        elif "TABLE" in header or "STRUCTURED" in header:
+        elif kind == "tables":
             # Keep tables as formatted text for now
             if content:
                 tables.append({"raw": content})
-        elif "CONFIDENCE" in header:
+        elif kind == "confidence":
             # Extract confidence number
             import re
             match = re.search(r"(\d+)", content)
             if match:
                 confidence = min(100, max(0, int(match.group(1)))) / 100.0
-        elif "WARNING" in header:
+        elif kind == "warnings":
             for line in content.split("\n"):
                 line = line.strip().lstrip("-•*").strip()
                 if line:
@@ -199,16 +257,22 @@ async def process_image_to_context(
     image_bytes: bytes,
     mime_type: str,
     api_key: Optional[str] = None,
-    preferred_model: Optional[str] = None
+    preferred_model: Optional[str] = None,
+    image_base64: Optional[bytes] = None
 ) -> VisionContext:
     """
     Process an image and return structured textual context.
+
+    Results are cached by image content and prompt version, so a repeated
+    image is answered without an upstream call.
     
     Args:
         image_bytes: Raw image bytes
         mime_type: MIME type (e.g., "image/png", "image/jpeg")
         api_key: OpenRouter API key
         preferred_model: Optional specific vision model to use
+        image_base64: Base64 of image_bytes if the client sent it encoded;
+            reused as is unless preprocessing re-encodes the image
         
     Returns:
         VisionContext with extracted information
@@ -219,11 +283,146 @@ async def process_image_to_context(
     key = api_key or DEFAULT_API_KEY
     if not key:
         raise ValueError("No API key provided for vision processing")
+
+    started = time.perf_counter()
+    cache = get_vision_cache()
+    cache_key = vision_cache_key(image_bytes, VISION_PROMPT_VERSION, preferred_model)
+    cached = await _cached_context(cache_key, started)
+    if cached is not None:
+        return cached
     
-    # Encode image to base64
-    image_base64 = base64.b64encode(image_bytes).decode("utf-8")
+    memory = MemoryProbe()
+    image_base64, mime_type, preprocess_info = await _prepare_upload(image_bytes, mime_type, image_base64)
+    memory.sample()  # Original, re-encoded and base64 copies are all alive here
     
-    # Build model list to try
+    models_to_try = vision_models(preferred_model)
+    context, attempts = await _query_vision_models(models_to_try, image_base64, mime_type, key)
+
+    if context is None:
+        errors = [a["error"] for a in attempts if a.get("error")]
+        raise ValueError(
+            f"Vision processing failed after trying {len(models_to_try)} models. "
+            f"Last error: {errors[-1] if errors else None}"
+        )
+
+    print(f"Vision processing succeeded with {context.model_used}")
+    await cache.put(cache_key, context.to_dict())
+    context.metadata.update({
+        "cache": "miss",
+        "preprocess": preprocess_info,
+        "attempts": attempts,
+        "memory": memory.to_dict(),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+    return context
+
+
+async def _prepare_upload(
+    image_bytes: bytes,
+    mime_type: str,
+    image_base64: Optional[bytes] = None
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    Preprocess the image and return (base64 bytes, MIME type, preprocess info).
+
+    The client's base64 is passed through when preprocessing keeps the
+    original bytes; otherwise the re-encoded image is base64-encoded once.
+    """
+    # Downscale and re-encode before upload (cache key stays on the original bytes)
+    processed, mime_type, preprocess_info = await preprocess_image_async(image_bytes, mime_type)
+    if processed is not image_bytes or image_base64 is None:
+        image_base64 = base64.b64encode(processed)
+    preprocess_info["base64_passthrough"] = processed is image_bytes and image_base64 is not None
+    return image_base64, mime_type, preprocess_info
+
+
+async def process_images_to_context(
+    images: List[ImageInput],
+    api_key: Optional[str] = None,
+    max_concurrency: int = VISION_MAX_CONCURRENCY
+) -> List[Optional[VisionContext]]:
+    """
+    Process several images concurrently, at most max_concurrency at a time.
+
+    Each context's metadata records its page number and timing.
+
+    Args:
+        images: Images in page order
+        api_key: OpenRouter API key
+        max_concurrency: Upper bound on vision calls in flight
+
+    Returns:
+        One VisionContext per image in the same order, or None for images
+        that failed
+
+    Raises:
+        ValueError: If every image fails
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    started = time.perf_counter()
+
+    async def process(page: int, image: ImageInput) -> Optional[VisionContext]:
+        async with semaphore:
+            queued_ms = round((time.perf_counter() - started) * 1000, 1)
+            try:
+                context = await process_image_to_context(
+                    image.data, image.mime_type, api_key=api_key, image_base64=image.base64_data
+                )
+            except ValueError as e:
+                print(f"Vision processing failed for page {page}: {e}")
+                return None
+        context.metadata.update({"page": page, "queued_ms": queued_ms})
+        return context
+
+    contexts = await asyncio.gather(*[
+        process(page, image) for page, image in enumerate(images, start=1)
+    ])
+    if not any(contexts):
+        raise ValueError(f"Vision processing failed for all {len(images)} images")
+    return list(contexts)
+
+
+def merge_contexts(contexts: List[Optional[VisionContext]]) -> VisionContext:
+    """
+    Combine per-page contexts into one VisionContext for the client.
+
+    Text is joined with page markers, warnings are prefixed with their page,
+    and confidence is the lowest page confidence. Per-page timing is kept in
+    metadata['pages'].
+    """
+    total = len(contexts)
+    texts, entities, tables, warnings, models, pages = [], [], [], [], [], []
+    for page, context in enumerate(contexts, start=1):
+        if context is None:
+            warnings.append(f"Page {page}: vision processing failed")
+            pages.append({"page": page, "failed": True})
+            continue
+        texts.append(f"[Page {page} of {total}]\n{context.extracted_text}")
+        entities.extend(e for e in context.entities if e not in entities)
+        tables.extend({**table, "page": page} for table in context.tables)
+        warnings.extend(f"Page {page}: {w}" for w in context.warnings)
+        if context.model_used not in models:
+            models.append(context.model_used)
+        pages.append({"page": page, "model_used": context.model_used, **context.metadata})
+
+    succeeded = [c for c in contexts if c is not None]
+    return VisionContext(
+        source="images",
+        extracted_text="\n\n".join(texts),
+        entities=entities,
+        tables=tables,
+        confidence=min(c.confidence for c in succeeded),
+        warnings=warnings,
+        model_used=", ".join(models),
+        metadata={
+            "pages": pages,
+            "elapsed_ms": max((p.get("elapsed_ms", 0) + p.get("queued_ms", 0) for p in pages), default=0),
+        },
+    )
+
+
+def vision_models(preferred_model: Optional[str] = None) -> List[str]:
+    """Vision models to try, in order of preference and without duplicates."""
     models_to_try = []
     if preferred_model:
         models_to_try.append(preferred_model)
@@ -232,31 +431,127 @@ async def process_image_to_context(
     
     # Remove duplicates while preserving order
     seen = set()
-    models_to_try = [m for m in models_to_try if not (m in seen or seen.add(m))]
-    
-    # Try each model until one succeeds
-    last_error = None
-    for model in models_to_try:
-        try:
-            raw_response = await _call_vision_model(
-                model=model,
-                image_base64=image_base64,
-                mime_type=mime_type,
-                api_key=key
-            )
-            
-            if raw_response:
-                context = _parse_vision_response(raw_response, model)
-                print(f"Vision processing succeeded with {model}")
-                return context
-                
-        except Exception as e:
-            last_error = e
-            print(f"Vision model {model} failed: {e}")
-            continue
-    
-    # All models failed
-    raise ValueError(
-        f"Vision processing failed after trying {len(models_to_try)} models. "
-        f"Last error: {last_error}"
+    return [m for m in models_to_try if not (m in seen or seen.add(m))]
+
+
+async def _cached_context(cache_key: str, started: float) -> Optional[VisionContext]:
+    """Return the cached VisionContext for a key, or None on a miss."""
+    cached = await get_vision_cache().get(cache_key)
+    if cached is None:
+        return None
+    cached["metadata"]["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    print(f"Vision cache hit ({cached['metadata']['cache']}) for {cache_key[:12]}")
+    return VisionContext(**cached)
+
+
+async def _query_vision_models(
+    models: List[str],
+    image_base64: bytes,
+    mime_type: str,
+    api_key: str,
+    attempts: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Tuple[Optional[VisionContext], List[Dict[str, Any]]]:
+    """Race the models, or try them one at a time when racing is disabled."""
+    if VISION_RACE_ENABLED:
+        return await _race_vision_models(
+            models, image_base64, mime_type, api_key, stagger=VISION_RACE_STAGGER_SECONDS, attempts=attempts
+        )
+    # Sequential fallbacks: accept the first answer whatever its confidence
+    return await _race_vision_models(
+        models, image_base64, mime_type, api_key, stagger=None, accept_confidence=0.0, attempts=attempts
     )
+
+
+async def _race_vision_models(
+    models: List[str],
+    image_base64: bytes,
+    mime_type: str,
+    api_key: str,
+    stagger: Optional[float] = VISION_RACE_STAGGER_SECONDS,
+    accept_confidence: float = VISION_ACCEPT_CONFIDENCE,
+    attempts: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Tuple[Optional[VisionContext], List[Dict[str, Any]]]:
+    """
+    Query vision models in priority order with staggered starts.
+
+    The next model is started when every running call has been silent for
+    `stagger` seconds, or immediately when a call fails or returns an answer
+    below accept_confidence. The first acceptable answer wins and the calls
+    still running are cancelled. With stagger=None, models run one at a time.
+    Per-model records are written into `attempts` when given, so a caller
+    that cancels the race still sees which models were tried.
+
+    Returns:
+        Tuple of (best VisionContext or None if every model failed,
+        list of per-model attempts with outcome and elapsed_ms)
+    """
+    started = time.perf_counter()
+    queue = list(models)
+    running: Dict[asyncio.Task, str] = {}
+    attempts = {} if attempts is None else attempts
+    best: Optional[VisionContext] = None
+
+    async def attempt(model: str) -> Tuple[str, Optional[VisionContext]]:
+        # Failures raise VisionModelError, recorded as the attempt's 'error'
+        raw_response = await _request_vision_model(
+            model=model,
+            image_base64=image_base64,
+            mime_type=mime_type,
+            api_key=api_key
+        )
+        return model, _parse_vision_response(raw_response, model)
+
+    def launch() -> None:
+        model = queue.pop(0)
+        attempts[model] = {"model": model, "started_ms": round((time.perf_counter() - started) * 1000, 1)}
+        running[asyncio.create_task(attempt(model))] = model
+
+    launch()
+    try:
+        while running:
+            done, _ = await asyncio.wait(
+                running,
+                timeout=stagger if queue else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                print(f"Vision race: no answer after {stagger}s, starting {queue[0]}")
+                launch()
+                continue
+
+            # Record every finished call (retrieving its result or exception)
+            # before returning, even when several finish together
+            accepted: Optional[VisionContext] = None
+            for task in sorted(done, key=lambda t: models.index(running[t])):
+                model = running.pop(task)
+                record = attempts[model]
+                record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                try:
+                    _, context = task.result()
+                except Exception as e:
+                    context = None
+                    record["error"] = str(e) or type(e).__name__
+                    print(f"Vision model {model} failed: {e}")
+
+                if context is None:
+                    record["outcome"] = "failed"
+                elif context.confidence >= accept_confidence:
+                    # Ties go to the higher-priority model
+                    record["outcome"] = "accepted" if accepted is None else "superseded"
+                    accepted = accepted or context
+                else:
+                    record["outcome"] = "low_confidence"
+                    if best is None or context.confidence > best.confidence:
+                        best = context
+            if accepted is not None:
+                return accepted, list(attempts.values())
+
+            # A call finished without an acceptable answer: start the next one now
+            if queue:
+                launch()
+    finally:
+        for task, model in running.items():
+            task.cancel()
+            attempts[model]["outcome"] = "cancelled"
+
+    return best, list(attempts.values())
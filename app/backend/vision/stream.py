@@ -0,0 +1,320 @@
+"""
+Streaming vision extraction.
+
+The vision answer is requested with "stream": true and fed to an incremental
+section parser. Each "## ..." section is reported as soon as the next header
+starts, and a usable VisionContext is produced once EXTRACTED TEXT and KEY
+ENTITIES are complete, so the council can start while the tables,
+confidence and warnings are still being generated.
+"""
+
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from ..admission import get_admission_controller
+from ..cassette import get_cassette
+from ..config import (
+    VISION_API_URL,
+    VISION_RACE_ENABLED,
+    VISION_RACE_STAGGER_SECONDS,
+    VISION_STREAM_DEADLINE_SECONDS,
+    OPENROUTER_API_KEY as DEFAULT_API_KEY,
+)
+from .cache import get_vision_cache, vision_cache_key
+from .ingest import MemoryProbe
+from .processor import (
+    VISION_PROMPT_VERSION,
+    VisionContext,
+    _cached_context,
+    _parse_vision_response,
+    _prepare_upload,
+    _query_vision_models,
+    _request_vision_model,
+    _vision_request,
+    section_kind,
+    vision_models,
+)
+
+# A header only counts once its line is complete; "###" subheadings inside
+# the extracted text are not section boundaries
+_HEADER_PATTERN = re.compile(r"^##[ \t]*([^#\n][^\n]*)\n", re.MULTILINE)
+
+
+class VisionSectionParser:
+    """Incrementally split a streamed vision answer into its sections."""
+
+    def __init__(self):
+        self.text = ""
+        self.completed: List[str] = []  # section kinds, in order
+        self._open: Optional[Tuple[str, str, int, int]] = None  # (header, kind, start, content start)
+        self._scan_from = 0
+
+    def feed(self, delta: str) -> List[Dict[str, str]]:
+        """
+        Add streamed text.
+
+        Returns:
+            List of sections completed by this delta, as dicts with
+            'section' (header), 'kind' and 'content'
+        """
+        self.text += delta
+        finished = []
+        for match in _HEADER_PATTERN.finditer(self.text, self._scan_from):
+            if self._open:
+                finished.append(self._close(match.start()))
+            header = match.group(1).strip()
+            self._open = (header, section_kind(header) or "other", match.start(), match.end())
+            self._scan_from = match.end()
+        return finished
+
+    def close(self) -> List[Dict[str, str]]:
+        """Finish the last open section at the end of the stream."""
+        if not self._open:
+            return []
+        section = self._close(len(self.text))
+        self._open = None
+        return [section]
+
+    def _close(self, end: int) -> Dict[str, str]:
+        header, kind, _, content_start = self._open
+        self.completed.append(kind)
+        return {"section": header, "kind": kind, "content": self.text[content_start:end].strip()}
+
+    @property
+    def ready(self) -> bool:
+        """True once the extracted text and entities (or a later section) are complete."""
+        if "text" not in self.completed:
+            return False
+        if "entities" in self.completed:
+            return True
+        return self._open is not None and self._open[1] not in ("text", "entities")
+
+    def completed_text(self) -> str:
+        """The answer up to the start of the section still being generated."""
+        return self.text[:self._open[2]] if self._open else self.text
+
+
+async def _stream_vision_model(
+    model: str,
+    image_base64: bytes,
+    mime_type: str,
+    api_key: str,
+    timeout: float = 90.0
+) -> AsyncIterator[str]:
+    """
+    Stream the text of a vision answer as it is generated.
+
+    When a cassette is recording or replaying, the non-streaming call is
+    used and its answer is yielded in one piece.
+
+    Raises:
+        RuntimeError: If the upstream call fails
+        VisionModelError: If the non-streaming call fails
+    """
+    if get_cassette().mode != "off":
+        yield await _request_vision_model(model, image_base64, mime_type, api_key, timeout=timeout)
+        return
+
+    headers, body = _vision_request(model, image_base64, mime_type, api_key, stream=True)
+    with get_admission_controller().upstream_call():
+        async with httpx.AsyncClient() as client:
+            async with client.stream("POST", VISION_API_URL, headers=headers, content=body, timeout=timeout) as response:
+                if response.status_code != 200:
+                    detail = await response.aread()
+                    raise RuntimeError(f"Vision model {model} failed: {response.status_code} - {detail[:200]!r}")
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue  # blank lines and ": OPENROUTER PROCESSING" keep-alives
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    chunk = json.loads(data)
+                    if chunk.get("error"):
+                        raise RuntimeError(f"Vision model {model} failed mid-stream: {chunk['error']}")
+                    choices = chunk.get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        yield delta
+
+
+async def _pump_stream(
+    model: str,
+    image_base64: bytes,
+    mime_type: str,
+    api_key: str,
+    events: asyncio.Queue
+) -> None:
+    """Forward a streamed answer to `events` as ('delta', text), then ('done', None) or ('error', message)."""
+    try:
+        async for delta in _stream_vision_model(model, image_base64, mime_type, api_key):
+            events.put_nowait(("delta", delta))
+        events.put_nowait(("done", None))
+    except Exception as e:
+        events.put_nowait(("error", str(e) or type(e).__name__))
+
+
+async def stream_image_to_context(
+    image_bytes: bytes,
+    mime_type: str,
+    api_key: Optional[str] = None,
+    preferred_model: Optional[str] = None,
+    image_base64: Optional[bytes] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Process an image while streaming the vision answer.
+
+    Yields, in order:
+        {'type': 'vision_delta', 'data': {'section', 'kind', 'content'}} per completed section,
+        {'type': 'vision_ready', 'data': VisionContext} once the text and entities are usable,
+        {'type': 'vision_final', 'data': VisionContext} with every section parsed.
+
+    The first-choice model is streamed. If nothing usable has arrived after
+    VISION_RACE_STAGGER_SECONDS, the remaining models are raced without
+    streaming alongside it, and whichever is usable first wins. The stream
+    gets VISION_STREAM_DEADLINE_SECONDS in total; if it fails or runs out of
+    time before the context is usable, the fallbacks decide. Cached images
+    yield 'vision_ready' and 'vision_final' at once.
+
+    Raises:
+        ValueError: If every vision model fails
+    """
+    key = api_key or DEFAULT_API_KEY
+    if not key:
+        raise ValueError("No API key provided for vision processing")
+
+    started = time.perf_counter()
+    cache_key = vision_cache_key(image_bytes, VISION_PROMPT_VERSION, preferred_model)
+    cached = await _cached_context(cache_key, started)
+    if cached is not None:
+        yield {"type": "vision_ready", "data": cached}
+        yield {"type": "vision_final", "data": cached}
+        return
+
+    memory = MemoryProbe()
+    image_base64, mime_type, preprocess_info = await _prepare_upload(image_bytes, mime_type, image_base64)
+    memory.sample()
+    models = vision_models(preferred_model)
+    model = models[0]
+
+    parser = VisionSectionParser()
+    ready_ms: Optional[float] = None
+    error: Optional[str] = None
+    fallback_context: Optional[VisionContext] = None
+    fallback_attempts: Dict[str, Dict[str, Any]] = {}
+    fallback: Optional[asyncio.Task] = None
+    events: asyncio.Queue = asyncio.Queue()
+
+    def start_fallback() -> None:
+        nonlocal fallback
+        fallback = asyncio.create_task(
+            _query_vision_models(models[1:], image_base64, mime_type, key, attempts=fallback_attempts)
+        )
+        fallback.add_done_callback(lambda _: events.put_nowait(("fallback", None)))
+
+    stream_started = time.perf_counter()
+    deadline = stream_started + VISION_STREAM_DEADLINE_SECONDS
+    race_at = stream_started + VISION_RACE_STAGGER_SECONDS if VISION_RACE_ENABLED and len(models) > 1 else None
+    pump = asyncio.create_task(_pump_stream(model, image_base64, mime_type, key, events))
+    try:
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                error = f"no complete answer after {VISION_STREAM_DEADLINE_SECONDS:g}s"
+                break
+            racing = race_at is not None and fallback is None and ready_ms is None
+            if racing and now >= race_at:
+                print(f"Streaming vision: nothing usable from {model} after {VISION_RACE_STAGGER_SECONDS}s, racing fallbacks")
+                start_fallback()
+                racing = False
+            try:
+                kind, value = await asyncio.wait_for(
+                    events.get(), timeout=(min(deadline, race_at) if racing else deadline) - now
+                )
+            except asyncio.TimeoutError:
+                continue
+
+            if kind == "delta":
+                for section in parser.feed(value):
+                    yield {"type": "vision_delta", "data": section}
+                if ready_ms is None and parser.ready:
+                    ready_ms = round((time.perf_counter() - started) * 1000, 1)
+                    partial = _parse_vision_response(parser.completed_text(), model)
+                    partial.metadata.update({"streamed": True, "ready_ms": ready_ms, "partial": True})
+                    yield {"type": "vision_ready", "data": partial}
+                    # The council starts from this answer; the fallbacks are no longer needed
+                    if fallback is not None:
+                        fallback.cancel()
+            elif kind == "done":
+                for section in parser.close():
+                    yield {"type": "vision_delta", "data": section}
+                break
+            elif kind == "error":
+                error = value
+                break
+            elif kind == "fallback" and fallback is not None and not fallback.cancelled():
+                fallback_context, _ = fallback.result()
+                if fallback_context is not None:
+                    break  # A fallback answered before the stream was usable
+    except BaseException:
+        # Also reached when the client disconnects mid-stream
+        if fallback is not None:
+            fallback.cancel()
+        raise
+    finally:
+        pump.cancel()
+
+    if error:
+        print(f"Streaming vision with {model} failed: {error}")
+    attempts: List[Dict[str, Any]] = [{"model": model, "streamed": True}]
+    if error:
+        attempts[0].update({"outcome": "failed", "error": error})
+    elif fallback_context is not None:
+        attempts[0]["outcome"] = "cancelled"
+    else:
+        attempts[0]["outcome"] = "accepted"
+
+    cacheable = True
+    if fallback_context is not None:
+        context = fallback_context
+    elif parser.text.strip() and (not error or ready_ms is not None):
+        # Use what was streamed (a stream cut off after the useful sections still counts)
+        context = _parse_vision_response(parser.completed_text() if error else parser.text, model)
+        cacheable = not error
+    elif len(models) > 1:
+        if fallback is None:
+            start_fallback()
+        context, _ = await fallback
+    else:
+        context = None
+    if fallback is not None and not fallback.done():
+        fallback.cancel()
+    if fallback is not None:
+        await asyncio.wait([fallback])  # let cancelled calls record their outcome
+    attempts.extend(fallback_attempts.values())
+    if context is None:
+        errors = [a["error"] for a in attempts if a.get("error")]
+        raise ValueError(
+            f"Vision processing failed after trying {len(models)} models. "
+            f"Last error: {errors[-1] if errors else None}"
+        )
+
+    if cacheable:
+        await get_vision_cache().put(cache_key, context.to_dict())
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    context.metadata.update({
+        "cache": "miss",
+        "preprocess": preprocess_info,
+        "attempts": attempts,
+        "streamed": True,
+        "memory": memory.to_dict(),
+        "ready_ms": ready_ms if ready_ms is not None else elapsed_ms,
+        "elapsed_ms": elapsed_ms,
+    })
+    if ready_ms is None:
+        yield {"type": "vision_ready", "data": context}
+    yield {"type": "vision_final", "data": context}
@@ -0,0 +1,189 @@
+"""
+WebSocket transport for council runs.
+
+One persistent connection carries several concurrent runs, saving the
+connection setup and repeated headers of one HTTP request per turn. The
+client sends JSON messages:
+
+    {"type": "start", "run_id": "...", "content": "...", ...}  (the body of /message/stream)
+    {"type": "cancel", "run_id": "..."}
+    {"type": "ping"}
+
+and receives the events of send_message_stream, each tagged with the
+"run_id" it belongs to, plus "run_started", "run_cancelled" and "pong".
+Errors that belong to no run are sent as "error" events without a run_id.
+
+Flow control: the events of every run on a connection go through one
+queue drained by a single sender, and at most WS_MAX_BUFFERED_EVENTS run
+events may be queued. When the client reads slowly, sends wait on the
+socket, the queue fills and runs pause at their next event rather than the
+server buffering them. A send blocked for longer than
+WS_SEND_TIMEOUT_SECONDS closes the connection.
+
+Replies to the client's own messages (run_started, run_cancelled, pong and
+errors) never wait for room, so a cancel is acted on at once even while
+the queue is full. Pongs are coalesced, and past MAX_QUEUED_REPLIES queued
+replies further ones are dropped.
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from .admission import get_admission_controller
+from .config import WS_MAX_RUNS, WS_MAX_BUFFERED_EVENTS, WS_SEND_TIMEOUT_SECONDS
+from .errors import ErrorCode
+from .run_store import new_run_id
+
+# Close code for a client that stops reading (1008: policy violation)
+SLOW_CONSUMER_CLOSE_CODE = 1008
+
+# Replies to client messages queued beyond this are dropped: a client that
+# sends this many messages without reading is not reading the replies
+MAX_QUEUED_REPLIES = 256
+
+RunEvents = Callable[[Dict[str, Any], Optional[str]], AsyncIterator[Dict[str, Any]]]
+
+
+class CouncilSocket:
+    """Multiplexes council runs over one accepted WebSocket."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        run_events: RunEvents,
+        api_key: Optional[str] = None,
+        max_runs: int = WS_MAX_RUNS,
+        max_buffered_events: int = WS_MAX_BUFFERED_EVENTS,
+        send_timeout: float = WS_SEND_TIMEOUT_SECONDS
+    ):
+        self.websocket = websocket
+        self.run_events = run_events
+        self.api_key = api_key
+        self.max_runs = max_runs
+        self.send_timeout = send_timeout
+        self.max_buffered_events = max(1, max_buffered_events)
+        # Entries are (event, is_run_event); run events are bounded by _run_slots
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._run_slots = asyncio.Semaphore(self.max_buffered_events)
+        self._queued_replies = 0
+        self._pong_queued = False
+        self._runs: Dict[str, asyncio.Task] = {}
+
+    async def serve(self) -> None:
+        """Handle the connection until the client leaves or stops reading."""
+        sender = asyncio.create_task(self._send_loop())
+        receiver = asyncio.create_task(self._receive_loop())
+        try:
+            done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            runs = list(self._runs.values())
+            for task in [sender, receiver, *runs]:
+                task.cancel()
+            await asyncio.gather(sender, receiver, *runs, return_exceptions=True)
+
+        if sender in done and not sender.cancelled() and sender.exception() is None:
+            # The client stopped reading; the close frame may not get through either
+            try:
+                await asyncio.wait_for(
+                    self.websocket.close(SLOW_CONSUMER_CLOSE_CODE, "Client is not reading events"),
+                    self.send_timeout
+                )
+            except (asyncio.TimeoutError, WebSocketDisconnect, RuntimeError):
+                pass
+
+    async def _post(self, event: Dict[str, Any]) -> None:
+        # Waits while the outbox is full: this is what pauses runs for a slow client
+        await self._run_slots.acquire()
+        self._outbox.put_nowait((event, True))
+
+    def _reply(self, event: Dict[str, Any]) -> None:
+        """Queue a reply to a client message without waiting (see module docstring)."""
+        if event.get("type") == "pong":
+            if self._pong_queued:
+                return
+            self._pong_queued = True
+        elif self._queued_replies >= MAX_QUEUED_REPLIES:
+            return
+        self._queued_replies += 1
+        self._outbox.put_nowait((event, False))
+
+    async def _send_loop(self) -> None:
+        """Send queued events; returns if one send takes longer than the timeout."""
+        while True:
+            event, is_run_event = await self._outbox.get()
+            if is_run_event:
+                self._run_slots.release()
+            else:
+                self._queued_replies -= 1
+                if event.get("type") == "pong":
+                    self._pong_queued = False
+            try:
+                await asyncio.wait_for(self.websocket.send_text(json.dumps(event)), self.send_timeout)
+            except asyncio.TimeoutError:
+                print(f"WebSocket send blocked for {self.send_timeout:g}s; closing the connection")
+                return
+
+    async def _receive_loop(self) -> None:
+        try:
+            while True:
+                raw = await self.websocket.receive_text()
+                try:
+                    message = json.loads(raw)
+                    if not isinstance(message, dict):
+                        raise ValueError("not an object")
+                except ValueError:
+                    self._reply({'type': 'error', 'error_code': ErrorCode.INVALID_REQUEST, 'message': 'Messages must be JSON objects.'})
+                    continue
+
+                kind = message.pop("type", None)
+                if kind == "start":
+                    self._start(message)
+                elif kind == "cancel":
+                    self._cancel(message.get("run_id"))
+                elif kind == "ping":
+                    self._reply({'type': 'pong'})
+                else:
+                    self._reply({'type': 'error', 'error_code': ErrorCode.INVALID_REQUEST, 'message': f'Unknown message type: {kind!r}'})
+        except WebSocketDisconnect:
+            return
+
+    def _start(self, payload: Dict[str, Any]) -> None:
+        run_id = payload.get("run_id") or new_run_id()
+        if not isinstance(run_id, str) or run_id in self._runs:
+            self._reply({'type': 'error', 'run_id': run_id, 'error_code': ErrorCode.INVALID_REQUEST, 'message': 'run_id must be a string not used by an active run.'})
+            return
+        if len(self._runs) >= self.max_runs:
+            self._reply({'type': 'error', 'run_id': run_id, 'error_code': ErrorCode.INVALID_REQUEST, 'message': f'At most {self.max_runs} runs can be active on one connection.'})
+            return
+
+        controller = get_admission_controller()
+        decision = controller.check()
+        if decision is not None:
+            error = controller.reject(*decision)
+            self._reply({'type': 'error', 'run_id': run_id, 'error_code': error.error_code, 'message': error.message, 'details': error.details})
+            return
+
+        payload["run_id"] = run_id  # Also the run store key, so the run can be resynthesized
+        api_key = payload.pop("api_key", None) or self.api_key
+        self._reply({'type': 'run_started', 'run_id': run_id})
+        self._runs[run_id] = asyncio.create_task(self._run(run_id, payload, api_key))
+
+    async def _run(self, run_id: str, payload: Dict[str, Any], api_key: Optional[str]) -> None:
+        try:
+            with get_admission_controller().run():
+                async for event in self.run_events(payload, api_key):
+                    await self._post({'run_id': run_id, **event})
+        finally:
+            if self._runs.get(run_id) is asyncio.current_task():
+                del self._runs[run_id]
+
+    def _cancel(self, run_id: Any) -> None:
+        task = self._runs.pop(run_id, None) if isinstance(run_id, str) else None
+        if task is None:
+            self._reply({'type': 'error', 'run_id': run_id, 'error_code': ErrorCode.RUN_NOT_FOUND, 'message': 'No active run with this run_id.'})
+            return
+        task.cancel()
+        self._reply({'type': 'run_cancelled', 'run_id': run_id})
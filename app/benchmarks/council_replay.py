@@ -0,0 +1,168 @@
+"""
+End-to-end council benchmark against recorded upstream traffic.
+
+Record a cassette once against the live API:
+
+    OPENROUTER_API_KEY=sk-or-... uv run python -m benchmarks.council_replay record
+
+Then benchmark orchestration changes without the network:
+
+    uv run python -m benchmarks.council_replay replay --runs 5 --latency-scale 1.0
+
+Requests whose hash is not in the cassette (e.g. because a prompt changed)
+are reported as misses and behave like upstream failures. Each council mode
+prompts differently, so record and replay with the same --mode. With
+--check-budgets every run is checked against its mode's documented call,
+round-trip and latency budget (see COUNCIL_MODES) and the command exits
+non-zero on a violation. A fast-mode ranking that finishes after the run
+counts towards the run's calls but not its time.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+from backend.cassette import Cassette, configure_cassette
+from backend.config import OPENROUTER_API_KEY
+
+DEFAULT_CASSETTE = "data/cassettes/council_bench.jsonl.gz"
+
+DEFAULT_QUERIES = [
+    "What is the difference between mitosis and meiosis?",
+    "Explain the chain rule with a worked example.",
+    "Why did the Roman Republic become an empire?",
+]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _council_calls(cassette: Cassette) -> int:
+    return sum(counts["calls"] for kind, counts in cassette.stats.items() if kind != "get_free_models")
+
+
+async def _run_queries(queries: List[str], api_key: str, mode: str, cassette: Cassette) -> List[Dict[str, Any]]:
+    from backend.council import run_full_council, wait_background_tasks
+
+    timings = []
+    for query in queries:
+        calls_before = _council_calls(cassette)
+        started = time.perf_counter()
+        stage1, stage2, stage3, metadata = await run_full_council(query, api_key=api_key, mode=mode)
+        seconds = round(time.perf_counter() - started, 4)
+        await wait_background_tasks()
+        timings.append({
+            "query": query,
+            "seconds": seconds,
+            "upstream_calls": _council_calls(cassette) - calls_before,
+            "stage1_responses": len(stage1),
+            "stage2_rankings": len(stage2),
+            "chairman": stage3.get("model"),
+            "critical_path": metadata.get("critical_path"),
+            "budget": metadata.get("budget"),
+        })
+    return timings
+
+
+def check_budgets(runs: List[List[Dict[str, Any]]], latency_scale: float) -> List[str]:
+    """Return a description of every run that exceeded its mode's budget."""
+    violations = []
+    for run in runs:
+        for timing in run:
+            budget = timing.get("budget")
+            if not budget:
+                continue
+            if timing["upstream_calls"] > budget["max_calls"]:
+                violations.append(
+                    f"{timing['query']!r}: {timing['upstream_calls']} calls > budget {budget['max_calls']}"
+                )
+            rounds = len(timing.get("critical_path") or [])
+            if rounds > budget["critical_path_rounds"]:
+                violations.append(
+                    f"{timing['query']!r}: waited for {rounds} rounds {timing['critical_path']} "
+                    f"> budget {budget['critical_path_rounds']}"
+                )
+            max_seconds = budget["max_seconds"] * latency_scale
+            if latency_scale > 0 and timing["seconds"] > max_seconds:
+                violations.append(
+                    f"{timing['query']!r}: {timing['seconds']}s > budget {max_seconds:.1f}s"
+                )
+    return violations
+
+
+async def record(args: argparse.Namespace) -> Dict[str, Any]:
+    if not OPENROUTER_API_KEY:
+        raise SystemExit("OPENROUTER_API_KEY must be set to record a cassette.")
+    cassette = configure_cassette("record", args.cassette)
+    timings = await _run_queries(args.queries, OPENROUTER_API_KEY, args.council_mode, cassette)
+    return {
+        "mode": "record",
+        "council_mode": args.council_mode,
+        "cassette": args.cassette,
+        "runs": timings,
+        "calls": dict(cassette.stats),
+        "budget_violations": check_budgets([timings], 1.0),
+    }
+
+
+async def replay(args: argparse.Namespace) -> Dict[str, Any]:
+    cassette = configure_cassette("replay", args.cassette, args.latency_scale)
+    runs = []
+    for _ in range(args.runs):
+        cassette.rewind()
+        runs.append(await _run_queries(args.queries, "replay", args.council_mode, cassette))
+
+    per_run_totals = [sum(t["seconds"] for t in run) for run in runs]
+    per_query = [t["seconds"] for run in runs for t in run]
+    return {
+        "mode": "replay",
+        "council_mode": args.council_mode,
+        "cassette": args.cassette,
+        "latency_scale": args.latency_scale,
+        "runs": len(runs),
+        "total_seconds_mean": round(statistics.mean(per_run_totals), 4),
+        "query_seconds_p50": round(_percentile(per_query, 50), 4),
+        "query_seconds_p95": round(_percentile(per_query, 95), 4),
+        "calls_per_run": {
+            kind: {name: count // max(1, len(runs)) for name, count in counts.items()}
+            for kind, counts in cassette.stats.items()
+        },
+        "budget_violations": check_budgets(runs, args.latency_scale),
+        "last_run": runs[-1] if runs else [],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the council against recorded traffic.")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--query", dest="queries", action="append", help="Query to run (repeatable)")
+    parser.add_argument("--runs", type=int, default=3, help="Replay repetitions")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for recorded latencies")
+    parser.add_argument("--mode", dest="council_mode", default="thorough",
+                        choices=["fast", "balanced", "thorough"], help="Council latency tier")
+    parser.add_argument("--check-budgets", action="store_true",
+                        help="Exit non-zero if any run exceeds its mode's call, round-trip or latency budget")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    args.queries = args.queries or DEFAULT_QUERIES
+
+    report = asyncio.run(record(args) if args.mode == "record" else replay(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.check_budgets and report["budget_violations"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Microbenchmarks for the pure-Python hot paths of the backend.
+
+    uv run python -m benchmarks.micro run                # print timings
+    uv run python -m benchmarks.micro save               # store a baseline
+    uv run python -m benchmarks.micro compare            # flag regressions vs baseline
+
+Inputs are synthetic and sized well beyond a normal request (many council
+members, long responses, a 600-entry model catalogue) so that growth with
+input size shows up. Baselines are machine specific and live under data/.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+DEFAULT_BASELINE = "data/benchmarks/micro_baseline.json"
+DEFAULT_TOLERANCE = 0.15
+
+WORDS = (
+    "the council reviewed each answer carefully and found that photosynthesis converts light "
+    "energy into chemical energy stored in glucose while respiration releases it again "
+    "derivative integral matrix vector theorem proof lemma evidence source citation"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_stage1_results(rng: random.Random, members: int, words: int) -> List[Dict[str, Any]]:
+    return [
+        {"model": f"vendor/model-{i}:free", "original_model": None, "response": _text(rng, words)}
+        for i in range(members)
+    ]
+
+
+def make_ranking_text(rng: random.Random, members: int, words: int) -> str:
+    from backend.ranking import response_label
+
+    labels = [response_label(i) for i in range(members)]
+    evaluation = "\n".join(f"{label} {_text(rng, words // members)}" for label in labels)
+    rng.shuffle(labels)
+    ranking = "\n".join(f"{pos}. {label}" for pos, label in enumerate(labels, start=1))
+    return f"{evaluation}\n\nFINAL RANKING:\n{ranking}"
+
+
+def make_catalogue(rng: random.Random, size: int) -> List[Dict[str, Any]]:
+    catalogue = []
+    for i in range(size):
+        vendor = rng.choice(["google", "meta-llama", "mistralai", "qwen", "xiaomi", "tngtech"])
+        name = rng.choice(["gemma", "llama", "devstral", "qwen3", "mimo", "chimera", "vl"])
+        catalogue.append({
+            "id": f"{vendor}/{name}-{i}:free",
+            "name": f"{vendor.title()} {name.title()} {i}",
+            "description": _text(rng, 60),
+            "context_length": rng.choice([4096, 32768, 131072, 262144]),
+            "pricing": {"prompt": "0", "completion": "0"},
+            "architecture": {"modality": rng.choice(["text->text", "text+image->text"])},
+            "top_provider": {"name": vendor},
+        })
+    return catalogue
+
+
+def make_vision_response(rng: random.Random, lines: int) -> str:
+    text = "\n".join(_text(rng, 12) for _ in range(lines))
+    entities = "\n".join(f"- {_text(rng, 3)}" for _ in range(lines // 4))
+    table = "\n".join("| " + " | ".join(_text(rng, 1) for _ in range(4)) + " |" for _ in range(lines // 4))
+    return (
+        f"## EXTRACTED TEXT\n{text}\n\n## KEY ENTITIES\n{entities}\n\n"
+        f"## TABLES/STRUCTURED DATA\n{table}\n\n## CONFIDENCE\n87\n\n"
+        f"## WARNINGS\n- slight blur in lower margin\n"
+    )
+
+
+def build_cases() -> Dict[str, Callable[[], Any]]:
+    """Return benchmark name -> zero-argument callable."""
+    from backend.council import (
+        parse_ranking_from_text,
+        calculate_aggregate_rankings,
+        build_ranking_prompt,
+        build_chairman_prompt,
+    )
+    from backend.openrouter import normalize_model
+    from backend.vision.processor import _parse_vision_response
+    from backend.input.normalize import render_context_as_prompt
+
+    rng = random.Random(1234)
+    members = 20
+    stage1 = make_stage1_results(rng, members, words=1500)
+    ranking_texts = [make_ranking_text(rng, members, words=1200) for _ in range(members)]
+    _, label_to_model = build_ranking_prompt("q", stage1)
+    stage2 = [
+        {"model": r["model"], "original_model": None, "ranking": text, "parsed_ranking": parse_ranking_from_text(text)}
+        for r, text in zip(stage1, ranking_texts)
+    ]
+    catalogue = make_catalogue(rng, 600)
+    vision_raw = make_vision_response(rng, lines=400)
+    vision_context = _parse_vision_response(vision_raw, "google/gemma-3-27b-it:free")
+    question = _text(rng, 40)
+    history = [{"role": "user", "content": _text(rng, 200)}, {"role": "assistant", "content": _text(rng, 400)}]
+
+    def normalize_catalogue():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [normalize_model(m) for m in catalogue]
+
+    return {
+        "parse_ranking_from_text": lambda: [parse_ranking_from_text(t) for t in ranking_texts],
+        "calculate_aggregate_rankings": lambda: calculate_aggregate_rankings(stage2, label_to_model),
+        "normalize_model_catalogue": normalize_catalogue,
+        "parse_vision_response": lambda: _parse_vision_response(vision_raw, "m"),
+        "render_context_as_prompt": lambda: asyncio.run(render_context_as_prompt(vision_context, question)),
+        "build_ranking_prompt": lambda: build_ranking_prompt(question, stage1),
+        "build_chairman_prompt": lambda: build_chairman_prompt(question, stage1, stage2, history=history),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int, min_time: float = 0.05) -> Dict[str, float]:
+    """Time fn with enough inner loops per sample to exceed min_time."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) / loops)
+    return {
+        "median_us": round(statistics.median(samples) * 1e6, 2),
+        "min_us": round(min(samples) * 1e6, 2),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def run_suite(repeat: int, only: List[str]) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, fn in build_cases().items():
+        if only and name not in only:
+            continue
+        results[name] = measure(fn, repeat)
+        print(f"{name:<32} {results[name]['median_us']:>14.2f} us  (min {results[name]['min_us']:.2f})")
+    return results
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Return the names of benchmarks slower than baseline by more than tolerance."""
+    regressions = []
+    print(f"\n{'benchmark':<32} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, result in current.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<32} {'-':>12} {result['median_us']:>12.2f} {'new':>9}")
+            continue
+        change = result["median_us"] / base["median_us"] - 1 if base["median_us"] else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<32} {base['median_us']:>12.2f} {result['median_us']:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for backend hot paths.")
+    parser.add_argument("command", choices=["run", "save", "compare"])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown before flagging a regression (0.15 = 15%%)")
+    parser.add_argument("--only", action="append", default=[], help="Run only this benchmark (repeatable)")
+    args = parser.parse_args()
+
+    results = run_suite(args.repeat, args.only)
+
+    if args.command == "save":
+        directory = os.path.dirname(args.baseline)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+    elif args.command == "compare":
+        if not os.path.exists(args.baseline):
+            raise SystemExit(f"No baseline at {args.baseline}. Run 'save' first.")
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()